@@ -0,0 +1,56 @@
+"""Micro-benchmark of the transport-agnostic protocol core.
+
+Run with ``python benchmarks/bench_protocol.py``. No network access is needed.
+"""
+
+import argparse
+import base64
+import json
+import sys
+import timeit
+import uuid
+
+from fusionbrain_sdk_python.protocol import FBProtocol
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=20_000)
+    parser.add_argument('--image-size', type=int, default=1024 * 1024)
+    args = parser.parse_args()
+
+    protocol = FBProtocol(x_key='key', x_secret='secret')
+    pipeline_id = uuid.uuid4()
+    template = protocol.run_template(pipeline_id, negative_prompt='people', style='ANIME', num_images=2)
+    request_id = uuid.uuid4()
+    status_body = json.dumps({
+        'uuid': str(request_id),
+        'status': 'DONE',
+        'result': {'files': [base64.b64encode(b'\0' * args.image_size).decode()], 'censored': False},
+        'generationTime': 10,
+    }).encode()
+
+    cases = {
+        'run_pipeline request': lambda: protocol.run_pipeline(
+            pipeline_id, 'A red cat sitting on a table', negative_prompt='people', style='ANIME', num_images=2,
+        ),
+        'run_template request': lambda: template.request('A red cat sitting on a table'),
+        'get_status request': lambda: protocol.get_status(request_id),
+        'parse_run_pipeline': lambda: protocol.parse_run_pipeline(
+            b'{"status": "INITIAL", "uuid": "ffffffff-ffff-4e5e-ab06-ffffffffffff", "status_time": 17}',
+        ),
+        'parse_status (PROCESSING)': lambda: protocol.parse_status(
+            b'{"uuid": "ffffffff-ffff-4e5e-ab06-ffffffffffff", "status": "PROCESSING"}',
+        ),
+    }
+    for name, case in cases.items():
+        seconds = timeit.timeit(case, number=args.number)
+        sys.stdout.write(f'{name:<32} {seconds / args.number * 1e6:8.2f} us/call\n')
+
+    number = max(args.number // 1000, 5)
+    seconds = timeit.timeit(lambda: protocol.parse_status(status_body), number=number)
+    sys.stdout.write(f'{"parse_status (DONE)":<32} {seconds / number * 1e6:8.2f} us/call\n')
+
+
+if __name__ == '__main__':
+    main()
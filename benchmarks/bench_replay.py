@@ -0,0 +1,83 @@
+"""Replay a recorded session to measure client-side overhead reproducibly.
+
+Run with ``python benchmarks/bench_replay.py``. The script records ``--jobs`` generations from the
+bundled ``FakeServer`` into a cassette, then replays it through ``FBClient`` and ``AsyncFBClient``
+with ``ReplayTiming.FAST``, so the numbers reflect only the SDK and do not depend on the network.
+Pass ``--cassette`` to replay an existing recording instead, for example one captured from the real API.
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.recording import (
+    AsyncReplayTransport,
+    Cassette,
+    RecordingTransport,
+    ReplayTransport,
+    summarize,
+)
+from fusionbrain_sdk_python.transport import RequestsTransport
+
+
+def record(path: Path, jobs: int) -> None:
+    with FakeServer(generation_time=0.05) as server, FBClient(
+        x_key='key', x_secret='secret', api_host=server.url,
+        transport=RecordingTransport(RequestsTransport(), Cassette(path)),
+    ) as client:
+        request_ids = [client.run_pipeline(uuid.UUID(PIPELINE_ID), f'prompt {i}').uuid for i in range(jobs)]
+        for request_id in request_ids:
+            client.wait_for_completion(request_id, initial_delay=0, sleep_interval=0.01, max_retries=100)
+
+
+def replay_sync(cassette: Cassette, request_ids: List[uuid.UUID]) -> float:
+    started = time.perf_counter()
+    with FBClient(x_key='key', x_secret='secret', transport=ReplayTransport(cassette)) as client:
+        for request_id in request_ids:
+            client.get_status(request_id)
+    return time.perf_counter() - started
+
+
+async def replay_async(cassette: Cassette, request_ids: List[uuid.UUID]) -> float:
+    started = time.perf_counter()
+    async with AsyncFBClient(x_key='key', x_secret='secret', transport=AsyncReplayTransport(cassette)) as client:
+        await asyncio.gather(*(client.get_status(request_id) for request_id in request_ids))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--cassette')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(args.cassette) if args.cassette else Path(directory) / 'session.jsonl.gz'
+        if not args.cassette:
+            record(path, args.jobs)
+        cassette = Cassette.load(path)
+
+    for endpoint, summary in summarize(cassette.exchanges).items():
+        sys.stdout.write(f'{endpoint:<28} {summary["count"]:6d} {summary["mean_elapsed"] * 1e3:8.3f} ms recorded\n')
+    request_ids = [
+        uuid.UUID(exchange.url.rstrip('/').rsplit('/', 1)[-1])
+        for exchange in cassette.exchanges if exchange.endpoint == 'get_status'
+    ]
+    for name, seconds in (
+        ('FBClient', replay_sync(cassette, request_ids)),
+        ('AsyncFBClient', asyncio.run(replay_async(cassette, request_ids))),
+    ):
+        calls = len(request_ids)
+        sys.stdout.write(f'{name:<16} {calls / seconds:10.1f} calls/s {seconds / calls * 1e3:8.3f} ms/call\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""Compare transports on many concurrent ``get_status`` polls.
+
+Run with ``python benchmarks/bench_transports.py``. By default the polls go to the bundled
+``FakeServer``. It only speaks HTTP/1.1, so the HTTP/2 row talks h2c with prior knowledge to a
+local gateway that forwards every stream to the fake server over a pooled HTTP/1.1 session; that
+row therefore pays one extra local hop per request. Point ``--api-host`` at an h2-capable endpoint
+(for example the real API, with ``--x-key``/``--x-secret``) to compare the transports without it.
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.httpx_transport import AsyncHttpxTransport
+from fusionbrain_sdk_python.transport import AiohttpTransport, AsyncTransport
+
+
+class H2Gateway:
+    """Serves h2c with prior knowledge and forwards each stream to an HTTP/1.1 upstream."""
+
+    def __init__(self, upstream: str) -> None:
+        self.upstream = upstream.rstrip('/')
+        self.url = ''
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='h2-gateway', daemon=True)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def __enter__(self) -> 'H2Gateway':
+        # Runs on its own thread like the fake server, so it does not compete with the client's loop.
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _start(self) -> None:
+        self._session = aiohttp.ClientSession(auto_decompress=False)
+        self._server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        self.url = 'http://127.0.0.1:{}/'.format(self._server.sockets[0].getsockname()[1])
+
+    async def _stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        if self._session is not None:
+            await self._session.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        streams: Dict[int, Tuple[Dict[str, str], bytearray]] = {}
+        window_opened = asyncio.Event()
+        tasks = set()
+        while data := await reader.read(65536):
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    streams[event.stream_id] = ({str(name): str(value) for name, value in event.headers}, bytearray())
+                elif isinstance(event, h2.events.DataReceived):
+                    streams[event.stream_id][1].extend(event.data)
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    headers, body = streams.pop(event.stream_id)
+                    task = asyncio.create_task(
+                        self._forward(conn, writer, window_opened, event.stream_id, headers, body),
+                    )
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                elif isinstance(event, h2.events.WindowUpdated):
+                    window_opened.set()
+            writer.write(conn.data_to_send())
+        for task in tasks:
+            task.cancel()
+        writer.close()
+
+    async def _forward(
+        self,
+        conn: h2.connection.H2Connection,
+        writer: asyncio.StreamWriter,
+        window_opened: asyncio.Event,
+        stream_id: int,
+        headers: Dict[str, str],
+        body: bytearray,
+    ) -> None:
+        assert self._session is not None
+        forwarded = {name: value for name, value in headers.items() if not name.startswith(':')}
+        forwarded.pop('content-length', None)
+        async with self._session.request(
+            headers[':method'], self.upstream + headers[':path'], headers=forwarded, data=bytes(body),
+        ) as response:
+            payload = await response.read()
+            kept = [(name.lower(), value) for name, value in response.headers.items()
+                    if name.lower() in ('content-type', 'content-encoding')]
+            status = [(':status', str(response.status)), ('content-length', str(len(payload)))]
+            conn.send_headers(stream_id, status + kept)
+        while payload:
+            window = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+            if window <= 0:
+                writer.write(conn.data_to_send())
+                window_opened.clear()
+                await window_opened.wait()
+                continue
+            conn.send_data(stream_id, payload[:window])
+            payload = payload[window:]
+        conn.end_stream(stream_id)
+        writer.write(conn.data_to_send())
+
+
+async def poll(client: AsyncFBClient, request_ids: List[uuid.UUID], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(client.get_status(request_id) for request_id in request_ids))
+    return time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace, api_host: str, h2_host: str) -> None:
+    transports: Dict[str, Tuple[str, Callable[[], AsyncTransport]]] = {
+        'aiohttp': (api_host, lambda: AiohttpTransport(limit=args.connections)),
+        'httpx http1.1': (api_host, lambda: AsyncHttpxTransport(http2=False, max_connections=args.connections)),
+        # Without TLS there is no ALPN, so HTTP/2 is spoken from the first byte.
+        'httpx http2': (h2_host, lambda: AsyncHttpxTransport(client=httpx.AsyncClient(
+            http1=False, http2=True, limits=httpx.Limits(max_connections=args.connections),
+        ))),
+    }
+    credentials: Dict[str, Any] = {'x_key': args.x_key, 'x_secret': args.x_secret}
+    for name, (host, factory) in transports.items():
+        async with AsyncFBClient(api_host=host, transport=factory(), **credentials) as client:
+            results = await asyncio.gather(*(
+                client.run_pipeline(uuid.UUID(args.pipeline_id), f'prompt {i}') for i in range(args.jobs)
+            ))
+            request_ids = [result.uuid for result in results]
+            await poll(client, request_ids, 1)
+            seconds = await poll(client, request_ids, args.rounds)
+        calls = args.jobs * args.rounds
+        sys.stdout.write(f'{name:<16} {calls / seconds:10.1f} polls/s {seconds / calls * 1e3:8.3f} ms/poll\n')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--connections', type=int, default=10)
+    parser.add_argument('--api-host')
+    parser.add_argument('--pipeline-id', default=PIPELINE_ID)
+    parser.add_argument('--x-key', default='key')
+    parser.add_argument('--x-secret', default='secret')
+    args = parser.parse_args()
+
+    if args.api_host:
+        asyncio.run(run(args, args.api_host, args.api_host))
+        return
+    with FakeServer(generation_time=3600) as server, H2Gateway(server.url) as gateway:
+        asyncio.run(run(args, server.url, gateway.url))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Measure how submit+poll throughput of one shared ``FBClient`` scales with threads.
+
+Run with ``python benchmarks/thread_scaling.py``, ideally on a free-threaded build (``python3.13t``);
+the header reports whether the GIL is enabled. Two workloads are available:
+
+* ``--mode server`` (default) talks to a ``FakeServer`` running in a separate process, so the numbers
+  include real sockets and the connection pool. A single server process caps throughput at some point,
+  so point ``--api-host`` at a faster endpoint to push further.
+* ``--mode replay`` serves recorded responses through ``ReplayTransport``, which isolates the client's
+  own CPU work (multipart encoding, JSON parsing, validation) and shows the interpreter's scaling.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, List
+
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.recording import Cassette, RecordingTransport, ReplayTransport
+from fusionbrain_sdk_python.transport import RequestsTransport
+
+
+def serve(port: Any, stop: Any) -> None:
+    with FakeServer() as server:
+        port.put(server.port)
+        stop.wait()
+
+
+def work(client: FBClient, operations: int, barrier: threading.Barrier) -> None:
+    pipeline_id = uuid.UUID(PIPELINE_ID)
+    barrier.wait()
+    for i in range(operations):
+        run_result = client.run_pipeline(pipeline_id, f'prompt {i}')
+        client.get_status(run_result.uuid)
+
+
+def measure(client: FBClient, threads: int, operations: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+    workers = [threading.Thread(target=work, args=(client, operations, barrier)) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return threads * operations / (time.perf_counter() - started)
+
+
+def record(api_host: str, path: Path) -> None:
+    with FBClient(
+        x_key='key', x_secret='secret', api_host=api_host,
+        transport=RecordingTransport(RequestsTransport(), Cassette(path)),
+    ) as client:
+        work(client, 1, threading.Barrier(1))
+
+
+def run(args: argparse.Namespace, api_host: str, thread_counts: List[int]) -> None:
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    sys.stdout.write(f'Python {sys.version.split()[0]}, GIL {"enabled" if gil else "disabled"}, mode {args.mode}\n')
+    with tempfile.TemporaryDirectory() as directory:
+        cassette = Path(directory) / 'scaling.jsonl'
+        if args.mode == 'replay':
+            record(api_host, cassette)
+        baseline = None
+        for threads in thread_counts:
+            if args.mode == 'replay':
+                transport: Any = ReplayTransport(cassette, loop=True)
+            else:
+                transport = RequestsTransport(pool_maxsize=max(thread_counts))
+            with FBClient(x_key='key', x_secret='secret', api_host=api_host, transport=transport) as client:
+                measure(client, threads, 1)
+                throughput = measure(client, threads, args.operations)
+            baseline = baseline or throughput / threads
+            speedup = throughput / baseline
+            sys.stdout.write(
+                f'{threads:3d} threads {throughput:10.1f} jobs/s  speedup {speedup:5.1f}x  '
+                f'efficiency {speedup / threads:6.1%}\n',
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=['server', 'replay'], default='server')
+    parser.add_argument('--threads', default='1,2,4,8,16,32,64')
+    parser.add_argument('--operations', type=int, default=200, help='submit+poll pairs per thread')
+    parser.add_argument('--api-host')
+    args = parser.parse_args()
+    thread_counts = [int(value) for value in args.threads.split(',')]
+
+    if args.api_host:
+        run(args, args.api_host, thread_counts)
+        return
+    context = multiprocessing.get_context('spawn')
+    port, stop = context.Queue(), context.Event()
+    server = context.Process(target=serve, args=(port, stop), daemon=True)
+    server.start()
+    try:
+        run(args, f'http://127.0.0.1:{port.get()}/', thread_counts)
+    finally:
+        stop.set()
+        server.join()
+
+
+if __name__ == '__main__':
+    main()
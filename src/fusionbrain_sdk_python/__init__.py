@@ -12,9 +12,28 @@ except PackageNotFoundError:
     __version__ = '0.0.0'
 
 from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.background import BackgroundLoop
+from fusionbrain_sdk_python.batching import AsyncPromptBatcher
+from fusionbrain_sdk_python.budget import AsyncByteBudget, ByteBudget
+from fusionbrain_sdk_python.compression import CompressionPolicy
+from fusionbrain_sdk_python.concurrency import AIMDLimiter, AsyncAIMDLimiter
+from fusionbrain_sdk_python.catalogue import Catalogue, CatalogueDiff
 from fusionbrain_sdk_python.client import FBClient
-from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.exceptions import (
+    CassetteMiss,
+    CircuitOpen,
+    ConfigError,
+    DeadlineExceeded,
+    JobShed,
+    QueueFull,
+    WorkerError,
+)
+from fusionbrain_sdk_python.fairness import AsyncFairScheduler
+from fusionbrain_sdk_python.hedging import HedgePolicy
+from fusionbrain_sdk_python.httpx_transport import AsyncHttpxTransport, HttpxTransport
+from fusionbrain_sdk_python.limits import TokenBucket
 from fusionbrain_sdk_python.models import (
+    DecodedPipelineResult,
     Pipeline,
     PipelineAvailabilityResult,
     PipelineCodeStatusResult,
@@ -26,6 +45,42 @@ from fusionbrain_sdk_python.models import (
     RunPipelineResult,
     Style,
 )
+from fusionbrain_sdk_python.previews import PreviewCache
+from fusionbrain_sdk_python.processing import ResultProcessor
+from fusionbrain_sdk_python.profiling import Profiler
+from fusionbrain_sdk_python.protocol import RunTemplate
+from fusionbrain_sdk_python.recording import (
+    AsyncRecordingTransport,
+    AsyncReplayTransport,
+    Cassette,
+    Exchange,
+    RecordingTransport,
+    ReplayTiming,
+    ReplayTransport,
+)
+from fusionbrain_sdk_python.routing import AsyncPipelineRouter, PipelineRouter, RouteStats, RoutingStrategy
+from fusionbrain_sdk_python.scheduling import AsyncJobScheduler, OverflowPolicy, Priority
+from fusionbrain_sdk_python.scope import AsyncJobScope, JobScope
+from fusionbrain_sdk_python.sharding import ShardedExecutor, ShardResult
+from fusionbrain_sdk_python.shared_state import (
+    MemoryStateStore,
+    RedisStateStore,
+    SharedCircuitBreaker,
+    SharedInFlightCounter,
+    SharedRateLimiter,
+    SQLiteStateStore,
+    StateStore,
+)
+from fusionbrain_sdk_python.staged import Stage, StagedPipeline, StagedResult, StageExecutor
+from fusionbrain_sdk_python.transport import (
+    AiohttpTransport,
+    AsyncTransport,
+    BackgroundTransport,
+    HTTPResponse,
+    RequestsTransport,
+    Transport,
+)
+from fusionbrain_sdk_python.warmup import WarmupResult
 
 __all__ = [
     'FBClient',
@@ -39,6 +94,67 @@ __all__ = [
     'PipelineType',
     'RunPipelineResult',
     'RunPipelineBlockedResult',
+    'RunTemplate',
     'Style',
+    'Catalogue',
+    'CatalogueDiff',
+    'PreviewCache',
+    'DecodedPipelineResult',
+    'ResultProcessor',
+    'Profiler',
+    'ByteBudget',
+    'AsyncByteBudget',
+    'CompressionPolicy',
+    'HedgePolicy',
+    'AIMDLimiter',
+    'AsyncAIMDLimiter',
+    'AsyncPromptBatcher',
+    'AsyncJobScheduler',
+    'AsyncFairScheduler',
+    'AsyncJobScope',
+    'JobScope',
+    'StagedPipeline',
+    'Stage',
+    'StageExecutor',
+    'StagedResult',
+    'Priority',
+    'OverflowPolicy',
+    'TokenBucket',
+    'PipelineRouter',
+    'AsyncPipelineRouter',
+    'RoutingStrategy',
+    'RouteStats',
+    'ShardedExecutor',
+    'ShardResult',
+    'StateStore',
+    'MemoryStateStore',
+    'SQLiteStateStore',
+    'RedisStateStore',
+    'SharedRateLimiter',
+    'SharedCircuitBreaker',
+    'SharedInFlightCounter',
+    'Transport',
+    'AsyncTransport',
+    'HTTPResponse',
+    'RequestsTransport',
+    'AiohttpTransport',
+    'HttpxTransport',
+    'AsyncHttpxTransport',
+    'BackgroundTransport',
+    'BackgroundLoop',
+    'WarmupResult',
+    'Cassette',
+    'Exchange',
+    'RecordingTransport',
+    'AsyncRecordingTransport',
+    'ReplayTransport',
+    'AsyncReplayTransport',
+    'ReplayTiming',
     'ConfigError',
+    'DeadlineExceeded',
+    'QueueFull',
+    'JobShed',
+    'CircuitOpen',
+    'WorkerError',
+    'CassetteMiss',
 ]
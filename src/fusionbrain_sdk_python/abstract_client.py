@@ -2,6 +2,7 @@ from typing import List, Optional, Protocol, Union
 from uuid import UUID
 
 from fusionbrain_sdk_python.models import (
+    DecodedPipelineResult,
     Pipeline,
     PipelineStatus,
     PipelineStatusResult,
@@ -10,11 +11,13 @@ from fusionbrain_sdk_python.models import (
     RunPipelineResult,
     Style,
 )
+from fusionbrain_sdk_python.processing import ResultProcessor
+from fusionbrain_sdk_python.protocol import API_HOST, STYLES_URL, RunTemplate
 
 
 class SyncClientProtocol(Protocol):
-    API_HOST: str = 'https://api-key.fusionbrain.ai/'
-    STYLES_URL: str = 'https://cdn.fusionbrain.ai/static/styles/key'
+    API_HOST: str = API_HOST
+    STYLES_URL: str = STYLES_URL
 
     def get_pipelines(self) -> List[Pipeline]: ...
     def get_pipelines_by_type(self, pipe_type: PipelineType) -> List[Pipeline]: ...
@@ -29,20 +32,30 @@ class SyncClientProtocol(Protocol):
         width: int = 1024,
         num_images: int = 1,
     ) -> Union[RunPipelineResult, RunPipelineBlockedResult]: ...
+    def run_template(
+        self,
+        template: RunTemplate,
+        prompt: str,
+    ) -> Union[RunPipelineResult, RunPipelineBlockedResult]: ...
     def get_styles(self) -> List[Style]: ...
     def get_status(self, request_id: UUID) -> PipelineStatusResult: ...
     def wait_for_completion(
         self,
         request_id: UUID,
-        initial_delay: int,
-        sleep_interval: int = 1,
+        initial_delay: float,
+        sleep_interval: float = 1,
         max_retries: int = 30,
     ) -> PipelineStatusResult: ...
+    def decode_result(
+        self,
+        status_result: PipelineStatusResult,
+        processor: Optional[ResultProcessor] = None,
+    ) -> DecodedPipelineResult: ...
 
 
 class AsyncClientProtocol(Protocol):
-    API_HOST: str = 'https://api-key.fusionbrain.ai/'
-    STYLES_URL: str = 'https://cdn.fusionbrain.ai/static/styles/key'
+    API_HOST: str = API_HOST
+    STYLES_URL: str = STYLES_URL
 
     async def get_pipelines(self) -> List[Pipeline]: ...
     async def get_pipelines_by_type(self, pipe_type: PipelineType) -> List[Pipeline]: ...
@@ -57,12 +70,22 @@ class AsyncClientProtocol(Protocol):
         width: int = 1024,
         num_images: int = 1,
     ) -> Union[RunPipelineResult, RunPipelineBlockedResult]: ...
+    async def run_template(
+        self,
+        template: RunTemplate,
+        prompt: str,
+    ) -> Union[RunPipelineResult, RunPipelineBlockedResult]: ...
     async def get_styles(self) -> List[Style]: ...
     async def get_status(self, request_id: UUID) -> PipelineStatusResult: ...
     async def wait_for_completion(
         self,
         request_id: UUID,
-        initial_delay: int,
-        sleep_interval: int = 1,
+        initial_delay: float,
+        sleep_interval: float = 1,
         max_retries: int = 30,
     ) -> PipelineStatusResult: ...
+    async def decode_result(
+        self,
+        status_result: PipelineStatusResult,
+        processor: Optional[ResultProcessor] = None,
+    ) -> DecodedPipelineResult: ...
@@ -1,19 +1,22 @@
 import asyncio
-import json
-import os
-from http import HTTPStatus
-from typing import List, Optional, Union
+import time
+from types import TracebackType
+from typing import List, Optional, Type, Union
 from uuid import UUID
 
-import aiohttp
 from dotenv import load_dotenv
 
 from fusionbrain_sdk_python.abstract_client import AsyncClientProtocol
+from fusionbrain_sdk_python.budget import AsyncByteBudget
+from fusionbrain_sdk_python.catalogue import Catalogue, CatalogueDiff
+from fusionbrain_sdk_python.compression import CompressionPolicy
+from fusionbrain_sdk_python.concurrency import AsyncAIMDLimiter, is_overload, is_overload_error
 from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.hedging import HedgePolicy, async_hedged
+from fusionbrain_sdk_python.limits import RateLimiter
 from fusionbrain_sdk_python.models import (
+    DecodedPipelineResult,
     Pipeline,
-    PipelineAvailabilityResult,
-    PipelineCodeStatusResult,
     PipelineResultStatus,
     PipelineStatus,
     PipelineStatusResult,
@@ -22,84 +25,121 @@ from fusionbrain_sdk_python.models import (
     RunPipelineResult,
     Style,
 )
+from fusionbrain_sdk_python.previews import PreviewCache
+from fusionbrain_sdk_python.processing import ResultProcessor
+from fusionbrain_sdk_python.profiling import Profiler, async_profiled, phase
+from fusionbrain_sdk_python.protocol import FBProtocol, HTTPRequest, RunTemplate
+from fusionbrain_sdk_python.shared_state import SharedCircuitBreaker, offload
+from fusionbrain_sdk_python.transport import AiohttpTransport, AsyncBeforeRead, AsyncTransport, HTTPResponse
+from fusionbrain_sdk_python.warmup import WarmupResult, async_resolve, origins
 
 load_dotenv()
 
 
 class AsyncFBClient(AsyncClientProtocol):
-    def __init__(self, x_key: Optional[str] = None, x_secret: Optional[str] = None) -> None:
-        _FB_API_KEY = os.getenv('FB_API_KEY') or x_key
-        _FB_API_SECRET = os.getenv('FB_API_SECRET') or x_secret
-        if not _FB_API_KEY or not _FB_API_SECRET:
-            raise ConfigError(
-                'Please set `FB_API_KEY` and `FB_API_SECRET` tokens in initial method or environment variables.',
-            )
-        self.AUTH_HEADERS = {
-            'X-Key': f'Key {_FB_API_KEY}',
-            'X-Secret': f'Secret {_FB_API_SECRET}',
-        }
+    def __init__(
+        self,
+        x_key: Optional[str] = None,
+        x_secret: Optional[str] = None,
+        api_host: Optional[str] = None,
+        styles_url: Optional[str] = None,
+        result_processor: Optional[ResultProcessor] = None,
+        byte_budget: Optional[AsyncByteBudget] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        concurrency_limiter: Optional[AsyncAIMDLimiter] = None,
+        transport: Optional[AsyncTransport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[SharedCircuitBreaker] = None,
+        compression: Optional[CompressionPolicy] = None,
+        profiler: Optional[Profiler] = None,
+        preview_cache: Optional[PreviewCache] = None,
+    ) -> None:
+        self.protocol = FBProtocol(
+            x_key=x_key,
+            x_secret=x_secret,
+            api_host=api_host or self.API_HOST,
+            styles_url=styles_url or self.STYLES_URL,
+        )
+        self.API_HOST = self.protocol.api_host
+        self.STYLES_URL = self.protocol.styles_url
+        self.AUTH_HEADERS = self.protocol.auth_headers
+        self.profiler = profiler
+        self.protocol.profiler = profiler
+        self.preview_cache = preview_cache
+        self.result_processor = result_processor or ResultProcessor()
+        self._owns_result_processor = result_processor is None
+        self.byte_budget = byte_budget
+        self.hedge_policy = hedge_policy
+        self.concurrency_limiter = concurrency_limiter
+        if transport is not None and compression is not None:
+            raise ConfigError('`compression` applies to the default transport, pass it to your transport instead.')
+        self.compression = compression
+        self.transport: AsyncTransport = transport or AiohttpTransport(compression=compression)
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.pipelines: Optional[List[Pipeline]] = None
+        self.styles: Optional[List[Style]] = None
+        self.catalogue: Optional[Catalogue] = None
+        self.ready = asyncio.Event()
+
+    async def __aenter__(self) -> 'AsyncFBClient':
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
 
+    async def close(self) -> None:
+        if self.profiler is not None:
+            self.profiler.stop()
+        await self.transport.close()
+        if self._owns_result_processor:
+            # Shutting the pools down waits for decodes still running in them.
+            await asyncio.to_thread(self.result_processor.close)
+        if self.hedge_policy is not None:
+            self.hedge_policy.close()
+
+    async def warmup(self, connections: int = 4) -> WarmupResult:
+        started = time.monotonic()
+        await asyncio.gather(async_resolve(self.API_HOST), async_resolve(self.STYLES_URL))
+        pipelines, styles, opened = await asyncio.gather(
+            self.get_pipelines(),
+            self.get_styles(),
+            self._open_connections(connections),
+        )
+        self.pipelines = pipelines
+        self.styles = styles
+        self._set_catalogue(pipelines, styles)
+        self.ready.set()
+        return WarmupResult(pipelines, styles, opened, time.monotonic() - started)
+
+    async def refresh_catalogue(self) -> CatalogueDiff:
+        pipelines, styles = await asyncio.gather(self.get_pipelines(), self.get_styles())
+        return self._set_catalogue(pipelines, styles)
+
+    @async_hedged
+    @async_profiled
     async def get_pipelines(self) -> List[Pipeline]:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.API_HOST + 'key/api/v1/pipelines', headers=self.AUTH_HEADERS) as response:
-                if response.status != HTTPStatus.OK:
-                    msg = (
-                        f'In response to {response.request_info.url} returned status'
-                        f'code {response.status}. Reason: {await response.text()}'
-                    )
-                    raise aiohttp.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status,
-                        message=msg,
-                        headers=response.headers,
-                    )
-                data = await response.json()
-                return [Pipeline.model_validate(pipe) for pipe in data]
+        response = await self._send(self.protocol.get_pipelines())
+        return self.protocol.parse_pipelines(response.body)
 
+    @async_hedged
+    @async_profiled
     async def get_pipelines_by_type(self, pipe_type: PipelineType) -> List[Pipeline]:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                self.API_HOST + 'key/api/v1/pipelines',
-                headers=self.AUTH_HEADERS,
-                params={'type': pipe_type.value},
-            ) as response:
-                if response.status != HTTPStatus.OK:
-                    msg = (
-                        f'In response to {response.request_info.url} returned status'
-                        f'code {response.status}. Reason: {await response.text()}'
-                    )
-                    raise aiohttp.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status,
-                        message=msg,
-                        headers=response.headers,
-                    )
-                data = await response.json()
-                return [Pipeline.model_validate(pipe) for pipe in data]
+        response = await self._send(self.protocol.get_pipelines_by_type(pipe_type))
+        return self.protocol.parse_pipelines(response.body)
 
+    @async_hedged
+    @async_profiled
     async def get_pipeline_availability(self, pipeline_id: UUID) -> PipelineStatus:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                self.API_HOST + f'key/api/v1/pipeline/{str(pipeline_id)}/availability',
-                headers=self.AUTH_HEADERS,
-            ) as response:
-                if response.status != HTTPStatus.OK:
-                    msg = (
-                        f'In response to {response.request_info.url} returned status'
-                        f'code {response.status}. Reason: {await response.text()}'
-                    )
-                    raise aiohttp.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status,
-                        message=msg,
-                        headers=response.headers,
-                    )
-                result = PipelineAvailabilityResult.model_validate(await response.json())
-                return result.status
+        response = await self._send(self.protocol.get_pipeline_availability(pipeline_id))
+        return self.protocol.parse_pipeline_availability(response.body)
 
+    @async_profiled
     async def run_pipeline(
         self,
         pipeline_id: UUID,
@@ -110,104 +150,84 @@ class AsyncFBClient(AsyncClientProtocol):
         width: int = 1024,
         num_images: int = 1,
     ) -> Union[RunPipelineResult, RunPipelineBlockedResult]:
-        optional = {
-            **({'negativePromptDecoder': negative_prompt} if negative_prompt else {}),
-            **({'style': style.name if isinstance(style, Style) else style} if style else {}),
-        }
-        params = {
-            'type': 'GENERATE',
-            'numImages': num_images,
-            'width': width,
-            'height': height,
-            'generateParams': {
-                'query': f'{prompt}',
-            },
-            **optional,
-        }
-
-        form_data = aiohttp.FormData()
-        form_data.add_field('pipeline_id', str(pipeline_id))
-        form_data.add_field(
-            'params',
-            json.dumps(params),
-            content_type='application/json',
+        if style is not None and self.catalogue is not None:
+            style = self.catalogue.style(style)
+        request = self.protocol.run_pipeline(
+            pipeline_id=pipeline_id,
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            style=style,
+            height=height,
+            width=width,
+            num_images=num_images,
         )
+        return await self._submit(request, num_images, width, height)
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.API_HOST + 'key/api/v1/pipeline/run',
-                headers=self.AUTH_HEADERS,
-                data=form_data,
-            ) as response:
-                if response.status != HTTPStatus.CREATED:
-                    msg = (
-                        f'In response to {response.request_info.url} returned status'
-                        f'code {response.status}. Reason: {await response.text()}'
-                    )
-                    raise aiohttp.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status,
-                        message=msg,
-                        headers=response.headers,
-                    )
-                response_data = await response.json()
-                if response_data.get('model_status'):
-                    return RunPipelineBlockedResult.model_validate(response_data)
-                return RunPipelineResult.model_validate(response_data)
+    def template(
+        self,
+        pipeline_id: UUID,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+    ) -> RunTemplate:
+        if style is not None and self.catalogue is not None:
+            style = self.catalogue.style(style)
+        return self.protocol.run_template(pipeline_id, negative_prompt, style, height, width, num_images)
 
+    @async_profiled
+    async def run_template(
+        self,
+        template: RunTemplate,
+        prompt: str,
+    ) -> Union[RunPipelineResult, RunPipelineBlockedResult]:
+        return await self._submit(template.request(prompt), template.num_images, template.width, template.height)
+
+    @async_profiled
     async def get_styles(self) -> List[Style]:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                self.STYLES_URL,
-            ) as response:
-                if response.status != HTTPStatus.OK:
-                    msg = (
-                        f'In response to {response.request_info.url} returned status'
-                        f'code {response.status}. Reason: {await response.text()}'
-                    )
-                    raise aiohttp.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status,
-                        message=msg,
-                        headers=response.headers,
-                    )
-                return [Style.model_validate(res) for res in await response.json()]
+        styles = await self._get_styles()
+        if self.preview_cache is not None:
+            with phase(self.profiler, 'previews', cpu=False):
+                await self._fetch_previews(self.preview_cache, styles)
+        return styles
 
+    @async_hedged
+    @async_profiled
     async def get_status(self, request_id: UUID) -> PipelineStatusResult:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                self.API_HOST + f'key/api/v1/pipeline/status/{request_id}',
-                headers=self.AUTH_HEADERS,
-            ) as response:
-                if response.status != HTTPStatus.OK:
-                    status = HTTPStatus(response.status)
-                    status_name = status.name
-                    msg_custom = (
-                        PipelineCodeStatusResult[status_name].value
-                        if status_name in PipelineCodeStatusResult.__members__
-                        else response.reason
-                    )
-                    msg = (
-                        f'In response to {response.request_info.url} returned status {status_name} '
-                        f'code {response.status}, reason: {msg_custom}.'
-                    )
-                    raise aiohttp.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status,
-                        message=msg,
-                        headers=response.headers,
-                    )
-                
-                return PipelineStatusResult.model_validate(await response.json())
+        request = self.protocol.get_status(request_id)
+        budget = self.byte_budget
+        if budget is None:
+            return self.protocol.parse_status((await self._send(request)).body)
+
+        key = str(request_id)
+        downloading = 0
+
+        async def admit(content_length: Optional[int]) -> None:
+            nonlocal downloading
+            reserved = budget.reserved(key)
+            downloading = (
+                budget.charge((content_length or 0) - reserved) if reserved
+                else await budget.acquire(content_length or 0)
+            )
+
+        try:
+            result = self.protocol.parse_status((await self._send(request, before_read=admit)).body)
+        except Exception:
+            # The caller is unlikely to poll again after an error, so the job's reservation is not kept for it.
+            await budget.release_key(key)
+            raise
+        finally:
+            await budget.release(downloading)
+        if result.status in [PipelineResultStatus.DONE, PipelineResultStatus.FAIL]:
+            await budget.release_key(key)
+        return result
 
     async def wait_for_completion(
         self,
         request_id: UUID,
-        initial_delay: int,
-        sleep_interval: int = 1,
+        initial_delay: float,
+        sleep_interval: float = 1,
         max_retries: int = 5,
     ) -> PipelineStatusResult:
         await asyncio.sleep(initial_delay)
@@ -216,4 +236,137 @@ class AsyncFBClient(AsyncClientProtocol):
             if status_result.status in [PipelineResultStatus.DONE, PipelineResultStatus.FAIL]:
                 return status_result
             await asyncio.sleep(sleep_interval)
+        if self.byte_budget is not None:
+            await self.byte_budget.release_key(str(request_id))
         raise TimeoutError(f'Failed to get result for request {request_id} after {max_retries} retries.')
+
+    @async_profiled
+    async def decode_result(
+        self,
+        status_result: PipelineStatusResult,
+        processor: Optional[ResultProcessor] = None,
+    ) -> DecodedPipelineResult:
+        with phase(self.profiler, 'decode', cpu=False):
+            return await (processor or self.result_processor).aprocess(status_result)
+
+    def _set_catalogue(self, pipelines: List[Pipeline], styles: List[Style]) -> CatalogueDiff:
+        # Readers keep whatever catalogue they already hold, the new one replaces it in a single assignment.
+        current = self.catalogue if self.catalogue is not None else Catalogue()
+        catalogue, diff = current.refresh(pipelines, styles)
+        self.catalogue = catalogue
+        return diff
+
+    @async_hedged
+    async def _get_styles(self) -> List[Style]:
+        # Hedged on its own, a duplicate request must not download every preview a second time.
+        response = await self._send(self.protocol.get_styles())
+        return self.protocol.parse_styles(response.body)
+
+    async def _fetch_previews(self, cache: PreviewCache, styles: List[Style]) -> None:
+        slots = asyncio.Semaphore(cache.max_concurrency)
+
+        async def fetch(style: Style) -> None:
+            request = cache.request(style.image)
+            if request is None:
+                style.preview_path = cache.path(style.image)
+                return
+            response: Optional[HTTPResponse] = None
+            async with slots:
+                try:
+                    response = await self.transport.send(request)
+                except Exception:
+                    # A missing preview never fails get_styles, the cached copy (if any) is used instead.
+                    response = None
+            style.preview_path = await asyncio.to_thread(cache.update, style.image, response)
+
+        await asyncio.gather(*(fetch(style) for style in styles))
+        await asyncio.to_thread(cache.flush)
+
+    async def _open_connections(self, connections: int) -> int:
+        warmup = getattr(self.transport, 'warmup', None)
+        if warmup is None or connections < 1:
+            return 0
+        opened = await asyncio.gather(*(warmup(url, connections) for url in origins(self.API_HOST, self.STYLES_URL)))
+        return min(int(count) for count in opened)
+
+    async def _submit(
+        self,
+        request: HTTPRequest,
+        num_images: int,
+        width: int,
+        height: int,
+    ) -> Union[RunPipelineResult, RunPipelineBlockedResult]:
+        reserved = (
+            await self.byte_budget.acquire(self.byte_budget.estimate(num_images, width, height))
+            if self.byte_budget else 0
+        )
+        epoch = await self.concurrency_limiter.acquire() if self.concurrency_limiter else 0
+        started = time.monotonic()
+        status_code: Optional[int] = None
+        try:
+            response = await self._transmit(request)
+            status_code = response.status
+            self._check(request, response)
+            result = self.protocol.parse_run_pipeline(response.body)
+        except BaseException as exc:
+            await self._release_budget(reserved)
+            await self._release_slot(epoch, started, is_overload_error(exc, status_code))
+            raise
+        await self._release_slot(
+            epoch, started, is_overload(status_code, result), getattr(result, 'status_time', None),
+        )
+        if isinstance(result, RunPipelineBlockedResult):
+            await self._release_budget(reserved)
+        elif self.byte_budget is not None:
+            self.byte_budget.reserve(str(result.uuid), reserved)
+        return result
+
+    async def _transmit(self, request: HTTPRequest, before_read: Optional[AsyncBeforeRead] = None) -> HTTPResponse:
+        if self.rate_limiter is not None:
+            delay = await offload(self.rate_limiter, self.rate_limiter.reserve)
+            while delay:
+                await asyncio.sleep(delay)
+                delay = await offload(self.rate_limiter, self.rate_limiter.reserve)
+        breaker = self.circuit_breaker
+        if breaker is None:
+            with phase(self.profiler, 'network', cpu=False):
+                return await self.transport.send(request, before_read)
+        await offload(breaker, breaker.check)
+        try:
+            with phase(self.profiler, 'network', cpu=False):
+                response = await self.transport.send(request, before_read)
+        except Exception:
+            await offload(breaker, breaker.record_failure)
+            raise
+        if is_overload(response.status):
+            await offload(breaker, breaker.record_failure)
+        else:
+            await offload(breaker, breaker.record_success)
+        return response
+
+    async def _send(self, request: HTTPRequest, before_read: Optional[AsyncBeforeRead] = None) -> HTTPResponse:
+        response = await self._transmit(request, before_read)
+        self._check(request, response)
+        return response
+
+    def _check(self, request: HTTPRequest, response: HTTPResponse) -> None:
+        if response.status != request.expected_status:
+            raise self.transport.error(
+                request,
+                response,
+                self.protocol.error_message(request, response.status, response.body, response.reason),
+            )
+
+    async def _release_budget(self, nbytes: int) -> None:
+        if self.byte_budget is not None and nbytes:
+            await self.byte_budget.release(nbytes)
+
+    async def _release_slot(
+        self,
+        epoch: int,
+        started: float,
+        overloaded: Optional[bool],
+        status_time: Optional[int] = None,
+    ) -> None:
+        if self.concurrency_limiter is not None:
+            await self.concurrency_limiter.release(epoch, time.monotonic() - started, overloaded, status_time)
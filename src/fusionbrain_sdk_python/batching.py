@@ -0,0 +1,158 @@
+import asyncio
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+from uuid import UUID
+
+from fusionbrain_sdk_python.abstract_client import AsyncClientProtocol
+from fusionbrain_sdk_python.models import (
+    PipelineResult,
+    PipelineStatusResult,
+    RunPipelineBlockedResult,
+    Style,
+)
+
+MAX_NUM_IMAGES = 4
+
+BatchKey = Tuple[UUID, str, Optional[str], Optional[str], int, int]
+BatchResult = Union[PipelineStatusResult, RunPipelineBlockedResult]
+ResultFor = Callable[[int, int], BatchResult]
+
+
+class _Batch:
+    def __init__(self, key: BatchKey, style: Optional[Union[str, Style]]) -> None:
+        self.key = key
+        self.style = style
+        self.num_images = 0
+        self.waiters: List[Tuple[int, asyncio.Future[BatchResult]]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class AsyncPromptBatcher:
+    def __init__(
+        self,
+        client: AsyncClientProtocol,
+        window: float = 0.005,
+        max_num_images: int = MAX_NUM_IMAGES,
+        sleep_interval: float = 1,
+        max_retries: int = 5,
+    ) -> None:
+        if max_num_images < 1:
+            raise ValueError('`max_num_images` must be at least 1.')
+        self.client = client
+        self.window = window
+        self.max_num_images = max_num_images
+        self.sleep_interval = sleep_interval
+        self.max_retries = max_retries
+        self.requests = 0
+        self.submissions = 0
+        self._pending: Dict[BatchKey, _Batch] = {}
+        self._tasks: Set[asyncio.Task[None]] = set()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'submissions': self.submissions,
+            'pending': sum(len(batch.waiters) for batch in self._pending.values()),
+        }
+
+    async def submit(
+        self,
+        pipeline_id: UUID,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+    ) -> BatchResult:
+        if not 1 <= num_images <= self.max_num_images:
+            raise ValueError(f'`num_images` must be between 1 and {self.max_num_images}.')
+        key: BatchKey = (
+            pipeline_id,
+            prompt,
+            negative_prompt or None,
+            style.name if isinstance(style, Style) else style or None,
+            height,
+            width,
+        )
+        batch = self._pending.get(key)
+        if batch is not None and batch.num_images + num_images > self.max_num_images:
+            self._flush(batch)
+            batch = None
+        if batch is None:
+            batch = self._pending[key] = _Batch(key, style)
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush, batch)
+
+        future: asyncio.Future[BatchResult] = asyncio.get_running_loop().create_future()
+        batch.waiters.append((num_images, future))
+        batch.num_images += num_images
+        self.requests += 1
+        if batch.num_images == self.max_num_images:
+            self._flush(batch)
+        # Shielded so that a cancelled caller does not cancel the shared submission.
+        return await asyncio.shield(future)
+
+    async def flush(self) -> None:
+        for batch in list(self._pending.values()):
+            self._flush(batch)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self, batch: _Batch) -> None:
+        if self._pending.get(batch.key) is batch:
+            del self._pending[batch.key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: _Batch) -> None:
+        pipeline_id, prompt, negative_prompt, _, height, width = batch.key
+        self.submissions += 1
+        try:
+            run_result = await self.client.run_pipeline(
+                pipeline_id=pipeline_id,
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                style=batch.style,
+                height=height,
+                width=width,
+                num_images=batch.num_images,
+            )
+            if isinstance(run_result, RunPipelineBlockedResult):
+                self._resolve(batch, lambda _offset, _count: run_result)
+                return
+            status_result = await self.client.wait_for_completion(
+                request_id=run_result.uuid,
+                initial_delay=run_result.status_time,
+                sleep_interval=self.sleep_interval,
+                max_retries=self.max_retries,
+            )
+        except asyncio.CancelledError:
+            for _, future in batch.waiters:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for _, future in batch.waiters:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        self._resolve(batch, lambda offset, count: _slice(status_result, offset, count))
+
+    def _resolve(self, batch: _Batch, result_for: ResultFor) -> None:
+        offset = 0
+        for count, future in batch.waiters:
+            if not future.done():
+                future.set_result(result_for(offset, count))
+            offset += count
+
+
+def _slice(status_result: PipelineStatusResult, offset: int, count: int) -> PipelineStatusResult:
+    if status_result.result is None:
+        return status_result
+    files = status_result.result.files[offset:offset + count]
+    return status_result.model_copy(
+        update={'result': PipelineResult(files=files, censored=status_result.result.censored)},
+    )
+
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from typing import Dict, Hashable, Optional
+
+DEFAULT_BYTES_PER_PIXEL = 2.0
+
+
+class _BudgetState:
+    def __init__(self, max_bytes: int, bytes_per_pixel: float = DEFAULT_BYTES_PER_PIXEL) -> None:
+        if max_bytes <= 0:
+            raise ValueError('`max_bytes` must be a positive number of bytes.')
+        self.max_bytes = max_bytes
+        self.bytes_per_pixel = bytes_per_pixel
+        self.in_flight = 0
+        self.peak = 0
+        self._reservations: Dict[Hashable, int] = {}
+
+    @property
+    def available(self) -> int:
+        return max(self.max_bytes - self.in_flight, 0)
+
+    def estimate(self, num_images: int, width: int, height: int) -> int:
+        return int(num_images * width * height * self.bytes_per_pixel)
+
+    def reserved(self, key: Hashable) -> int:
+        return self._reservations.get(key, 0)
+
+    def _clamp(self, nbytes: int) -> int:
+        # A single payload larger than the whole budget is admitted alone instead of waiting forever.
+        return min(max(nbytes, 0), self.max_bytes)
+
+    def _fits(self, nbytes: int) -> bool:
+        return self.in_flight == 0 or self.in_flight + nbytes <= self.max_bytes
+
+    def _take(self, nbytes: int) -> int:
+        self.in_flight += nbytes
+        self.peak = max(self.peak, self.in_flight)
+        return nbytes
+
+    def _give(self, nbytes: int) -> None:
+        self.in_flight = max(self.in_flight - nbytes, 0)
+
+    def _attach(self, key: Hashable, nbytes: int) -> None:
+        self._reservations[key] = self._reservations.get(key, 0) + nbytes
+
+    def _detach(self, key: Hashable) -> int:
+        return self._reservations.pop(key, 0)
+
+
+class ByteBudget(_BudgetState):
+    def __init__(self, max_bytes: int, bytes_per_pixel: float = DEFAULT_BYTES_PER_PIXEL) -> None:
+        super().__init__(max_bytes, bytes_per_pixel)
+        self._condition = threading.Condition()
+
+    def acquire(self, nbytes: int, timeout: Optional[float] = None) -> int:
+        nbytes = self._clamp(nbytes)
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._fits(nbytes), timeout=timeout):
+                raise TimeoutError(f'Could not admit {nbytes} bytes within {timeout} seconds.')
+            return self._take(nbytes)
+
+    def charge(self, nbytes: int) -> int:
+        with self._condition:
+            return self._take(max(nbytes, 0))
+
+    def release(self, nbytes: int) -> None:
+        with self._condition:
+            self._give(nbytes)
+            self._condition.notify_all()
+
+    def reserve(self, key: Hashable, nbytes: int) -> None:
+        with self._condition:
+            self._attach(key, nbytes)
+
+    def release_key(self, key: Hashable) -> int:
+        with self._condition:
+            nbytes = self._detach(key)
+            self._give(nbytes)
+            self._condition.notify_all()
+            return nbytes
+
+
+class AsyncByteBudget(_BudgetState):
+    def __init__(self, max_bytes: int, bytes_per_pixel: float = DEFAULT_BYTES_PER_PIXEL) -> None:
+        super().__init__(max_bytes, bytes_per_pixel)
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, nbytes: int, timeout: Optional[float] = None) -> int:
+        nbytes = self._clamp(nbytes)
+        async with self._condition:
+            try:
+                await asyncio.wait_for(self._condition.wait_for(lambda: self._fits(nbytes)), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f'Could not admit {nbytes} bytes within {timeout} seconds.') from None
+            return self._take(nbytes)
+
+    def charge(self, nbytes: int) -> int:
+        return self._take(max(nbytes, 0))
+
+    async def release(self, nbytes: int) -> None:
+        async with self._condition:
+            self._give(nbytes)
+            self._condition.notify_all()
+
+    def reserve(self, key: Hashable, nbytes: int) -> None:
+        self._attach(key, nbytes)
+
+    async def release_key(self, key: Hashable) -> int:
+        async with self._condition:
+            nbytes = self._detach(key)
+            self._give(nbytes)
+            self._condition.notify_all()
+            return nbytes
@@ -0,0 +1,174 @@
+import sys
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Hashable, Iterable, Mapping, Optional, Tuple, Union
+from uuid import UUID
+
+from fusionbrain_sdk_python.models import Pipeline, PipelineStatus, PipelineType, Style
+
+_INDEXES = ('name', 'tag', 'type', 'status')
+
+
+@dataclass(frozen=True)
+class CatalogueDiff:
+    added: Tuple[UUID, ...] = ()
+    removed: Tuple[UUID, ...] = ()
+    changed: Tuple[UUID, ...] = ()
+    styles_added: Tuple[str, ...] = ()
+    styles_removed: Tuple[str, ...] = ()
+    styles_changed: Tuple[str, ...] = ()
+
+    @property
+    def unchanged(self) -> bool:
+        return not (
+            self.added or self.removed or self.changed
+            or self.styles_added or self.styles_removed or self.styles_changed
+        )
+
+
+def _key(value: str) -> str:
+    return sys.intern(value.casefold())
+
+
+def _keys(pipeline: Pipeline) -> Iterable[Tuple[str, Hashable]]:
+    yield 'name', _key(pipeline.name)
+    yield 'type', pipeline.type
+    yield 'status', pipeline.status
+    for tag in {_key(tag.name) for tag in pipeline.tags} | {_key(tag.name_en) for tag in pipeline.tags}:
+        yield 'tag', tag
+
+
+class Catalogue:
+    # A catalogue never changes after it is built, so one instance can be read from any number of threads.
+    # Built from a `base`, it reuses every unchanged entry and index bucket of that catalogue and only
+    # re-indexes the pipelines that were added, removed or changed.
+    def __init__(
+        self,
+        pipelines: Iterable[Pipeline] = (),
+        styles: Iterable[Style] = (),
+        base: Optional['Catalogue'] = None,
+    ) -> None:
+        incoming = {pipeline.id: pipeline for pipeline in pipelines}
+        new_styles = {_key(style.name): style for style in styles}
+        old = base.pipelines if base is not None else {}
+        old_styles = base.styles if base is not None else {}
+        added = tuple(pipeline_id for pipeline_id in incoming if pipeline_id not in old)
+        changed = tuple(
+            pipeline_id for pipeline_id, pipeline in incoming.items()
+            if pipeline_id in old and old[pipeline_id] != pipeline
+        )
+        self.diff = CatalogueDiff(
+            added,
+            tuple(pipeline_id for pipeline_id in old if pipeline_id not in incoming),
+            changed,
+            tuple(style.name for key, style in new_styles.items() if key not in old_styles),
+            tuple(style.name for key, style in old_styles.items() if key not in new_styles),
+            tuple(style.name for key, style in new_styles.items() if key in old_styles and old_styles[key] != style),
+        )
+        fresh = {*added, *changed}
+        self._pipelines: Dict[UUID, Pipeline] = {
+            pipeline_id: pipeline if pipeline_id in fresh else old[pipeline_id]
+            for pipeline_id, pipeline in incoming.items()
+        }
+        self._styles: Dict[str, Style] = {
+            key: old_styles[key] if old_styles.get(key) == style else style for key, style in new_styles.items()
+        }
+        self._indexes: Dict[str, Dict[Hashable, Tuple[UUID, ...]]] = (
+            {name: dict(index) for name, index in base.indexes.items()} if base is not None
+            else {name: {} for name in _INDEXES}
+        )
+        for pipeline_id in self.diff.removed + changed:
+            self._unindex(old[pipeline_id])
+        for pipeline_id in changed + added:
+            self._index(incoming[pipeline_id])
+
+    def __len__(self) -> int:
+        return len(self._pipelines)
+
+    def __contains__(self, pipeline_id: object) -> bool:
+        return pipeline_id in self._pipelines
+
+    @property
+    def pipelines(self) -> Mapping[UUID, Pipeline]:
+        return MappingProxyType(self._pipelines)
+
+    @property
+    def styles(self) -> Mapping[str, Style]:
+        return MappingProxyType(self._styles)
+
+    @property
+    def indexes(self) -> Mapping[str, Mapping[Hashable, Tuple[UUID, ...]]]:
+        return MappingProxyType({name: MappingProxyType(index) for name, index in self._indexes.items()})
+
+    def get(self, pipeline_id: UUID) -> Optional[Pipeline]:
+        return self._pipelines.get(pipeline_id)
+
+    def by_name(self, name: str) -> Tuple[Pipeline, ...]:
+        return self._lookup('name', _key(name))
+
+    def by_tag(self, tag: str) -> Tuple[Pipeline, ...]:
+        return self._lookup('tag', _key(tag))
+
+    def by_type(self, pipe_type: PipelineType) -> Tuple[Pipeline, ...]:
+        return self._lookup('type', pipe_type)
+
+    def by_status(self, status: PipelineStatus) -> Tuple[Pipeline, ...]:
+        return self._lookup('status', status)
+
+    def find(
+        self,
+        name: Optional[str] = None,
+        tag: Optional[str] = None,
+        pipe_type: Optional[PipelineType] = None,
+        status: Optional[PipelineStatus] = None,
+    ) -> Tuple[Pipeline, ...]:
+        filters = [
+            (index, key) for index, key in (
+                ('name', _key(name) if name is not None else None),
+                ('tag', _key(tag) if tag is not None else None),
+                ('type', pipe_type),
+                ('status', status),
+            ) if key is not None
+        ]
+        if not filters:
+            return tuple(self._pipelines.values())
+        # Start from the smallest bucket and check the rest by set membership.
+        buckets = sorted((self._indexes[index].get(key, ()) for index, key in filters), key=len)
+        others = [set(bucket) for bucket in buckets[1:]]
+        return tuple(
+            self._pipelines[pipeline_id] for pipeline_id in buckets[0]
+            if all(pipeline_id in other for other in others)
+        )
+
+    def style(self, style: Union[str, Style]) -> Style:
+        name = style.name if isinstance(style, Style) else style
+        found = self._styles.get(_key(name))
+        if found is None:
+            known = ', '.join(sorted(known.name for known in self._styles.values()))
+            raise ValueError(f'Unknown style {name!r}, expected one of: {known}.')
+        return found
+
+    def refresh(
+        self,
+        pipelines: Iterable[Pipeline],
+        styles: Optional[Iterable[Style]] = None,
+    ) -> Tuple['Catalogue', CatalogueDiff]:
+        catalogue = Catalogue(pipelines, self._styles.values() if styles is None else styles, base=self)
+        return (self if catalogue.diff.unchanged else catalogue), catalogue.diff
+
+    def _lookup(self, index: str, key: Hashable) -> Tuple[Pipeline, ...]:
+        return tuple(self._pipelines[pipeline_id] for pipeline_id in self._indexes[index].get(key, ()))
+
+    def _index(self, pipeline: Pipeline) -> None:
+        for index, key in _keys(pipeline):
+            buckets = self._indexes[index]
+            buckets[key] = (*buckets.get(key, ()), pipeline.id)
+
+    def _unindex(self, pipeline: Pipeline) -> None:
+        for index, key in _keys(pipeline):
+            buckets = self._indexes[index]
+            bucket = tuple(pipeline_id for pipeline_id in buckets.get(key, ()) if pipeline_id != pipeline.id)
+            if bucket:
+                buckets[key] = bucket
+            else:
+                buckets.pop(key, None)
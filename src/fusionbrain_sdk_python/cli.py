@@ -0,0 +1,299 @@
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, TextIO
+from uuid import UUID
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.fake_server import FakeServer
+from fusionbrain_sdk_python.models import PipelineStatus, PipelineType, RunPipelineBlockedResult
+
+_INT_FIELDS = ('width', 'height', 'num_images')
+_SUBMIT_FIELDS = ('prompt', 'negative_prompt', 'style', 'width', 'height', 'num_images')
+_IMAGE_SIGNATURES = ((b'\x89PNG\r\n\x1a\n', '.png'), (b'\xff\xd8\xff', '.jpg'), (b'GIF8', '.gif'))
+
+
+def iter_records(path: Path, input_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    input_format = input_format or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+    with path.open(encoding='utf-8', newline='') as fp:
+        rows: Iterator[Dict[str, Any]] = (
+            csv.DictReader(fp) if input_format == 'csv'
+            else (json.loads(line) for line in fp if line.strip())
+        )
+        for index, row in enumerate(rows):
+            record = {key: value for key, value in row.items() if value not in (None, '')}
+            for field in _INT_FIELDS:
+                if field in record:
+                    record[field] = int(record[field])
+            record['id'] = str(record.get('id', index))
+            yield record
+
+
+def check_record_id(record_id: str) -> None:
+    # Ids become file names inside the output directory, so they must not be able to point anywhere else.
+    if record_id in ('', '.', '..') or any(char in record_id for char in '/\\:\x00'):
+        raise ValueError(f'Record id {record_id!r} cannot be used as a file name.')
+
+
+def image_suffix(image: bytes) -> str:
+    for signature, suffix in _IMAGE_SIGNATURES:
+        if image.startswith(signature):
+            return suffix
+    if image[:4] == b'RIFF' and image[8:12] == b'WEBP':
+        return '.webp'
+    return '.bin'
+
+
+def count_records(path: Path, input_format: Optional[str] = None) -> int:
+    return sum(1 for _ in iter_records(path, input_format))
+
+
+def load_completed(manifest: Path) -> Set[str]:
+    if not manifest.exists():
+        return set()
+    completed = set()
+    with manifest.open(encoding='utf-8') as fp:
+        for line in fp:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run is simply retried.
+                continue
+            if entry.get('status') == 'DONE':
+                completed.add(str(entry['id']))
+    return completed
+
+
+class Progress:
+    def __init__(self, total: int, stream: TextIO = sys.stderr, interval: float = 1.0) -> None:
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._last_report = 0.0
+
+    def update(self, ok: bool) -> None:
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+        now = time.monotonic()
+        if now - self._last_report >= self.interval or self.done + self.failed == self.total:
+            self._last_report = now
+            self.report()
+
+    def report(self) -> None:
+        finished = self.done + self.failed
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        rate = finished / elapsed
+        eta = (self.total - finished) / rate if rate else float('inf')
+        self.stream.write(
+            f'\r{finished}/{self.total} done, {self.failed} failed, {rate:.2f} jobs/s, ETA {eta:.0f}s',
+        )
+        self.stream.flush()
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        client: AsyncFBClient,
+        output: Path,
+        manifest: Path,
+        pipeline_id: Optional[str] = None,
+        concurrency: int = 4,
+        sleep_interval: float = 1.0,
+        max_retries: int = 30,
+        progress: Optional[Progress] = None,
+    ) -> None:
+        self.client = client
+        self.output = output
+        self.manifest = manifest
+        self.pipeline_id = pipeline_id
+        self.concurrency = concurrency
+        self.sleep_interval = sleep_interval
+        self.max_retries = max_retries
+        self.progress = progress
+        self.failed = 0
+
+    async def run(self, records: Iterator[Dict[str, Any]], skip: Set[str]) -> None:
+        self.output.mkdir(parents=True, exist_ok=True)
+        if self.pipeline_id is None:
+            pipelines = await self.client.get_pipelines_by_type(PipelineType.TEXT2IMAGE)
+            active = [pipe for pipe in pipelines if pipe.status == PipelineStatus.ACTIVE] or pipelines
+            self.pipeline_id = str(active[0].id)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        with self.manifest.open('a', encoding='utf-8') as manifest:
+            workers = [asyncio.create_task(self._worker(queue, manifest)) for _ in range(self.concurrency)]
+            try:
+                for record in records:
+                    if record['id'] not in skip:
+                        await self._put(queue, record, workers)
+                for _ in workers:
+                    await self._put(queue, None, workers)
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _put(self, queue: asyncio.Queue, item: Optional[Dict[str, Any]], workers: List[asyncio.Task]) -> None:
+        # A worker that fails stops draining the queue, so its error is raised instead of waiting on a full
+        # queue forever.
+        if not queue.full():
+            queue.put_nowait(item)
+            return
+        put = asyncio.ensure_future(queue.put(item))
+        pending = {put, *workers}
+        while not put.done():
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not put and (task.cancelled() or task.exception() is not None):
+                    put.cancel()
+                    task.result()
+
+    async def _worker(self, queue: asyncio.Queue, manifest: TextIO) -> None:
+        while True:
+            record = await queue.get()
+            if record is None:
+                return
+            entry = await self._generate(record)
+            manifest.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            manifest.flush()
+            self.failed += entry['status'] != 'DONE'
+            if self.progress is not None:
+                self.progress.update(entry['status'] == 'DONE')
+
+    async def _generate(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.monotonic()
+        entry: Dict[str, Any] = {'id': record['id'], 'prompt': record.get('prompt')}
+        try:
+            check_record_id(record['id'])
+            run_result = await self.client.run_pipeline(
+                pipeline_id=UUID(self.pipeline_id),
+                **{key: record[key] for key in _SUBMIT_FIELDS if key in record},
+            )
+            if isinstance(run_result, RunPipelineBlockedResult):
+                entry.update(status=run_result.model_status.value)
+                return entry
+            status_result = await self.client.wait_for_completion(
+                request_id=run_result.uuid,
+                initial_delay=run_result.status_time,
+                sleep_interval=self.sleep_interval,
+                max_retries=self.max_retries,
+            )
+            decoded = await self.client.decode_result(status_result)
+            files = await asyncio.to_thread(self._write, record['id'], decoded.files)
+            entry.update(
+                uuid=str(status_result.uuid),
+                status=status_result.status.value,
+                censored=decoded.censored,
+                files=files,
+            )
+        except Exception as exc:
+            entry.update(status='ERROR', error=f'{type(exc).__name__}: {exc}')
+        finally:
+            entry['elapsed'] = round(time.monotonic() - started, 3)
+        return entry
+
+    def _write(self, record_id: str, images: List[bytes]) -> List[str]:
+        paths = []
+        for index, image in enumerate(images):
+            path = self.output / f'{record_id}_{index}{image_suffix(image)}'
+            path.write_bytes(image)
+            paths.append(str(path))
+        return paths
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='fusionbrain', description='FusionBrain command-line tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help='Generate images for every prompt in a JSONL or CSV file.')
+    generate.add_argument('--input', required=True, type=Path, help='JSONL or CSV file with a `prompt` field.')
+    generate.add_argument('--format', choices=('jsonl', 'csv'), help='Input format, guessed from the suffix.')
+    generate.add_argument('--output', type=Path, default=Path('fusionbrain-output'), help='Directory for images.')
+    generate.add_argument('--manifest', type=Path, help='Results manifest, `<output>/manifest.jsonl` by default.')
+    generate.add_argument('--resume', action='store_true', help='Skip prompts already DONE in the manifest.')
+    generate.add_argument('--pipeline-id', help='Pipeline to use, the first active TEXT2IMAGE one by default.')
+    generate.add_argument('--concurrency', type=int, default=4, help='Number of jobs in flight.')
+    generate.add_argument('--sleep-interval', type=float, default=1.0, help='Seconds between status polls.')
+    generate.add_argument('--max-retries', type=int, default=30, help='Status polls per job before giving up.')
+    generate.add_argument('--api-host', help='Override the API host, e.g. a local fake server.')
+    generate.add_argument('--styles-url', help='Override the styles URL.')
+    generate.add_argument('--x-key', help='API key, `FB_API_KEY` by default.')
+    generate.add_argument('--x-secret', help='API secret, `FB_API_SECRET` by default.')
+    generate.add_argument('--dry-run', action='store_true', help='Run against an in-process fake server.')
+    generate.add_argument('--quiet', action='store_true', help='Do not report progress.')
+
+    fake = commands.add_parser('fake-server', help='Serve a local fake FusionBrain API for dry runs.')
+    fake.add_argument('--host', default='127.0.0.1')
+    fake.add_argument('--port', type=int, default=8080)
+    fake.add_argument('--generation-time', type=float, default=1.0, help='Seconds until a job is DONE.')
+    fake.add_argument('--image-size', type=int, default=64 * 1024, help='Size of every fake image in bytes.')
+    return parser
+
+
+async def _generate(args: argparse.Namespace) -> int:
+    manifest = args.manifest or args.output / 'manifest.jsonl'
+    skip = load_completed(manifest) if args.resume else set()
+    total = count_records(args.input, args.format) - len(skip)
+    progress = None if args.quiet else Progress(total=max(total, 0))
+    server: Optional[FakeServer] = None
+    if args.dry_run:
+        server = await FakeServer(generation_time=0.0).start()
+        args.api_host, args.styles_url = server.url, server.styles_url
+        args.x_key, args.x_secret = args.x_key or 'dry-run', args.x_secret or 'dry-run'
+    try:
+        async with AsyncFBClient(
+            x_key=args.x_key,
+            x_secret=args.x_secret,
+            api_host=args.api_host,
+            styles_url=args.styles_url,
+        ) as client:
+            runner = BatchRunner(
+                client=client,
+                output=args.output,
+                manifest=manifest,
+                pipeline_id=args.pipeline_id,
+                concurrency=args.concurrency,
+                sleep_interval=args.sleep_interval,
+                max_retries=args.max_retries,
+                progress=progress,
+            )
+            await runner.run(iter_records(args.input, args.format), skip)
+    finally:
+        if server is not None:
+            await server.stop()
+        if progress is not None:
+            sys.stderr.write('\n')
+    return 0 if runner.failed == 0 else 1
+
+
+async def _serve_fake(args: argparse.Namespace) -> int:
+    server = FakeServer(
+        host=args.host,
+        port=args.port,
+        generation_time=args.generation_time,
+        image_size=args.image_size,
+    )
+    async with server:
+        sys.stderr.write(f'Fake FusionBrain API on {server.url} (styles: {server.styles_url})\n')
+        await asyncio.Event().wait()
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    command = _generate if args.command == 'generate' else _serve_fake
+    try:
+        return asyncio.run(command(args))
+    except KeyboardInterrupt:
+        return 130
+
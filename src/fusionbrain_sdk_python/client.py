@@ -1,19 +1,25 @@
-import json
-import os
+import threading
 import time
-from http import HTTPStatus
-from typing import List, Optional, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import TracebackType
+from typing import Any, Iterable, List, Mapping, Optional, Tuple, Type, Union
 from uuid import UUID
 
 from dotenv import load_dotenv
-from requests.exceptions import HTTPError
 
 from fusionbrain_sdk_python.abstract_client import SyncClientProtocol
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.background import BackgroundLoop
+from fusionbrain_sdk_python.budget import ByteBudget
+from fusionbrain_sdk_python.catalogue import Catalogue, CatalogueDiff
+from fusionbrain_sdk_python.compression import CompressionPolicy
+from fusionbrain_sdk_python.concurrency import AIMDLimiter, is_overload, is_overload_error
 from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.hedging import HedgePolicy, hedged
+from fusionbrain_sdk_python.limits import RateLimiter
 from fusionbrain_sdk_python.models import (
+    DecodedPipelineResult,
     Pipeline,
-    PipelineAvailabilityResult,
-    PipelineCodeStatusResult,
     PipelineResultStatus,
     PipelineStatus,
     PipelineStatusResult,
@@ -22,64 +28,155 @@ from fusionbrain_sdk_python.models import (
     RunPipelineResult,
     Style,
 )
-from fusionbrain_sdk_python.session import Session
+from fusionbrain_sdk_python.previews import PreviewCache
+from fusionbrain_sdk_python.processing import ResultProcessor
+from fusionbrain_sdk_python.profiling import Profiler, phase, profiled
+from fusionbrain_sdk_python.protocol import FBProtocol, HTTPRequest, RunTemplate
+from fusionbrain_sdk_python.shared_state import SharedCircuitBreaker
+from fusionbrain_sdk_python.transport import (
+    AiohttpTransport,
+    BackgroundTransport,
+    BeforeRead,
+    HTTPResponse,
+    RequestsTransport,
+    Transport,
+)
+from fusionbrain_sdk_python.warmup import WarmupResult, origins, resolve
 
 load_dotenv()
 
 
 class FBClient(SyncClientProtocol):
-    def __init__(self, x_key: Optional[str] = None, x_secret: Optional[str] = None) -> None:
-        _FB_API_KEY = os.getenv('FB_API_KEY') or x_key
-        _FB_API_SECRET = os.getenv('FB_API_SECRET') or x_secret
-        if not _FB_API_KEY or not _FB_API_SECRET:
-            raise ConfigError(
-                'Please set `FB_API_KEY` and `FB_API_SECRET` tokens in initial method or environment variables.',
-            )
-        self.AUTH_HEADERS = {
-            'X-Key': f'Key {_FB_API_KEY}',
-            'X-Secret': f'Secret {_FB_API_SECRET}',
-        }
-        self.session = Session().get_session()
+    def __init__(
+        self,
+        x_key: Optional[str] = None,
+        x_secret: Optional[str] = None,
+        api_host: Optional[str] = None,
+        styles_url: Optional[str] = None,
+        result_processor: Optional[ResultProcessor] = None,
+        byte_budget: Optional[ByteBudget] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        concurrency_limiter: Optional[AIMDLimiter] = None,
+        transport: Optional[Transport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[SharedCircuitBreaker] = None,
+        background_loop: bool = False,
+        compression: Optional[CompressionPolicy] = None,
+        profiler: Optional[Profiler] = None,
+        preview_cache: Optional[PreviewCache] = None,
+    ) -> None:
+        self.protocol = FBProtocol(
+            x_key=x_key,
+            x_secret=x_secret,
+            api_host=api_host or self.API_HOST,
+            styles_url=styles_url or self.STYLES_URL,
+        )
+        self.API_HOST = self.protocol.api_host
+        self.STYLES_URL = self.protocol.styles_url
+        self.AUTH_HEADERS = self.protocol.auth_headers
+        self.profiler = profiler
+        self.protocol.profiler = profiler
+        self.preview_cache = preview_cache
+        self.result_processor = result_processor or ResultProcessor()
+        self._owns_result_processor = result_processor is None
+        self.byte_budget = byte_budget
+        self.hedge_policy = hedge_policy
+        self.concurrency_limiter = concurrency_limiter
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.pipelines: Optional[List[Pipeline]] = None
+        self.styles: Optional[List[Style]] = None
+        self.catalogue: Optional[Catalogue] = None
+        self.ready = threading.Event()
+        self.compression = compression
+        self.loop: Optional[BackgroundLoop] = None
+        self.async_client: Optional[AsyncFBClient] = None
+        if transport is not None and compression is not None:
+            raise ConfigError('`compression` applies to the default transport, pass it to your transport instead.')
+        if not background_loop:
+            self.transport: Transport = transport or RequestsTransport(compression=compression)
+            return
+        if transport is not None:
+            raise ConfigError('`transport` cannot be combined with `background_loop`, which uses the aiohttp engine.')
+        # Blocking calls and the batch helpers share one pooled aiohttp session on a private event loop.
+        self.loop = BackgroundLoop()
+        engine = AiohttpTransport(compression=compression)
+        self.transport = BackgroundTransport(self.loop, engine)
+        self.async_client = AsyncFBClient(
+            x_key=x_key,
+            x_secret=x_secret,
+            api_host=self.API_HOST,
+            styles_url=self.STYLES_URL,
+            result_processor=self.result_processor,
+            hedge_policy=hedge_policy,
+            transport=engine,
+            rate_limiter=rate_limiter,
+            circuit_breaker=circuit_breaker,
+            profiler=profiler,
+            preview_cache=preview_cache,
+        )
+
+    def __enter__(self) -> 'FBClient':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
 
+    def close(self) -> None:
+        if self.profiler is not None:
+            self.profiler.stop()
+        self.transport.close()
+        if self.loop is not None:
+            self.loop.close()
+        if self._owns_result_processor:
+            self.result_processor.close()
+        if self.hedge_policy is not None:
+            self.hedge_policy.close()
+
+    def warmup(self, connections: int = 4) -> WarmupResult:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            for resolved in [pool.submit(resolve, url) for url in (self.API_HOST, self.STYLES_URL)]:
+                resolved.result()
+            opened = pool.submit(self._open_connections, connections)
+            pipelines = pool.submit(self.get_pipelines)
+            styles = pool.submit(self.get_styles)
+            result = WarmupResult(pipelines.result(), styles.result(), opened.result(), time.monotonic() - started)
+        self.pipelines = result.pipelines
+        self.styles = result.styles
+        self._set_catalogue(result.pipelines, result.styles)
+        self.ready.set()
+        return result
+
+    def refresh_catalogue(self) -> CatalogueDiff:
+        pipelines = self.get_pipelines()
+        styles = self.get_styles()
+        return self._set_catalogue(pipelines, styles)
+
+    @hedged
+    @profiled
     def get_pipelines(self) -> List[Pipeline]:
-        response = self.session.get(self.API_HOST + 'key/api/v1/pipelines', headers=self.AUTH_HEADERS)
-        if response.status_code != HTTPStatus.OK:
-            msg = (
-                f'In response to {response.request.url} returned status'
-                f'code {response.status_code}. Reason: {response.content.decode()}'
-            )
-            raise HTTPError(msg)
-        return [Pipeline.model_validate(pipe) for pipe in response.json()]
+        response = self._send(self.protocol.get_pipelines())
+        return self.protocol.parse_pipelines(response.body)
 
+    @hedged
+    @profiled
     def get_pipelines_by_type(self, pipe_type: PipelineType) -> List[Pipeline]:
-        response = self.session.get(
-            self.API_HOST + 'key/api/v1/pipelines',
-            headers=self.AUTH_HEADERS,
-            params={'type': pipe_type.value},
-        )
-        if response.status_code != HTTPStatus.OK:
-            msg = (
-                f'In response to {response.request.url} returned status'
-                f'code {response.status_code}. Reason: {response.content.decode()}'
-            )
-            raise HTTPError(msg)
-        
-        return [Pipeline.model_validate(pipe) for pipe in response.json()]
+        response = self._send(self.protocol.get_pipelines_by_type(pipe_type))
+        return self.protocol.parse_pipelines(response.body)
 
+    @hedged
+    @profiled
     def get_pipeline_availability(self, pipeline_id: UUID) -> PipelineStatus:
-        response = self.session.get(
-            self.API_HOST + f'key/api/v1/pipeline/{str(pipeline_id)}/availability',
-            headers=self.AUTH_HEADERS,
-        )
-        if response.status_code != HTTPStatus.OK:
-            msg = (
-                f'In response to {response.request.url} returned status'
-                f'code {response.status_code}. Reason: {response.content.decode()}'
-            )
-            raise HTTPError(msg)
-        result = PipelineAvailabilityResult.model_validate(response.json())
-        return result.status
+        response = self._send(self.protocol.get_pipeline_availability(pipeline_id))
+        return self.protocol.parse_pipeline_availability(response.body)
 
+    @profiled
     def run_pipeline(
         self,
         pipeline_id: UUID,
@@ -89,79 +186,84 @@ class FBClient(SyncClientProtocol):
         height: int = 1024,
         width: int = 1024,
         num_images: int = 1,
-    ) -> Union[RunPipelineResult, RunPipelineBlockedResult]: 
-        optional = {
-            **({'negativePromptDecoder': negative_prompt} if negative_prompt else {}),
-            **({'style': style.name if isinstance(style, Style) else style} if style else {}),
-        }
-        params = {
-            'type': 'GENERATE',
-            'numImages': num_images,
-            'width': width,
-            'height': height,
-            'generateParams': {
-                'query': prompt,
-            },
-            **optional,
-        }
-
-        data = {
-            'pipeline_id': (None, str(pipeline_id)),
-            'params': (None, json.dumps(params), 'application/json'),
-        }
-        response = self.session.post(
-            self.API_HOST + 'key/api/v1/pipeline/run',
-            headers=self.AUTH_HEADERS,
-            files=data,  # type: ignore
+    ) -> Union[RunPipelineResult, RunPipelineBlockedResult]:
+        if style is not None and self.catalogue is not None:
+            style = self.catalogue.style(style)
+        request = self.protocol.run_pipeline(
+            pipeline_id=pipeline_id,
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            style=style,
+            height=height,
+            width=width,
+            num_images=num_images,
         )
-        if response.status_code != HTTPStatus.CREATED:
-            msg = (
-                f'In response to {response.request.url} returned status'
-                f'code {response.status_code}. Reason: {response.content.decode()}'
-            )
-            raise HTTPError(msg)
+        return self._submit(request, num_images, width, height)
 
-        if response.json().get('model_status'):
-            return RunPipelineBlockedResult.model_validate(response.json())
-        return RunPipelineResult.model_validate(response.json())
+    def template(
+        self,
+        pipeline_id: UUID,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+    ) -> RunTemplate:
+        if style is not None and self.catalogue is not None:
+            style = self.catalogue.style(style)
+        return self.protocol.run_template(pipeline_id, negative_prompt, style, height, width, num_images)
+
+    @profiled
+    def run_template(
+        self,
+        template: RunTemplate,
+        prompt: str,
+    ) -> Union[RunPipelineResult, RunPipelineBlockedResult]:
+        return self._submit(template.request(prompt), template.num_images, template.width, template.height)
 
+    @profiled
     def get_styles(self) -> List[Style]:
-        response = self.session.get(
-            self.STYLES_URL,
-        )
-        if response.status_code != HTTPStatus.OK:
-            msg = (
-                f'In response to {response.request.url} returned status'
-                f'code {response.status_code}. Reason: {response.content.decode()}'
-            )
-            raise HTTPError(msg)
-        return [Style.model_validate(res) for res in response.json()]
+        styles = self._get_styles()
+        if self.preview_cache is not None:
+            with phase(self.profiler, 'previews'):
+                self._fetch_previews(self.preview_cache, styles)
+        return styles
 
+    @hedged
+    @profiled
     def get_status(self, request_id: UUID) -> PipelineStatusResult:
-        response = self.session.get(
-            self.API_HOST + f'key/api/v1/pipeline/status/{request_id}',
-            headers=self.AUTH_HEADERS,
-        )
-        if response.status_code != HTTPStatus.OK:
-            status = HTTPStatus(response.status_code)
-            status_name = status.name
-            msg_custom = (
-                PipelineCodeStatusResult[status_name].value if status_name in PipelineCodeStatusResult.__members__
-                else response.reason
-            )
-            msg = (
-                f'In response to {response.request.url} returned status {status_name} '
-                f'code {response.status_code}, reason: {msg_custom}.'
+        request = self.protocol.get_status(request_id)
+        budget = self.byte_budget
+        if budget is None:
+            return self.protocol.parse_status(self._send(request).body)
+
+        key = str(request_id)
+        downloading = 0
+
+        def admit(content_length: Optional[int]) -> None:
+            nonlocal downloading
+            reserved = budget.reserved(key)
+            downloading = (
+                budget.charge((content_length or 0) - reserved) if reserved else budget.acquire(content_length or 0)
             )
-            raise HTTPError(msg)
-        
-        return PipelineStatusResult.model_validate(response.json())
+
+        try:
+            result = self.protocol.parse_status(self._send(request, before_read=admit).body)
+        except Exception:
+            # The caller is unlikely to poll again after an error, so the job's reservation is not kept for it.
+            budget.release_key(key)
+            raise
+        finally:
+            budget.release(downloading)
+        if result.status in [PipelineResultStatus.DONE, PipelineResultStatus.FAIL]:
+            budget.release_key(key)
+        return result
 
     def wait_for_completion(
         self,
         request_id: UUID,
-        initial_delay: int,
-        sleep_interval: int = 1,
+        initial_delay: float,
+        sleep_interval: float = 1,
         max_retries: int = 5,
     ) -> PipelineStatusResult:
         time.sleep(initial_delay)
@@ -170,4 +272,174 @@ class FBClient(SyncClientProtocol):
             if status_result.status in [PipelineResultStatus.DONE, PipelineResultStatus.FAIL]:
                 return status_result
             time.sleep(sleep_interval)
+        if self.byte_budget is not None:
+            self.byte_budget.release_key(str(request_id))
         raise TimeoutError(f'Failed to get result for request {request_id} after {max_retries} retries.')
+
+    @profiled
+    def decode_result(
+        self,
+        status_result: PipelineStatusResult,
+        processor: Optional[ResultProcessor] = None,
+    ) -> DecodedPipelineResult:
+        with phase(self.profiler, 'decode'):
+            return (processor or self.result_processor).process(status_result)
+
+    def run_pipeline_batch(
+        self,
+        requests: Iterable[Mapping[str, Any]],
+    ) -> List[Future[Union[RunPipelineResult, RunPipelineBlockedResult]]]:
+        loop, engine = self._engine()
+        return [loop.submit(engine.run_pipeline(**request)) for request in requests]
+
+    def run_template_batch(
+        self,
+        template: RunTemplate,
+        prompts: Iterable[str],
+    ) -> List[Future[Union[RunPipelineResult, RunPipelineBlockedResult]]]:
+        loop, engine = self._engine()
+        return [loop.submit(engine.run_template(template, prompt)) for prompt in prompts]
+
+    def get_status_batch(self, request_ids: Iterable[UUID]) -> List[Future[PipelineStatusResult]]:
+        loop, engine = self._engine()
+        return [loop.submit(engine.get_status(request_id)) for request_id in request_ids]
+
+    def wait_for_completion_batch(
+        self,
+        request_ids: Iterable[UUID],
+        initial_delay: float,
+        sleep_interval: float = 1,
+        max_retries: int = 5,
+    ) -> List[Future[PipelineStatusResult]]:
+        loop, engine = self._engine()
+        return [
+            loop.submit(engine.wait_for_completion(request_id, initial_delay, sleep_interval, max_retries))
+            for request_id in request_ids
+        ]
+
+    def _engine(self) -> Tuple[BackgroundLoop, AsyncFBClient]:
+        if self.loop is None or self.async_client is None:
+            raise ConfigError('Batch helpers need the background engine, pass `background_loop=True`.')
+        if self.byte_budget is not None or self.concurrency_limiter is not None:
+            # Both wait by blocking the calling thread, which on the engine's loop would stall every call.
+            raise ConfigError('`byte_budget` and `concurrency_limiter` only apply to blocking calls, not to batches.')
+        return self.loop, self.async_client
+
+    def _set_catalogue(self, pipelines: List[Pipeline], styles: List[Style]) -> CatalogueDiff:
+        # Readers keep whatever catalogue they already hold, the new one replaces it in a single assignment.
+        current = self.catalogue if self.catalogue is not None else Catalogue()
+        catalogue, diff = current.refresh(pipelines, styles)
+        self.catalogue = catalogue
+        if self.async_client is not None:
+            self.async_client.catalogue = catalogue
+        return diff
+
+    @hedged
+    def _get_styles(self) -> List[Style]:
+        # Hedged on its own, a duplicate request must not download every preview a second time.
+        response = self._send(self.protocol.get_styles())
+        return self.protocol.parse_styles(response.body)
+
+    def _fetch_previews(self, cache: PreviewCache, styles: List[Style]) -> None:
+        def fetch(style: Style) -> None:
+            request = cache.request(style.image)
+            if request is None:
+                style.preview_path = cache.path(style.image)
+                return
+            response: Optional[HTTPResponse] = None
+            try:
+                response = self.transport.send(request)
+            except Exception:
+                # A missing preview never fails get_styles, the cached copy (if any) is used instead.
+                response = None
+            style.preview_path = cache.update(style.image, response)
+
+        with ThreadPoolExecutor(max_workers=cache.max_concurrency) as pool:
+            list(pool.map(fetch, styles))
+        cache.flush()
+
+    def _open_connections(self, connections: int) -> int:
+        warmup = getattr(self.transport, 'warmup', None)
+        if warmup is None or connections < 1:
+            return 0
+        hosts = origins(self.API_HOST, self.STYLES_URL)
+        with ThreadPoolExecutor(max_workers=len(hosts)) as pool:
+            return min(pool.map(lambda url: int(warmup(url, connections)), hosts))
+
+    def _submit(
+        self,
+        request: HTTPRequest,
+        num_images: int,
+        width: int,
+        height: int,
+    ) -> Union[RunPipelineResult, RunPipelineBlockedResult]:
+        reserved = (
+            self.byte_budget.acquire(self.byte_budget.estimate(num_images, width, height)) if self.byte_budget else 0
+        )
+        epoch = self.concurrency_limiter.acquire() if self.concurrency_limiter else 0
+        started = time.monotonic()
+        status_code: Optional[int] = None
+        try:
+            response = self._transmit(request)
+            status_code = response.status
+            self._check(request, response)
+            result = self.protocol.parse_run_pipeline(response.body)
+        except BaseException as exc:
+            self._release_budget(reserved)
+            self._release_slot(epoch, started, is_overload_error(exc, status_code))
+            raise
+        self._release_slot(epoch, started, is_overload(status_code, result), getattr(result, 'status_time', None))
+        if isinstance(result, RunPipelineBlockedResult):
+            self._release_budget(reserved)
+        elif self.byte_budget is not None:
+            self.byte_budget.reserve(str(result.uuid), reserved)
+        return result
+
+    def _transmit(self, request: HTTPRequest, before_read: Optional[BeforeRead] = None) -> HTTPResponse:
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve()
+            while delay:
+                time.sleep(delay)
+                delay = self.rate_limiter.reserve()
+        if self.circuit_breaker is None:
+            with phase(self.profiler, 'network'):
+                return self.transport.send(request, before_read)
+        self.circuit_breaker.check()
+        try:
+            with phase(self.profiler, 'network'):
+                response = self.transport.send(request, before_read)
+        except Exception:
+            self.circuit_breaker.record_failure()
+            raise
+        if is_overload(response.status):
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+        return response
+
+    def _send(self, request: HTTPRequest, before_read: Optional[BeforeRead] = None) -> HTTPResponse:
+        response = self._transmit(request, before_read)
+        self._check(request, response)
+        return response
+
+    def _check(self, request: HTTPRequest, response: HTTPResponse) -> None:
+        if response.status != request.expected_status:
+            raise self.transport.error(
+                request,
+                response,
+                self.protocol.error_message(request, response.status, response.body, response.reason),
+            )
+
+    def _release_budget(self, nbytes: int) -> None:
+        if self.byte_budget is not None and nbytes:
+            self.byte_budget.release(nbytes)
+
+    def _release_slot(
+        self,
+        epoch: int,
+        started: float,
+        overloaded: Optional[bool],
+        status_time: Optional[int] = None,
+    ) -> None:
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.release(epoch, time.monotonic() - started, overloaded, status_time)
@@ -0,0 +1,187 @@
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from fusionbrain_sdk_python.exceptions import ConfigError
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover
+    brotli = None  # type: ignore[assignment]
+
+try:
+    import zstandard  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore[assignment]
+
+IDENTITY = 'identity'
+CHUNK_SIZE = 64 * 1024
+
+
+def available_encodings() -> List[str]:
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    return [*encodings, 'gzip', 'deflate']
+
+
+class Decoder:
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding.strip().lower() or IDENTITY
+        self._started = False
+        self._decoder: Any = None
+        if self.encoding in ('gzip', 'x-gzip'):
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding == 'deflate':
+            self._decoder = zlib.decompressobj()
+        elif self.encoding == 'br' and brotli is not None:
+            self._decoder = brotli.Decompressor()
+        elif self.encoding == 'zstd' and zstandard is not None:
+            self._decoder = zstandard.ZstdDecompressor().decompressobj()
+        elif self.encoding != IDENTITY:
+            raise ConfigError(f'Response uses Content-Encoding {self.encoding!r}, which cannot be decoded here.')
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._decoder is None:
+            return chunk
+        if self.encoding == 'br':
+            return bytes(self._decoder.process(chunk))
+        if self.encoding == 'deflate' and not self._started:
+            self._started = True
+            try:
+                return bytes(self._decoder.decompress(chunk))
+            except zlib.error:
+                # Some servers send a raw deflate stream without the zlib header.
+                self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+        return bytes(self._decoder.decompress(chunk))
+
+    def flush(self) -> bytes:
+        if self.encoding in ('gzip', 'x-gzip', 'deflate'):
+            return bytes(self._decoder.flush())
+        return b''
+
+
+@dataclass
+class _EndpointStats:
+    requests: int = 0
+    wire_bytes: int = 0
+    decoded_bytes: int = 0
+    compressed_responses: int = 0
+    decode_seconds: float = 0.0
+    recent_wire_bytes: float = 0.0
+    recent_decoded_bytes: float = 0.0
+    recent_decode_seconds: float = 0.0
+    skipped: bool = False
+
+
+class CompressionPolicy:
+    def __init__(
+        self,
+        encodings: Optional[Sequence[str]] = None,
+        min_savings: float = 0.1,
+        bandwidth: float = 12.5e6,
+        min_samples: int = 5,
+        probe_every: int = 100,
+    ) -> None:
+        self.encodings = list(encodings) if encodings is not None else available_encodings()
+        unsupported = set(self.encodings) - set(available_encodings())
+        if unsupported:
+            raise ConfigError(
+                f'Cannot decode {", ".join(sorted(unsupported))}. '
+                'Install the codecs with `pip install fusionbrain-sdk-python[compression]`.',
+            )
+        if min_samples < 1:
+            raise ValueError('`min_samples` must be at least 1.')
+        self.min_savings = min_savings
+        self.bandwidth = bandwidth
+        self.min_samples = min_samples
+        self.probe_every = probe_every
+        self._endpoints: Dict[str, _EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def accept_encoding(self, endpoint: str) -> str:
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, _EndpointStats())
+            stats.requests += 1
+            # A skipped endpoint still asks for compression now and then, in case the payloads changed.
+            if not self.encodings or (stats.skipped and stats.requests % self.probe_every):
+                return IDENTITY
+        return ', '.join(self.encodings)
+
+    def decoded_size(self, endpoint: str, encoding: str, wire_bytes: Optional[int]) -> Optional[int]:
+        if wire_bytes is None or encoding in ('', IDENTITY):
+            return wire_bytes
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None or not stats.recent_wire_bytes:
+                return wire_bytes
+            return int(wire_bytes * stats.recent_decoded_bytes / stats.recent_wire_bytes)
+
+    def record(self, endpoint: str, encoding: str, wire_bytes: int, decoded_bytes: int, decode_seconds: float) -> None:
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, _EndpointStats())
+            stats.wire_bytes += wire_bytes
+            stats.decoded_bytes += decoded_bytes
+            if encoding in ('', IDENTITY):
+                return
+            stats.compressed_responses += 1
+            stats.decode_seconds += decode_seconds
+            # The decision follows exponentially decayed sums worth about `min_samples` responses, so a probe of
+            # payloads that have become compressible can outweigh a long history of incompressible ones.
+            keep = 1 - 1 / self.min_samples
+            stats.recent_wire_bytes = stats.recent_wire_bytes * keep + wire_bytes
+            stats.recent_decoded_bytes = stats.recent_decoded_bytes * keep + decoded_bytes
+            stats.recent_decode_seconds = stats.recent_decode_seconds * keep + decode_seconds
+            if stats.compressed_responses < self.min_samples:
+                return
+            # Compression pays off when it saves a meaningful share of the bytes and the transfer time saved
+            # at `bandwidth` exceeds the time spent decompressing.
+            saved = stats.recent_decoded_bytes - stats.recent_wire_bytes
+            stats.skipped = (
+                saved < self.min_savings * stats.recent_decoded_bytes
+                or saved / self.bandwidth < stats.recent_decode_seconds
+            )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                endpoint: {
+                    'requests': stats.requests,
+                    'wire_bytes': stats.wire_bytes,
+                    'decoded_bytes': stats.decoded_bytes,
+                    'ratio': stats.wire_bytes / stats.decoded_bytes if stats.decoded_bytes else 1.0,
+                    'compressed_responses': stats.compressed_responses,
+                    'decode_seconds': stats.decode_seconds,
+                    'skipped': stats.skipped,
+                }
+                for endpoint, stats in self._endpoints.items()
+            }
+
+
+class StreamDecoder:
+    def __init__(self, policy: CompressionPolicy, endpoint: str, encoding: Optional[str]) -> None:
+        self.policy = policy
+        self.endpoint = endpoint
+        self.decoder = Decoder(encoding or '')
+        self.wire_bytes = 0
+        self.seconds = 0.0
+        self._chunks: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> None:
+        self.wire_bytes += len(chunk)
+        started = time.perf_counter()
+        self._chunks.append(self.decoder.decompress(chunk))
+        self.seconds += time.perf_counter() - started
+
+    def finish(self) -> bytes:
+        started = time.perf_counter()
+        self._chunks.append(self.decoder.flush())
+        self.seconds += time.perf_counter() - started
+        body = b''.join(self._chunks)
+        self._chunks = []
+        self.policy.record(self.endpoint, self.decoder.encoding, self.wire_bytes, len(body), self.seconds)
+        return body
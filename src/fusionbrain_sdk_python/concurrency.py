@@ -0,0 +1,179 @@
+import asyncio
+import threading
+from http import HTTPStatus
+from typing import Dict, Optional, Union
+
+import aiohttp
+import requests
+
+from fusionbrain_sdk_python.models import ModelStatus, RunPipelineBlockedResult, RunPipelineResult
+
+
+def is_overload(
+    status_code: Optional[int] = None,
+    result: Optional[Union[RunPipelineResult, RunPipelineBlockedResult]] = None,
+) -> Optional[bool]:
+    if isinstance(result, RunPipelineBlockedResult):
+        return True if result.model_status == ModelStatus.DISABLED_BY_QUEUE else None
+    if result is not None:
+        return False
+    if status_code is None or status_code == HTTPStatus.TOO_MANY_REQUESTS:
+        return True
+    return True if status_code >= HTTPStatus.INTERNAL_SERVER_ERROR else None
+
+
+# Failures to reach the API or to hear back in time, as opposed to cancellation or errors on our side.
+_TRANSPORT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    aiohttp.ClientConnectionError,
+    asyncio.TimeoutError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def is_overload_error(exc: BaseException, status_code: Optional[int] = None) -> Optional[bool]:
+    if status_code is not None:
+        return is_overload(status_code)
+    return True if isinstance(exc, _TRANSPORT_ERRORS) else None
+
+
+class _AIMDState:
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_threshold: Optional[float] = None,
+        status_time_threshold: Optional[int] = None,
+    ) -> None:
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError('Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit.')
+        if not 0 < decrease_factor < 1:
+            raise ValueError('`decrease_factor` must be between 0 and 1.')
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_threshold = latency_threshold
+        self.status_time_threshold = status_time_threshold
+        self.in_flight = 0
+        self.successes = 0
+        self.overloads = 0
+        self._limit = float(initial_limit)
+        self._epoch = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'successes': self.successes,
+            'overloads': self.overloads,
+        }
+
+    def _enter(self) -> int:
+        self.in_flight += 1
+        return self._epoch
+
+    def _exit(self, epoch: int, latency: float, overloaded: Optional[bool], status_time: Optional[int]) -> None:
+        self.in_flight -= 1
+        if overloaded is None:
+            # The call failed for a reason that says nothing about congestion, e.g. a 400 response.
+            return
+        overloaded = (
+            overloaded
+            or (self.latency_threshold is not None and latency > self.latency_threshold)
+            or (status_time is not None and self.status_time_threshold is not None
+                and status_time > self.status_time_threshold)
+        )
+        if not overloaded:
+            self.successes += 1
+            # Grows by `increase` once per full window of successful calls.
+            self._limit = min(self._limit + self.increase / self._limit, float(self.max_limit))
+            return
+        self.overloads += 1
+        if epoch != self._epoch:
+            # Calls started before the last decrease saw the same congestion; cut only once per window.
+            return
+        self._epoch += 1
+        self._limit = max(self._limit * self.decrease_factor, float(self.min_limit))
+
+
+class AIMDLimiter(_AIMDState):
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_threshold: Optional[float] = None,
+        status_time_threshold: Optional[int] = None,
+    ) -> None:
+        super().__init__(
+            initial_limit, min_limit, max_limit, increase, decrease_factor, latency_threshold, status_time_threshold,
+        )
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < self.limit, timeout=timeout):
+                raise TimeoutError(f'No concurrency slot became free within {timeout} seconds.')
+            return self._enter()
+
+    def release(
+        self,
+        epoch: int,
+        latency: float,
+        overloaded: Optional[bool] = False,
+        status_time: Optional[int] = None,
+    ) -> None:
+        with self._condition:
+            self._exit(epoch, latency, overloaded, status_time)
+            self._condition.notify_all()
+
+
+class AsyncAIMDLimiter(_AIMDState):
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_threshold: Optional[float] = None,
+        status_time_threshold: Optional[int] = None,
+    ) -> None:
+        super().__init__(
+            initial_limit, min_limit, max_limit, increase, decrease_factor, latency_threshold, status_time_threshold,
+        )
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, timeout: Optional[float] = None) -> int:
+        async with self._condition:
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.in_flight < self.limit),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f'No concurrency slot became free within {timeout} seconds.') from None
+            return self._enter()
+
+    async def release(
+        self,
+        epoch: int,
+        latency: float,
+        overloaded: Optional[bool] = False,
+        status_time: Optional[int] = None,
+    ) -> None:
+        async with self._condition:
+            self._exit(epoch, latency, overloaded, status_time)
+            self._condition.notify_all()
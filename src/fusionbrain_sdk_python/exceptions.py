@@ -1,2 +1,20 @@
 
 class ConfigError(Exception): ...
+
+
+class DeadlineExceeded(Exception): ...
+
+
+class QueueFull(Exception): ...
+
+
+class JobShed(Exception): ...
+
+
+class CircuitOpen(Exception): ...
+
+
+class WorkerError(Exception): ...
+
+
+class CassetteMiss(Exception): ...
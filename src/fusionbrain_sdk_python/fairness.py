@@ -0,0 +1,282 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import Any, Awaitable, Callable, Deque, Dict, Mapping, Optional, Set, Tuple, Type, Union
+from uuid import UUID
+
+from fusionbrain_sdk_python.abstract_client import AsyncClientProtocol
+from fusionbrain_sdk_python.limits import RateLimiter
+from fusionbrain_sdk_python.models import (
+    PipelineResultStatus,
+    PipelineStatusResult,
+    RunPipelineBlockedResult,
+    RunPipelineResult,
+    Style,
+)
+from fusionbrain_sdk_python.shared_state import offload
+
+SubmitResult = Union[RunPipelineResult, RunPipelineBlockedResult]
+
+
+@dataclass
+class _Call:
+    cost: float
+    enqueued_at: float
+    call: Callable[[], Awaitable[Any]]
+    future: 'asyncio.Future[Any]'
+
+
+@dataclass
+class _Tenant:
+    weight: float
+    queue: Deque[_Call] = field(default_factory=deque)
+    deficit: float = 0.0
+    credited: bool = False
+    in_flight: int = 0
+    submitted: int = 0
+    polls: int = 0
+    completed: int = 0
+    served_cost: float = 0.0
+    queue_wait: float = 0.0
+    dispatched: int = 0
+    latency: float = 0.0
+
+
+class AsyncFairScheduler:
+    def __init__(
+        self,
+        client: AsyncClientProtocol,
+        weights: Optional[Mapping[str, float]] = None,
+        default_weight: float = 1.0,
+        max_concurrency: int = 4,
+        max_in_flight: Optional[int] = None,
+        quantum: float = 1.0,
+        poll_cost: float = 0.25,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError('`max_concurrency` must be at least 1.')
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError('`max_in_flight` must be at least 1.')
+        if quantum <= 0 or default_weight <= 0 or any(weight <= 0 for weight in (weights or {}).values()):
+            raise ValueError('`quantum` and tenant weights must be positive.')
+        self.client = client
+        self.weights = dict(weights or {})
+        self.default_weight = default_weight
+        self.max_concurrency = max_concurrency
+        self.max_in_flight = max_in_flight
+        self.quantum = quantum
+        self.poll_cost = poll_cost
+        self.rate_limiter = rate_limiter
+        self.in_flight = 0
+        self.tenants: Dict[str, _Tenant] = {}
+        self._active: Deque[str] = deque()
+        self._changed: Optional[asyncio.Condition] = None
+        self._dispatcher: Optional[asyncio.Task[None]] = None
+        self._tasks: Set[asyncio.Task[None]] = set()
+
+    async def __aenter__(self) -> 'AsyncFairScheduler':
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        total = sum(tenant.served_cost for tenant in self.tenants.values()) or 1.0
+        return {
+            name: {
+                'weight': tenant.weight,
+                'queued': len(tenant.queue),
+                'in_flight': tenant.in_flight,
+                'submitted': tenant.submitted,
+                'polls': tenant.polls,
+                'completed': tenant.completed,
+                'share': tenant.served_cost / total,
+                'mean_queue_wait': tenant.queue_wait / tenant.dispatched if tenant.dispatched else 0.0,
+                'mean_latency': tenant.latency / tenant.completed if tenant.completed else 0.0,
+            }
+            for name, tenant in self.tenants.items()
+        }
+
+    async def run_pipeline(
+        self,
+        tenant: str,
+        pipeline_id: UUID,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+    ) -> SubmitResult:
+        self._tenant(tenant).submitted += 1
+        return await self._enqueue(tenant, float(num_images), lambda: self.client.run_pipeline(
+            pipeline_id=pipeline_id,
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            style=style,
+            height=height,
+            width=width,
+            num_images=num_images,
+        ))
+
+    async def get_status(self, tenant: str, request_id: UUID) -> PipelineStatusResult:
+        self._tenant(tenant).polls += 1
+        return await self._enqueue(tenant, self.poll_cost, lambda: self.client.get_status(request_id))
+
+    async def wait_for_completion(
+        self,
+        tenant: str,
+        request_id: UUID,
+        initial_delay: float,
+        sleep_interval: float = 1,
+        max_retries: int = 5,
+    ) -> PipelineStatusResult:
+        started = time.monotonic()
+        await asyncio.sleep(initial_delay)
+        for _ in range(max_retries):
+            status_result = await self.get_status(tenant, request_id)
+            if status_result.status in [PipelineResultStatus.DONE, PipelineResultStatus.FAIL]:
+                state = self._tenant(tenant)
+                state.completed += 1
+                state.latency += time.monotonic() - started
+                return status_result
+            await asyncio.sleep(sleep_interval)
+        raise TimeoutError(f'Failed to get result for request {request_id} after {max_retries} retries.')
+
+    async def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        for tenant in self.tenants.values():
+            for queued in tenant.queue:
+                queued.future.cancel()
+            tenant.queue.clear()
+        self._active.clear()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _tenant(self, name: str) -> _Tenant:
+        tenant = self.tenants.get(name)
+        if tenant is None:
+            tenant = self.tenants[name] = _Tenant(self.weights.get(name, self.default_weight))
+        return tenant
+
+    async def _enqueue(self, name: str, cost: float, call: Callable[[], Awaitable[Any]]) -> Any:
+        tenant = self._tenant(name)
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        changed = self._condition()
+        async with changed:
+            if not tenant.queue:
+                self._active.append(name)
+            tenant.queue.append(_Call(cost, time.monotonic(), call, future))
+            changed.notify_all()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        return await future
+
+    def _condition(self) -> asyncio.Condition:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def _capacity(self) -> int:
+        limiter = getattr(self.client, 'concurrency_limiter', None)
+        return min(self.max_concurrency, limiter.limit) if limiter is not None else self.max_concurrency
+
+    def _eligible(self, tenant: _Tenant) -> bool:
+        return bool(tenant.queue) and (self.max_in_flight is None or tenant.in_flight < self.max_in_flight)
+
+    def _ready(self) -> bool:
+        return self.in_flight < self._capacity() and any(self._eligible(self.tenants[name]) for name in self._active)
+
+    async def _dispatch(self) -> None:
+        changed = self._condition()
+        while True:
+            async with changed:
+                await changed.wait_for(self._ready)
+            if self.rate_limiter is not None:
+                delay = await offload(self.rate_limiter, self.rate_limiter.reserve)
+                while delay:
+                    await asyncio.sleep(delay)
+                    delay = await offload(self.rate_limiter, self.rate_limiter.reserve)
+            popped = self._pop()
+            if popped is None:
+                continue
+            tenant, queued = popped
+            now = time.monotonic()
+            tenant.in_flight += 1
+            tenant.dispatched += 1
+            tenant.served_cost += queued.cost
+            tenant.queue_wait += now - queued.enqueued_at
+            self.in_flight += 1
+            task = asyncio.get_running_loop().create_task(self._execute(tenant, queued))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _pop(self) -> Optional[Tuple[_Tenant, _Call]]:
+        # Deficit round-robin: a tenant earns `quantum * weight` credit each time it reaches the head of the
+        # rotation and keeps the head while the credit covers its next call, so every backlogged tenant gets a
+        # share of the dispatch slots proportional to its weight no matter how much it has queued. Tenants at
+        # their in-flight cap are passed over without earning credit.
+        skipped = 0
+        while self._active and skipped < len(self._active):
+            tenant = self.tenants[self._active[0]]
+            while tenant.queue and tenant.queue[0].future.done():
+                tenant.queue.popleft()
+            if not tenant.queue:
+                self._retire(tenant)
+                continue
+            if not self._eligible(tenant):
+                skipped += 1
+                tenant.credited = False
+                self._active.rotate(-1)
+                continue
+            skipped = 0
+            if not tenant.credited:
+                tenant.deficit += self.quantum * tenant.weight
+                tenant.credited = True
+            head = tenant.queue[0]
+            if tenant.deficit < head.cost:
+                tenant.credited = False
+                self._active.rotate(-1)
+                continue
+            tenant.queue.popleft()
+            tenant.deficit -= head.cost
+            if not tenant.queue:
+                self._retire(tenant)
+            return tenant, head
+        return None
+
+    def _retire(self, tenant: _Tenant) -> None:
+        # An idle tenant does not bank credit for later.
+        tenant.deficit = 0.0
+        tenant.credited = False
+        self._active.popleft()
+
+    async def _execute(self, tenant: _Tenant, queued: _Call) -> None:
+        try:
+            result = await queued.call()
+        except asyncio.CancelledError:
+            queued.future.cancel()
+            raise
+        except Exception as exc:
+            if not queued.future.done():
+                queued.future.set_exception(exc)
+        else:
+            if not queued.future.done():
+                queued.future.set_result(result)
+        finally:
+            tenant.in_flight -= 1
+            self.in_flight -= 1
+            changed = self._condition()
+            async with changed:
+                changed.notify_all()
@@ -0,0 +1,216 @@
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Set, Type
+
+from aiohttp import BodyPartReader, web
+
+PIPELINE_ID = '4ed0a6a4-77a4-4b0a-8dfc-2b3b8d9f3c01'
+STYLES_PATH = '/static/styles/key'
+PREVIEWS_PATH = '/static/previews/'
+
+# 1x1 transparent PNG, repeated to reach the configured payload size.
+_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=',
+)
+
+
+class FakeJob:
+    def __init__(self, num_images: int, prompt: str, ready_at: float) -> None:
+        self.uuid = str(uuid.uuid4())
+        self.num_images = num_images
+        self.prompt = prompt
+        self.ready_at = ready_at
+
+
+class FakeServer:
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        generation_time: float = 0.0,
+        image_size: int = len(_PNG),
+        status_time: int = 0,
+        compress: bool = False,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.generation_time = generation_time
+        self.image = (_PNG * (image_size // len(_PNG) + 1))[:max(image_size, len(_PNG))]
+        self.status_time = status_time
+        self.compress = compress
+        self.jobs: Dict[str, FakeJob] = {}
+        self.request_count = 0
+        self.peers: Set[Any] = set()
+        self.created = datetime.now(timezone.utc).isoformat()
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}/'
+
+    @property
+    def styles_url(self) -> str:
+        return f'http://{self.host}:{self.port}{STYLES_PATH}'
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._count_requests])
+        app.router.add_get('/key/api/v1/pipelines', self._pipelines)
+        app.router.add_get('/key/api/v1/pipeline/{pipeline_id}/availability', self._availability)
+        app.router.add_post('/key/api/v1/pipeline/run', self._run)
+        app.router.add_get('/key/api/v1/pipeline/status/{request_id}', self._status)
+        app.router.add_get(STYLES_PATH, self._styles)
+        app.router.add_get(PREVIEWS_PATH + '{name}', self._preview)
+        return app
+
+    async def start(self) -> 'FakeServer':
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0:
+            self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> 'FakeServer':
+        return await self.start()
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.stop()
+
+    def start_in_thread(self) -> 'FakeServer':
+        started = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        def serve() -> None:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+            loop.run_until_complete(self.stop())
+            loop.close()
+
+        self._loop = loop
+        self._thread = threading.Thread(target=serve, name='fusionbrain-fake-server', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop_thread(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+            self._thread = None
+
+    def __enter__(self) -> 'FakeServer':
+        return self.start_in_thread()
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.stop_thread()
+
+    @web.middleware
+    async def _count_requests(self, request: web.Request, handler: Any) -> web.StreamResponse:
+        self.request_count += 1
+        if request.transport is not None:
+            self.peers.add(request.transport.get_extra_info('peername'))
+        if not request.path.startswith('/static/') and not request.headers.get('X-Key'):
+            return web.json_response({'error': 'unauthorized'}, status=401)
+        response = await handler(request)
+        if self.compress and isinstance(response, web.Response):
+            # Picks gzip or deflate from the request's Accept-Encoding, or sends the body as is.
+            response.enable_compression()
+        return response
+
+    def _pipeline(self) -> Dict[str, Any]:
+        return {
+            'id': PIPELINE_ID,
+            'name': 'Kandinsky',
+            'description': 'Fake pipeline',
+            'tags': [{'name': 'Kandinsky', 'name_en': 'Kandinsky'}],
+            'version': 3.1,
+            'status': 'ACTIVE',
+            'type': 'TEXT2IMAGE',
+            'createdDate': self.created,
+            'lastModified': self.created,
+        }
+
+    async def _pipelines(self, request: web.Request) -> web.Response:  # noqa: ARG002
+        return web.json_response([self._pipeline()])
+
+    async def _availability(self, request: web.Request) -> web.Response:  # noqa: ARG002
+        return web.json_response({'status': 'ACTIVE'})
+
+    async def _run(self, request: web.Request) -> web.Response:
+        fields: Dict[str, str] = {}
+        reader = await request.multipart()
+        while True:
+            part = await reader.next()
+            if part is None:
+                break
+            if isinstance(part, BodyPartReader) and part.name:
+                fields[part.name] = await part.text()
+        if 'pipeline_id' not in fields or 'params' not in fields:
+            return web.json_response({'error': 'pipeline_id and params are required'}, status=400)
+        params = json.loads(fields['params'])
+        job = FakeJob(
+            num_images=params.get('numImages', 1),
+            prompt=params.get('generateParams', {}).get('query', ''),
+            ready_at=time.monotonic() + self.generation_time,
+        )
+        self.jobs[job.uuid] = job
+        return web.json_response(
+            {'status': 'INITIAL', 'uuid': job.uuid, 'status_time': self.status_time},
+            status=201,
+        )
+
+    async def _status(self, request: web.Request) -> web.Response:
+        job = self.jobs.get(request.match_info['request_id'])
+        if job is None:
+            return web.json_response({'error': 'not found'}, status=404)
+        if time.monotonic() < job.ready_at:
+            return web.json_response({'uuid': job.uuid, 'status': 'PROCESSING'})
+        files: List[str] = [base64.b64encode(self.image).decode()] * job.num_images
+        return web.json_response({
+            'uuid': job.uuid,
+            'status': 'DONE',
+            'result': {'files': files, 'censored': False},
+            'generationTime': int(self.generation_time),
+        })
+
+    async def _styles(self, request: web.Request) -> web.Response:  # noqa: ARG002
+        previews = f'http://{self.host}:{self.port}{PREVIEWS_PATH}'
+        return web.json_response([
+            {'name': 'DEFAULT', 'title': 'Свой стиль', 'titleEn': 'No style', 'image': f'{previews}default.png'},
+            {'name': 'ANIME', 'title': 'Аниме', 'titleEn': 'Anime', 'image': f'{previews}anime.png'},
+        ])
+
+    async def _preview(self, request: web.Request) -> web.Response:
+        body = _PNG + request.match_info['name'].encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=body, content_type='image/png', headers={'ETag': etag})
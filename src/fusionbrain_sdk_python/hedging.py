@@ -0,0 +1,219 @@
+import asyncio
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, TypeVar
+
+T = TypeVar('T')
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+class HedgePolicy:
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        max_hedge_ratio: float = 0.05,
+        min_samples: int = 20,
+        window: int = 512,
+        min_delay: float = 0.01,
+        burst: float = 10.0,
+        max_workers: int = 32,
+    ) -> None:
+        if not 0 < quantile < 1:
+            raise ValueError('`quantile` must be between 0 and 1.')
+        self.quantile = quantile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.burst = burst
+        self.max_workers = max_workers
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._samples: Dict[str, Deque[float]] = {}
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedges / self.requests if self.requests else 0.0
+
+    def observe(self, latency: float, endpoint: str = '') -> None:
+        # Each endpoint keeps its own window: a status poll and a catalogue download have unrelated latencies.
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def delay(self, endpoint: str = '') -> Optional[float]:
+        with self._lock:
+            samples = self._samples.get(endpoint, ())
+            if len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        index = min(math.ceil(self.quantile * len(ordered)) - 1, len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def try_hedge(self) -> bool:
+        # Every request earns `max_hedge_ratio` of a token and a hedge spends a whole one, so duplicates
+        # never exceed that share of the traffic (plus a small burst).
+        if not self._reserve():
+            return False
+        with self._lock:
+            self.hedges += 1
+        return True
+
+    def _start(self) -> float:
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self._tokens + self.max_hedge_ratio, self.burst)
+        return time.monotonic()
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _refund(self) -> None:
+        with self._lock:
+            self._tokens = min(self._tokens + 1, self.burst)
+
+    def _won(self, is_hedge: bool) -> None:
+        if is_hedge:
+            with self._lock:
+                self.hedge_wins += 1
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='fusionbrain-hedge',
+                )
+            return self._executor
+
+    def close(self) -> None:
+        # Attempts already handed to the pool still finish, and a later call starts a new pool, so a policy shared
+        # between clients keeps working after one of them closes it.
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def call(self, func: Callable[[], T], endpoint: str = '') -> T:
+        delay = self.delay(endpoint)
+        started = self._start()
+        # A call that could not hedge anyway runs on the calling thread. Only a call holding a hedge token is
+        # moved to the pool, where the caller can wait for either attempt; the tokens bound those calls to about
+        # `burst`, so the pool does not limit how many calls run at once.
+        if delay is None or not self._reserve():
+            result = func()
+            self.observe(time.monotonic() - started, endpoint)
+            return result
+
+        # Worker threads run in a copy of the caller's context, so context variables such as the profiled call
+        # still apply. Each attempt gets its own copy, a context cannot be entered by two threads at once.
+        primary = self.executor.submit(contextvars.copy_context().run, func)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            self._refund()
+            result = primary.result()
+            self.observe(time.monotonic() - started, endpoint)
+            return result
+
+        with self._lock:
+            self.hedges += 1
+        backup = self.executor.submit(contextvars.copy_context().run, func)
+        pending: Set[Future] = {primary, backup}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        # A request already running in a worker thread cannot be interrupted, its response is
+                        # simply discarded.
+                        loser.cancel()
+                    self.observe(time.monotonic() - started, endpoint)
+                    self._won(future is backup)
+                    return future.result()
+                error = error or future.exception()
+        raise error  # type: ignore[misc]
+
+    async def acall(self, func: Callable[[], Awaitable[T]], endpoint: str = '') -> T:
+        delay = self.delay(endpoint)
+        started = self._start()
+        primary = asyncio.ensure_future(func())
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done and self.try_hedge():
+                    return await self._race(primary, asyncio.ensure_future(func()), started, endpoint)
+            result = await primary
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        self.observe(time.monotonic() - started, endpoint)
+        return result
+
+    async def _race(
+        self,
+        primary: 'asyncio.Future[T]',
+        backup: 'asyncio.Future[T]',
+        started: float,
+        endpoint: str,
+    ) -> T:
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.observe(time.monotonic() - started, endpoint)
+                        self._won(task is backup)
+                        return task.result()
+                    error = error or task.exception()
+            raise error  # type: ignore[misc]
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+def _endpoint(method: Callable[..., Any]) -> str:
+    # A private helper that carries a public method's request is measured under the public name.
+    return method.__name__.lstrip('_')
+
+
+def hedged(method: F) -> F:
+    endpoint = _endpoint(method)
+
+    @functools.wraps(method)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        policy: Optional[HedgePolicy] = self.hedge_policy
+        if policy is None:
+            return method(self, *args, **kwargs)
+        return policy.call(functools.partial(method, self, *args, **kwargs), endpoint)
+    return wrapper  # type: ignore[return-value]
+
+
+def async_hedged(method: F) -> F:
+    endpoint = _endpoint(method)
+
+    @functools.wraps(method)
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        policy: Optional[HedgePolicy] = self.hedge_policy
+        if policy is None:
+            return await method(self, *args, **kwargs)
+        return await policy.acall(functools.partial(method, self, *args, **kwargs), endpoint)
+    return wrapper  # type: ignore[return-value]
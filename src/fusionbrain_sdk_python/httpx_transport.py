@@ -0,0 +1,139 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from fusionbrain_sdk_python.compression import CHUNK_SIZE, CompressionPolicy, StreamDecoder
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.protocol import HTTPRequest
+from fusionbrain_sdk_python.transport import AsyncBeforeRead, BeforeRead, HTTPResponse, expected_size, negotiate
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore[assignment]
+
+
+def _require_httpx(http2: bool) -> None:
+    if httpx is None:
+        raise ConfigError('httpx is not installed. Install it with `pip install fusionbrain-sdk-python[http2]`.')
+    if http2:
+        try:
+            import h2  # noqa: F401, PLC0415
+        except ImportError:
+            raise ConfigError(
+                'HTTP/2 support requires the `h2` package. '
+                'Install it with `pip install fusionbrain-sdk-python[http2]`.',
+            ) from None
+
+
+def _limits(max_connections: int, max_keepalive_connections: Optional[int]) -> 'httpx.Limits':
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections or max_connections,
+    )
+
+
+def _error(request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:  # noqa: ARG001
+    return httpx.HTTPStatusError(message, request=response.raw.request, response=response.raw)
+
+
+class HttpxTransport:
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 10,
+        max_keepalive_connections: Optional[int] = None,
+        client: Optional['httpx.Client'] = None,
+        compression: Optional[CompressionPolicy] = None,
+        **client_kwargs: Any,
+    ) -> None:
+        _require_httpx(http2 and client is None)
+        self.compression = compression
+        # The pool size of a client passed in is not known, warm-up then trusts the requested count.
+        self.max_connections = max_connections if client is None else None
+        self.client = client or httpx.Client(
+            http2=http2,
+            limits=_limits(max_connections, max_keepalive_connections),
+            **client_kwargs,
+        )
+
+    def send(self, request: HTTPRequest, before_read: Optional[BeforeRead] = None) -> HTTPResponse:
+        with self.client.stream(
+            request.method,
+            request.url,
+            headers=negotiate(self.compression, request),
+            content=request.body,
+        ) as response:
+            if before_read is not None and response.status_code == request.expected_status:
+                before_read(expected_size(self.compression, request, response.headers))
+            if self.compression is None:
+                body = response.read()
+            else:
+                decoder = StreamDecoder(self.compression, request.endpoint, response.headers.get('Content-Encoding'))
+                for chunk in response.iter_raw(CHUNK_SIZE):
+                    decoder.feed(chunk)
+                body = decoder.finish()
+        return HTTPResponse(response.status_code, response.headers, body, response.reason_phrase, response)
+
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:
+        return _error(request, response, message)
+
+    def warmup(self, url: str, connections: int) -> int:
+        connections = min(connections, self.max_connections or connections)
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            list(pool.map(lambda _: self.client.head(url), range(connections)))
+        return connections
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class AsyncHttpxTransport:
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 10,
+        max_keepalive_connections: Optional[int] = None,
+        client: Optional['httpx.AsyncClient'] = None,
+        compression: Optional[CompressionPolicy] = None,
+        **client_kwargs: Any,
+    ) -> None:
+        _require_httpx(http2 and client is None)
+        self.compression = compression
+        # The pool size of a client passed in is not known, warm-up then trusts the requested count.
+        self.max_connections = max_connections if client is None else None
+        self.client = client or httpx.AsyncClient(
+            http2=http2,
+            limits=_limits(max_connections, max_keepalive_connections),
+            **client_kwargs,
+        )
+
+    async def send(self, request: HTTPRequest, before_read: Optional[AsyncBeforeRead] = None) -> HTTPResponse:
+        async with self.client.stream(
+            request.method,
+            request.url,
+            headers=negotiate(self.compression, request),
+            content=request.body,
+        ) as response:
+            if before_read is not None and response.status_code == request.expected_status:
+                await before_read(expected_size(self.compression, request, response.headers))
+            if self.compression is None:
+                body = await response.aread()
+            else:
+                decoder = StreamDecoder(self.compression, request.endpoint, response.headers.get('Content-Encoding'))
+                async for chunk in response.aiter_raw(CHUNK_SIZE):
+                    decoder.feed(chunk)
+                body = decoder.finish()
+        return HTTPResponse(response.status_code, response.headers, body, response.reason_phrase, response)
+
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:
+        return _error(request, response, message)
+
+    async def warmup(self, url: str, connections: int) -> int:
+        # Over HTTP/2 the requests are multiplexed and open a single connection.
+        connections = min(connections, self.max_connections or connections)
+        await asyncio.gather(*(self.client.head(url) for _ in range(connections)))
+        return connections
+
+    async def close(self) -> None:
+        await self.client.aclose()
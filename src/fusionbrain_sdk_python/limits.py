@@ -0,0 +1,37 @@
+import threading
+import time
+from typing import Protocol
+
+
+class RateLimiter(Protocol):
+    def reserve(self) -> float: ...
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        if rate <= 0:
+            raise ValueError('`rate` must be positive.')
+        if burst < 1:
+            raise ValueError('`burst` must be at least 1.')
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        return self.reserve(tokens) == 0
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        # Takes the tokens only when they are available; otherwise returns how long to wait for them.
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
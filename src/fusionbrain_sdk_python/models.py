@@ -1,6 +1,7 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional, Sequence
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
 
 from pydantic import UUID4, BaseModel, Field
 
@@ -70,11 +71,20 @@ class PipelineStatusResult(BaseModel):
     generationTime: Optional[int] = Field(default=None)
 
 
+class DecodedPipelineResult(BaseModel):
+    uuid: UUID4 = Field(...)
+    status: PipelineResultStatus = Field(...)
+    files: List[Any] = Field(default_factory=list, description='Decoded images after all transforms were applied')
+    censored: bool = Field(default=False)
+    generationTime: Optional[int] = Field(default=None)
+
+
 class Style(BaseModel):
     name: str = Field(...)
     title: str = Field(...)
     titleEn: str = Field(...)
     image: str = Field(...)
+    preview_path: Optional[Path] = Field(default=None, exclude=True, description='Local copy of `image`, if cached')
 
 
 class PipelineCodeStatusResult(str, Enum):
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from fusionbrain_sdk_python.protocol import HTTPRequest
+from fusionbrain_sdk_python.transport import HTTPResponse
+
+INDEX_FILE = 'index.json'
+
+
+@dataclass
+class CachedPreview:
+    digest: str
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    validated: float = 0.0
+    accessed: float = 0.0
+
+
+class PreviewCache:
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age: float = 3600.0,
+        max_concurrency: int = 8,
+    ) -> None:
+        if max_bytes < 1 or max_concurrency < 1:
+            raise ValueError('`max_bytes` and `max_concurrency` must be at least 1.')
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_concurrency = max_concurrency
+        self.hits = 0
+        self.downloads = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.errors = 0
+        self._entries: Dict[str, CachedPreview] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        (self.directory / 'objects').mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return self._size()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size(),
+                'hits': self.hits,
+                'downloads': self.downloads,
+                'revalidated': self.revalidated,
+                'evictions': self.evictions,
+                'errors': self.errors,
+            }
+
+    def path(self, url: str) -> Optional[Path]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            entry.accessed = time.time()
+            self._dirty = True
+            return self._object(entry.digest)
+
+    def read(self, url: str) -> Optional[bytes]:
+        path = self.path(url)
+        return path.read_bytes() if path is not None else None
+
+    def request(self, url: str) -> Optional[HTTPRequest]:
+        # A preview validated less than `max_age` seconds ago is served from disk without asking the CDN.
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and time.time() - entry.validated < self.max_age:
+                self.hits += 1
+                return None
+            headers = {}
+            if entry is not None and entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry is not None and entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return HTTPRequest('style_preview', 'GET', url, headers)
+
+    def update(self, url: str, response: Optional[HTTPResponse]) -> Optional[Path]:
+        # A failed or unexpected response keeps the copy already on disk, if there is one.
+        if response is None or response.status not in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+            with self._lock:
+                self.errors += 1
+            return self.path(url)
+        now = time.time()
+        if response.status == HTTPStatus.NOT_MODIFIED:
+            with self._lock:
+                entry = self._entries.get(url)
+                if entry is not None:
+                    self.revalidated += 1
+                    entry.validated = entry.accessed = now
+                    self._dirty = True
+            return self.path(url)
+        if len(response.body) > self.max_bytes:
+            # A preview too large to cache is treated like a failed fetch and keeps the older copy.
+            with self._lock:
+                self.errors += 1
+            return self.path(url)
+        digest = hashlib.sha256(response.body).hexdigest()
+        path = self._object(digest)
+        with self._lock:
+            if not path.exists():
+                _write_atomic(path, response.body)
+            self.downloads += 1
+            previous = self._entries.get(url)
+            self._entries[url] = CachedPreview(
+                digest,
+                len(response.body),
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'),
+                now,
+                now,
+            )
+            self._dirty = True
+            if previous is not None and previous.digest != digest:
+                self._release(previous.digest)
+            self._evict(keep=url)
+        return path
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {url: asdict(entry) for url, entry in self._entries.items()}
+            self._dirty = False
+        _write_atomic(self.directory / INDEX_FILE, json.dumps(data).encode())
+
+    def _load(self) -> None:
+        try:
+            data = json.loads((self.directory / INDEX_FILE).read_text())
+        except (OSError, ValueError):
+            return
+        for url, fields in data.items():
+            entry = CachedPreview(**fields)
+            if self._object(entry.digest).exists():
+                self._entries[url] = entry
+
+    def _object(self, digest: str) -> Path:
+        return self.directory / 'objects' / digest
+
+    def _size(self) -> int:
+        # Identical images under different URLs are stored once and counted once.
+        return sum({entry.digest: entry.size for entry in self._entries.values()}.values())
+
+    def _evict(self, keep: str) -> None:
+        total = self._size()
+        for url in sorted(self._entries, key=lambda key: self._entries[key].accessed):
+            if total <= self.max_bytes:
+                break
+            if url == keep:
+                continue
+            entry = self._entries.pop(url)
+            self.evictions += 1
+            if self._release(entry.digest):
+                total -= entry.size
+
+    def _release(self, digest: str) -> bool:
+        if any(entry.digest == digest for entry in self._entries.values()):
+            return False
+        self._object(digest).unlink(missing_ok=True)
+        return True
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,188 @@
+import asyncio
+import base64
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from types import TracebackType
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Type
+
+from fusionbrain_sdk_python.models import DecodedPipelineResult, PipelineStatusResult
+
+Transform = Callable[[Any], Any]
+
+THREAD_THRESHOLD = 64 * 1024
+PROCESS_THRESHOLD = 4 * 1024 * 1024
+
+
+def _apply(data: Any, transforms: Sequence[Transform]) -> Any:
+    for transform in transforms:
+        data = transform(data)
+    return data
+
+
+def _decode(encoded: str, transforms: Sequence[Transform]) -> Any:
+    return _apply(base64.b64decode(encoded), transforms)
+
+
+def _buffer(block: shared_memory.SharedMemory) -> memoryview:
+    if block.buf is None:
+        raise RuntimeError(f'Shared memory block {block.name} is already closed.')
+    return block.buf
+
+
+def _decode_shared(name: str, size: int, transforms: Sequence[Transform]) -> Tuple[bool, Any]:
+    # Runs inside a worker process: the encoded payload is read straight from the shared block and a
+    # bytes result is handed back the same way, so neither side pickles multi-megabyte buffers.
+    source = shared_memory.SharedMemory(name=name)
+    try:
+        result = _apply(base64.b64decode(_buffer(source)[:size]), transforms)
+    finally:
+        source.close()
+    if not isinstance(result, (bytes, bytearray)) or not result:
+        return False, result
+    target = shared_memory.SharedMemory(create=True, size=len(result))
+    _buffer(target)[:len(result)] = result
+    target.close()
+    return True, (target.name, len(result))
+
+
+def _to_shared(encoded: str) -> shared_memory.SharedMemory:
+    raw = encoded.encode('ascii')
+    block = shared_memory.SharedMemory(create=True, size=max(len(raw), 1))
+    _buffer(block)[:len(raw)] = raw
+    return block
+
+
+def _from_shared(shared: bool, value: Any) -> Any:
+    if not shared:
+        return value
+    name, size = value
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(_buffer(block)[:size])
+    finally:
+        block.close()
+        block.unlink()
+
+
+class ResultProcessor:
+    def __init__(
+        self,
+        transforms: Sequence[Transform] = (),
+        thread_threshold: int = THREAD_THRESHOLD,
+        process_threshold: int = PROCESS_THRESHOLD,
+        max_workers: Optional[int] = None,
+        thread_executor: Optional[ThreadPoolExecutor] = None,
+        process_executor: Optional[ProcessPoolExecutor] = None,
+    ) -> None:
+        self.transforms = tuple(transforms)
+        self.thread_threshold = thread_threshold
+        self.process_threshold = process_threshold
+        self.max_workers = max_workers
+        self._thread_executor = thread_executor
+        self._process_executor = process_executor
+        self._owns_thread_executor = thread_executor is None
+        self._owns_process_executor = process_executor is None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'ResultProcessor':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    @property
+    def thread_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._thread_executor is None:
+                self._thread_executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='fusionbrain-decode',
+                )
+            return self._thread_executor
+
+    @property
+    def process_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._process_executor is None:
+                self._process_executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._process_executor
+
+    def choose_executor(self, payload_size: int) -> Optional[Executor]:
+        if payload_size >= self.process_threshold:
+            return self.process_executor
+        if payload_size >= self.thread_threshold:
+            return self.thread_executor
+        return None
+
+    def process(self, status_result: PipelineStatusResult) -> DecodedPipelineResult:
+        files = status_result.result.files if status_result.result else []
+        executor = self.choose_executor(sum(len(encoded) for encoded in files))
+        if executor is None:
+            decoded = [_decode(encoded, self.transforms) for encoded in files]
+        elif isinstance(executor, ProcessPoolExecutor):
+            decoded = self._process_shared(executor, files)
+        else:
+            decoded = list(executor.map(_decode, files, [self.transforms] * len(files)))
+        return self._build(status_result, decoded)
+
+    async def aprocess(self, status_result: PipelineStatusResult) -> DecodedPipelineResult:
+        files = status_result.result.files if status_result.result else []
+        executor = self.choose_executor(sum(len(encoded) for encoded in files))
+        if executor is None:
+            decoded = [_decode(encoded, self.transforms) for encoded in files]
+        else:
+            loop = asyncio.get_running_loop()
+            decoded = await loop.run_in_executor(self.thread_executor, self._dispatch, executor, files)
+        return self._build(status_result, decoded)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._thread_executor is not None and self._owns_thread_executor:
+                self._thread_executor.shutdown()
+                self._thread_executor = None
+            if self._process_executor is not None and self._owns_process_executor:
+                self._process_executor.shutdown()
+                self._process_executor = None
+
+    def _dispatch(self, executor: Executor, files: List[str]) -> List[Any]:
+        if isinstance(executor, ProcessPoolExecutor):
+            return self._process_shared(executor, files)
+        return [_decode(encoded, self.transforms) for encoded in files]
+
+    def _process_shared(self, executor: ProcessPoolExecutor, files: List[str]) -> List[Any]:
+        blocks = [_to_shared(encoded) for encoded in files]
+        try:
+            futures = [
+                executor.submit(_decode_shared, block.name, len(encoded), self.transforms)
+                for block, encoded in zip(blocks, files)
+            ]
+            decoded: List[Any] = []
+            error: Optional[BaseException] = None
+            for future in futures:
+                try:
+                    decoded.append(_from_shared(*future.result()))
+                except Exception as exc:
+                    error = error or exc
+            if error is not None:
+                raise error
+            return decoded
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    @staticmethod
+    def _build(status_result: PipelineStatusResult, decoded: List[Any]) -> DecodedPipelineResult:
+        return DecodedPipelineResult(
+            uuid=status_result.uuid,
+            status=status_result.status,
+            files=decoded,
+            censored=status_result.result.censored if status_result.result else False,
+            generationTime=status_result.generationTime,
+        )
@@ -0,0 +1,233 @@
+import asyncio
+import functools
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Callable, ContextManager, Deque, Dict, List, Optional, Tuple, Type, TypeVar, Union
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+_IDLE: ContextManager[None] = nullcontext()
+_CALL: ContextVar[str] = ContextVar('fusionbrain_call', default='other')
+TOTAL = 'total'
+
+
+@dataclass
+class PhaseStats:
+    count: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    max_wall: float = 0.0
+
+
+class _Phase:
+    __slots__ = ('cpu', 'name', 'profiler', 'started', 'started_cpu')
+
+    def __init__(self, profiler: 'Profiler', name: str, cpu: bool) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.cpu = cpu
+        self.started = 0.0
+        self.started_cpu = 0.0
+
+    def __enter__(self) -> None:
+        if self.cpu:
+            self.started_cpu = time.thread_time()
+        self.started = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        wall = time.perf_counter() - self.started
+        cpu = time.thread_time() - self.started_cpu if self.cpu else 0.0
+        self.profiler.record(_CALL.get(), self.name, wall, cpu)
+
+
+class _LagMonitor:
+    __slots__ = ('active',)
+
+    def __init__(self) -> None:
+        self.active = True
+
+
+class _Call:
+    __slots__ = ('name', 'phase', 'token')
+
+    def __init__(self, profiler: 'Profiler', name: str, cpu: bool) -> None:
+        self.name = name
+        self.phase = _Phase(profiler, TOTAL, cpu)
+        self.token: Optional[Token[str]] = None
+
+    def __enter__(self) -> None:
+        self.token = _CALL.set(self.name)
+        self.phase.__enter__()
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.phase.__exit__(exc_type, exc, tb)
+        if self.token is not None:
+            _CALL.reset(self.token)
+
+
+class Profiler:
+    def __init__(self, lag_interval: float = 0.05, lag_window: int = 4096) -> None:
+        if lag_interval <= 0:
+            raise ValueError('`lag_interval` must be positive.')
+        self.lag_interval = lag_interval
+        self.phases: Dict[Tuple[str, str], PhaseStats] = {}
+        self._lag: Deque[float] = deque(maxlen=lag_window)
+        self._monitors: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LagMonitor]' = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def call(self, name: str, cpu: bool = True) -> ContextManager[None]:
+        return _Call(self, name, cpu)
+
+    def phase(self, name: str, cpu: bool = True) -> ContextManager[None]:
+        return _Phase(self, name, cpu)
+
+    def record(self, call: str, phase: str, wall: float, cpu: float = 0.0) -> None:
+        with self._lock:
+            stats = self.phases.get((call, phase))
+            if stats is None:
+                stats = self.phases[(call, phase)] = PhaseStats()
+            stats.count += 1
+            stats.wall += wall
+            stats.cpu += cpu
+            stats.max_wall = max(stats.max_wall, wall)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.phases.clear()
+            self._lag.clear()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                f'{call};{phase}': {
+                    'count': stats.count,
+                    'wall': stats.wall,
+                    'cpu': stats.cpu,
+                    'mean_wall': stats.wall / stats.count,
+                    'max_wall': stats.max_wall,
+                }
+                for (call, phase), stats in self.phases.items()
+            }
+
+    def lag_stats(self) -> Dict[str, float]:
+        with self._lock:
+            samples = sorted(self._lag)
+        if not samples:
+            return {'samples': 0, 'mean': 0.0, 'p99': 0.0, 'max': 0.0}
+        return {
+            'samples': len(samples),
+            'mean': sum(samples) / len(samples),
+            'p99': samples[min(int(0.99 * len(samples)), len(samples) - 1)],
+            'max': samples[-1],
+        }
+
+    def folded(self) -> List[str]:
+        # One `call;phase microseconds` line per phase, the format flamegraph.pl and speedscope read. Time a
+        # call spends outside every measured phase is reported as its `sdk` frame.
+        with self._lock:
+            phases = dict(self.phases)
+        lines = []
+        for (call, phase), stats in sorted(phases.items()):
+            if phase == TOTAL:
+                measured = sum(other.wall for (name, key), other in phases.items() if name == call and key != TOTAL)
+                wall = stats.wall - measured
+                phase = 'sdk'
+            else:
+                wall = stats.wall
+            if wall > 0:
+                lines.append(f'{call};{phase} {round(wall * 1e6)}')
+        return lines
+
+    def write_folded(self, path: Union[str, Path]) -> None:
+        Path(path).write_text(''.join(f'{line}\n' for line in self.folded()))
+
+    def report(self) -> str:
+        rows = [f'{"call;phase":<40} {"count":>8} {"wall ms":>10} {"cpu ms":>10} {"mean ms":>9} {"max ms":>9}']
+        for name, stats in sorted(self.stats().items(), key=lambda item: -item[1]['wall']):
+            rows.append(
+                f'{name:<40} {stats["count"]:>8.0f} {stats["wall"] * 1e3:>10.1f} {stats["cpu"] * 1e3:>10.1f} '
+                f'{stats["mean_wall"] * 1e3:>9.2f} {stats["max_wall"] * 1e3:>9.2f}',
+            )
+        lag = self.lag_stats()
+        if lag['samples']:
+            rows.append(
+                f'event loop lag: mean {lag["mean"] * 1e3:.2f} ms, p99 {lag["p99"] * 1e3:.2f} ms, '
+                f'max {lag["max"] * 1e3:.2f} ms over {lag["samples"]:.0f} samples',
+            )
+        return '\n'.join(rows)
+
+    def watch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop in self._monitors:
+                return
+            monitor = self._monitors[loop] = _LagMonitor()
+        self._schedule_sample(loop, monitor)
+
+    def stop(self) -> None:
+        with self._lock:
+            monitors = list(self._monitors.values())
+            self._monitors.clear()
+        for monitor in monitors:
+            monitor.active = False
+
+    def _schedule_sample(self, loop: asyncio.AbstractEventLoop, monitor: _LagMonitor) -> None:
+        # Samples are a chain of timer callbacks rather than a task, so a loop that is closed without the client
+        # being closed drops the pending timer silently, and only the loop's own schedule refers to the monitor.
+        loop.call_later(self.lag_interval, self._sample_lag, monitor, time.perf_counter())
+
+    def _sample_lag(self, monitor: _LagMonitor, started: float) -> None:
+        # A timer that fires late measures how long other callbacks held the loop.
+        if not monitor.active:
+            return
+        lag = time.perf_counter() - started - self.lag_interval
+        with self._lock:
+            self._lag.append(max(lag, 0.0))
+        self._schedule_sample(asyncio.get_running_loop(), monitor)
+
+
+def phase(profiler: Optional[Profiler], name: str, cpu: bool = True) -> ContextManager[None]:
+    return _IDLE if profiler is None else profiler.phase(name, cpu)
+
+
+def profiled(method: F) -> F:
+    @functools.wraps(method)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        profiler: Optional[Profiler] = self.profiler
+        if profiler is None:
+            return method(self, *args, **kwargs)
+        with profiler.call(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper  # type: ignore[return-value]
+
+
+def async_profiled(method: F) -> F:
+    @functools.wraps(method)
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        profiler: Optional[Profiler] = self.profiler
+        if profiler is None:
+            return await method(self, *args, **kwargs)
+        profiler.watch_loop()
+        # CPU time is not attributed across awaits, other tasks run on the same thread meanwhile.
+        with profiler.call(method.__name__, cpu=False):
+            return await method(self, *args, **kwargs)
+    return wrapper  # type: ignore[return-value]
@@ -0,0 +1,239 @@
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from urllib.parse import urlencode
+from uuid import UUID
+
+from pydantic import TypeAdapter
+
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.models import (
+    Pipeline,
+    PipelineAvailabilityResult,
+    PipelineCodeStatusResult,
+    PipelineStatus,
+    PipelineStatusResult,
+    PipelineType,
+    RunPipelineBlockedResult,
+    RunPipelineResult,
+    Style,
+)
+from fusionbrain_sdk_python.profiling import Profiler, phase
+
+API_HOST = 'https://api-key.fusionbrain.ai/'
+STYLES_URL = 'https://cdn.fusionbrain.ai/static/styles/key'
+
+_PLACEHOLDER = '\x00prompt\x00'
+
+_PIPELINES = TypeAdapter(List[Pipeline])
+_STYLES = TypeAdapter(List[Style])
+
+
+@dataclass(frozen=True)
+class HTTPRequest:
+    endpoint: str
+    method: str
+    url: str
+    headers: Mapping[str, str] = field(default_factory=dict)
+    body: Optional[bytes] = None
+    expected_status: int = HTTPStatus.OK
+
+
+@dataclass(frozen=True)
+class RunTemplate:
+    pipeline_id: UUID
+    negative_prompt: Optional[str]
+    style: Optional[str]
+    height: int
+    width: int
+    num_images: int
+    url: str
+    headers: Mapping[str, str]
+    head: bytes
+    tail: bytes
+
+    def request(self, prompt: str) -> HTTPRequest:
+        # Only the prompt is encoded per call; `json.dumps` of a string is its escaped JSON literal.
+        body = b''.join((self.head, json.dumps(prompt).encode(), self.tail))
+        return HTTPRequest('run_pipeline', 'POST', self.url, self.headers, body, HTTPStatus.CREATED)
+
+
+class FBProtocol:
+    def __init__(
+        self,
+        x_key: Optional[str] = None,
+        x_secret: Optional[str] = None,
+        api_host: str = API_HOST,
+        styles_url: str = STYLES_URL,
+    ) -> None:
+        _FB_API_KEY = os.getenv('FB_API_KEY') or x_key
+        _FB_API_SECRET = os.getenv('FB_API_SECRET') or x_secret
+        if not _FB_API_KEY or not _FB_API_SECRET:
+            raise ConfigError(
+                'Please set `FB_API_KEY` and `FB_API_SECRET` tokens in initial method or environment variables.',
+            )
+        self.api_host = api_host if api_host.endswith('/') else f'{api_host}/'
+        self.styles_url = styles_url
+        self.profiler: Optional[Profiler] = None
+        # Read-only views: the same header mappings are shared by every request and thread.
+        self.auth_headers: Mapping[str, str] = MappingProxyType({
+            'X-Key': f'Key {_FB_API_KEY}',
+            'X-Secret': f'Secret {_FB_API_SECRET}',
+        })
+        self.boundary = uuid.uuid4().hex
+        self.run_headers: Mapping[str, str] = MappingProxyType({
+            **self.auth_headers,
+            'Content-Type': f'multipart/form-data; boundary={self.boundary}',
+        })
+        self.pipelines_url = self.api_host + 'key/api/v1/pipelines'
+        self.run_url = self.api_host + 'key/api/v1/pipeline/run'
+        self.status_url = self.api_host + 'key/api/v1/pipeline/status/'
+        self.pipeline_url = self.api_host + 'key/api/v1/pipeline/'
+        self._pipelines_request = HTTPRequest('get_pipelines', 'GET', self.pipelines_url, self.auth_headers)
+        self._styles_request = HTTPRequest('get_styles', 'GET', self.styles_url)
+
+    def get_pipelines(self) -> HTTPRequest:
+        return self._pipelines_request
+
+    def get_pipelines_by_type(self, pipe_type: PipelineType) -> HTTPRequest:
+        url = f'{self.pipelines_url}?{urlencode({"type": pipe_type.value})}'
+        return HTTPRequest('get_pipelines_by_type', 'GET', url, self.auth_headers)
+
+    def get_pipeline_availability(self, pipeline_id: UUID) -> HTTPRequest:
+        url = f'{self.pipeline_url}{pipeline_id}/availability'
+        return HTTPRequest('get_pipeline_availability', 'GET', url, self.auth_headers)
+
+    def run_pipeline(
+        self,
+        pipeline_id: UUID,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+    ) -> HTTPRequest:
+        params = self._run_params(prompt, negative_prompt, style, height, width, num_images)
+        with phase(self.profiler, 'encode_params'):
+            encoded = json.dumps(params)
+        with phase(self.profiler, 'encode_multipart'):
+            body = self.multipart([
+                ('pipeline_id', str(pipeline_id), None),
+                ('params', encoded, 'application/json'),
+            ])
+        return HTTPRequest('run_pipeline', 'POST', self.run_url, self.run_headers, body, HTTPStatus.CREATED)
+
+    def run_template(
+        self,
+        pipeline_id: UUID,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+    ) -> RunTemplate:
+        # The body is encoded once around a placeholder prompt and cut there, so `RunTemplate.request` produces
+        # exactly the bytes `run_pipeline` would for the same arguments. The query precedes the negative prompt
+        # and style in the params, so the first occurrence of the placeholder is always the prompt's.
+        params = self._run_params(_PLACEHOLDER, negative_prompt, style, height, width, num_images)
+        body = self.multipart([
+            ('pipeline_id', str(pipeline_id), None),
+            ('params', json.dumps(params), 'application/json'),
+        ])
+        head, _, tail = body.partition(json.dumps(_PLACEHOLDER).encode())
+        return RunTemplate(
+            pipeline_id,
+            negative_prompt or None,
+            style.name if isinstance(style, Style) else style or None,
+            height,
+            width,
+            num_images,
+            self.run_url,
+            self.run_headers,
+            head,
+            tail,
+        )
+
+    def get_styles(self) -> HTTPRequest:
+        return self._styles_request
+
+    def get_status(self, request_id: UUID) -> HTTPRequest:
+        return HTTPRequest('get_status', 'GET', f'{self.status_url}{request_id}', self.auth_headers)
+
+    def _run_params(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str],
+        style: Optional[Union[str, Style]],
+        height: int,
+        width: int,
+        num_images: int,
+    ) -> Dict[str, Any]:
+        optional = {
+            **({'negativePromptDecoder': negative_prompt} if negative_prompt else {}),
+            **({'style': style.name if isinstance(style, Style) else style} if style else {}),
+        }
+        return {
+            'type': 'GENERATE',
+            'numImages': num_images,
+            'width': width,
+            'height': height,
+            'generateParams': {
+                'query': prompt,
+            },
+            **optional,
+        }
+
+    def multipart(self, fields: Sequence[Tuple[str, str, Optional[str]]]) -> bytes:
+        parts = []
+        for name, value, content_type in fields:
+            header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n'
+            if content_type:
+                header += f'Content-Type: {content_type}\r\n'
+            parts.append(f'{header}\r\n{value}\r\n')
+        parts.append(f'--{self.boundary}--\r\n')
+        return ''.join(parts).encode()
+
+    def error_message(self, request: HTTPRequest, status: int, body: bytes, reason: Optional[str] = None) -> str:
+        if request.endpoint == 'get_status':
+            status_name = HTTPStatus(status).name
+            msg_custom = (
+                PipelineCodeStatusResult[status_name].value if status_name in PipelineCodeStatusResult.__members__
+                else reason
+            )
+            return (
+                f'In response to {request.url} returned status {status_name} '
+                f'code {status}, reason: {msg_custom}.'
+            )
+        return (
+            f'In response to {request.url} returned status '
+            f'code {status}. Reason: {body.decode(errors="replace")}'
+        )
+
+    def parse_pipelines(self, body: bytes) -> List[Pipeline]:
+        with phase(self.profiler, 'validate'):
+            return _PIPELINES.validate_json(body)
+
+    def parse_pipeline_availability(self, body: bytes) -> PipelineStatus:
+        with phase(self.profiler, 'validate'):
+            return PipelineAvailabilityResult.model_validate_json(body).status
+
+    def parse_run_pipeline(self, body: bytes) -> Union[RunPipelineResult, RunPipelineBlockedResult]:
+        with phase(self.profiler, 'json_decode'):
+            data: Dict[str, Any] = json.loads(body)
+        with phase(self.profiler, 'validate'):
+            if data.get('model_status'):
+                return RunPipelineBlockedResult.model_validate(data)
+            return RunPipelineResult.model_validate(data)
+
+    def parse_styles(self, body: bytes) -> List[Style]:
+        with phase(self.profiler, 'validate'):
+            return _STYLES.validate_json(body)
+
+    def parse_status(self, body: bytes) -> PipelineStatusResult:
+        with phase(self.profiler, 'validate'):
+            return PipelineStatusResult.model_validate_json(body)
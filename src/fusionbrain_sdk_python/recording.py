@@ -0,0 +1,255 @@
+import asyncio
+import base64
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import IO, Any, Deque, Dict, List, Optional, Tuple, Union, cast
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from requests.exceptions import HTTPError
+from requests.structures import CaseInsensitiveDict
+from yarl import URL
+
+from fusionbrain_sdk_python.exceptions import CassetteMiss
+from fusionbrain_sdk_python.protocol import HTTPRequest
+from fusionbrain_sdk_python.transport import AsyncBeforeRead, AsyncTransport, BeforeRead, HTTPResponse, Transport
+
+_KEPT_HEADERS = ('Content-Type',)
+
+
+class ReplayTiming(str, Enum):
+    FAST = 'fast'
+    ORIGINAL = 'original'
+
+
+@dataclass
+class Exchange:
+    endpoint: str
+    method: str
+    url: str
+    status: int
+    body: bytes = b''
+    headers: Dict[str, str] = field(default_factory=dict)
+    reason: Optional[str] = None
+    started: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return _key(self.method, self.url)
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        try:
+            data['body'] = self.body.decode()
+        except UnicodeDecodeError:
+            data['body'] = base64.b64encode(self.body).decode()
+            data['base64'] = True
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, line: str) -> 'Exchange':
+        data = json.loads(line)
+        body = data.pop('body')
+        data['body'] = base64.b64decode(body) if data.pop('base64', False) else body.encode()
+        return cls(**data)
+
+    def response(self) -> HTTPResponse:
+        return HTTPResponse(self.status, CaseInsensitiveDict(self.headers), self.body, self.reason)
+
+
+class Cassette:
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.exchanges: List[Exchange] = []
+        self._file: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+        self._origin: Optional[float] = None
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'Cassette':
+        cassette = cls(path)
+        with cassette._open('rt') as file:
+            cassette.exchanges = [Exchange.from_json(line) for line in file if line.strip()]
+        return cassette
+
+    def record(self, exchange: Exchange) -> None:
+        with self._lock:
+            if self._file is None:
+                self._file = self._open('wt')
+                self._origin = exchange.started
+            exchange.started = round(exchange.started - (self._origin or 0.0), 6)
+            self.exchanges.append(exchange)
+            self._file.write(exchange.to_json() + '\n')
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self, mode: str) -> IO[str]:
+        if self.path.suffix == '.gz':
+            return cast('IO[str]', gzip.open(self.path, mode, encoding='utf-8'))
+        return self.path.open(mode[0], encoding='utf-8')
+
+
+class _Recorder:
+    def __init__(self, cassette: Cassette) -> None:
+        self.cassette = cassette
+
+    def _exchange(self, request: HTTPRequest, response: HTTPResponse, started: float) -> Exchange:
+        # The transport has already decoded the body, so the encoding headers of the wire response no longer
+        # describe it; the length is rewritten to match what is stored.
+        headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+        headers['Content-Length'] = str(len(response.body))
+        return Exchange(
+            endpoint=request.endpoint,
+            method=request.method,
+            url=request.url,
+            status=response.status,
+            body=response.body,
+            headers=headers,
+            reason=response.reason,
+            started=started,
+            elapsed=round(time.monotonic() - started, 6),
+        )
+
+
+class RecordingTransport(_Recorder):
+    def __init__(self, transport: Transport, cassette: Cassette) -> None:
+        super().__init__(cassette)
+        self.transport = transport
+
+    def send(self, request: HTTPRequest, before_read: Optional[BeforeRead] = None) -> HTTPResponse:
+        started = time.monotonic()
+        response = self.transport.send(request, before_read)
+        self.cassette.record(self._exchange(request, response, started))
+        return response
+
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:
+        return self.transport.error(request, response, message)
+
+    def close(self) -> None:
+        self.transport.close()
+        self.cassette.close()
+
+
+class AsyncRecordingTransport(_Recorder):
+    def __init__(self, transport: AsyncTransport, cassette: Cassette) -> None:
+        super().__init__(cassette)
+        self.transport = transport
+
+    async def send(self, request: HTTPRequest, before_read: Optional[AsyncBeforeRead] = None) -> HTTPResponse:
+        started = time.monotonic()
+        response = await self.transport.send(request, before_read)
+        await asyncio.to_thread(self.cassette.record, self._exchange(request, response, started))
+        return response
+
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:
+        return self.transport.error(request, response, message)
+
+    async def close(self) -> None:
+        await self.transport.close()
+        await asyncio.to_thread(self.cassette.close)
+
+
+class _Replayer:
+    def __init__(
+        self,
+        cassette: Union[Cassette, str, Path],
+        timing: ReplayTiming = ReplayTiming.FAST,
+        speed: float = 1.0,
+        loop: bool = False,
+    ) -> None:
+        self.cassette = cassette if isinstance(cassette, Cassette) else Cassette.load(cassette)
+        self.timing = ReplayTiming(timing)
+        self.speed = speed
+        self.loop = loop
+        self.served = 0
+        self._lock = threading.Lock()
+        self._queues: Dict[Tuple[str, str], Deque[Exchange]] = defaultdict(deque)
+        for exchange in self.cassette.exchanges:
+            self._queues[exchange.key].append(exchange)
+
+    def _next(self, request: HTTPRequest) -> Exchange:
+        # Exchanges are matched by method and path, in recorded order, so repeated polls replay
+        # PROCESSING before DONE and the cassette works against any api_host.
+        with self._lock:
+            queue = self._queues.get(_key(request.method, request.url))
+            if not queue:
+                raise CassetteMiss(f'No recorded response left for {request.method} {request.url}.')
+            exchange = queue.popleft()
+            if self.loop:
+                queue.append(exchange)
+            self.served += 1
+            return exchange
+
+    def _delay(self, exchange: Exchange) -> float:
+        return exchange.elapsed / self.speed if self.timing == ReplayTiming.ORIGINAL else 0.0
+
+
+class ReplayTransport(_Replayer):
+    def send(self, request: HTTPRequest, before_read: Optional[BeforeRead] = None) -> HTTPResponse:
+        exchange = self._next(request)
+        delay = self._delay(exchange)
+        if delay:
+            time.sleep(delay)
+        if before_read is not None and exchange.status == request.expected_status:
+            before_read(len(exchange.body))
+        return exchange.response()
+
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:  # noqa: ARG002
+        return HTTPError(message)
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncReplayTransport(_Replayer):
+    async def send(self, request: HTTPRequest, before_read: Optional[AsyncBeforeRead] = None) -> HTTPResponse:
+        exchange = self._next(request)
+        delay = self._delay(exchange)
+        if delay:
+            await asyncio.sleep(delay)
+        if before_read is not None and exchange.status == request.expected_status:
+            await before_read(len(exchange.body))
+        return exchange.response()
+
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:
+        url = URL(request.url)
+        headers: CIMultiDictProxy[str] = CIMultiDictProxy(CIMultiDict(response.headers))
+        return aiohttp.ClientResponseError(
+            request_info=aiohttp.RequestInfo(url, request.method, CIMultiDictProxy(CIMultiDict()), url),
+            history=(),
+            status=response.status,
+            message=message,
+            headers=headers,
+        )
+
+    async def close(self) -> None:
+        pass
+
+
+def summarize(exchanges: List[Exchange]) -> Dict[str, Any]:
+    by_endpoint: Dict[str, List[float]] = defaultdict(list)
+    for exchange in exchanges:
+        by_endpoint[exchange.endpoint].append(exchange.elapsed)
+    return {
+        endpoint: {'count': len(elapsed), 'mean_elapsed': sum(elapsed) / len(elapsed)}
+        for endpoint, elapsed in by_endpoint.items()
+    }
+
+
+def _key(method: str, url: str) -> Tuple[str, str]:
+    parts = urlsplit(url)
+    return method, (f'{parts.path}?{parts.query}' if parts.query else parts.path)
+
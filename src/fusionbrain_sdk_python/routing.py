@@ -0,0 +1,333 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from uuid import UUID
+
+from fusionbrain_sdk_python.abstract_client import AsyncClientProtocol, SyncClientProtocol
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.models import (
+    Pipeline,
+    PipelineResultStatus,
+    PipelineStatus,
+    PipelineStatusResult,
+    PipelineType,
+    RunPipelineBlockedResult,
+    RunPipelineResult,
+    Style,
+)
+
+RouteResult = Union[RunPipelineResult, RunPipelineBlockedResult]
+
+
+class RoutingStrategy(str, Enum):
+    POWER_OF_TWO = 'power_of_two'
+    WEIGHTED = 'weighted'
+
+
+@dataclass
+class RouteStats:
+    pipeline: Pipeline
+    in_flight: int = 0
+    submitted: int = 0
+    blocked: int = 0
+    queue_wait: Optional[float] = None
+    generation_time: Optional[float] = None
+    blocked_rate: float = 0.0
+    blocked_until: float = 0.0
+
+    @property
+    def expected_latency(self) -> float:
+        return (self.queue_wait or 0.0) + (self.generation_time or 0.0)
+
+
+class _RouterState:
+    def __init__(
+        self,
+        pipe_type: PipelineType = PipelineType.TEXT2IMAGE,
+        tags: Optional[Iterable[str]] = None,
+        version: Optional[float] = None,
+        strategy: RoutingStrategy = RoutingStrategy.POWER_OF_TWO,
+        alpha: float = 0.2,
+        cooldown: float = 30.0,
+        refresh_interval: float = 300.0,
+        job_ttl: float = 3600.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if not 0 < alpha <= 1:
+            raise ValueError('`alpha` must be in (0, 1].')
+        self.pipe_type = pipe_type
+        self.tags = set(tags or ())
+        self.version = version
+        self.strategy = RoutingStrategy(strategy)
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.refresh_interval = refresh_interval
+        self.job_ttl = job_ttl
+        self.routes: Dict[UUID, RouteStats] = {}
+        self._rng = rng or random.Random()
+        self._jobs: Dict[UUID, Tuple[RouteStats, float]] = {}
+        self._refreshed: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                str(route.pipeline.id): {
+                    'in_flight': route.in_flight,
+                    'submitted': route.submitted,
+                    'blocked': route.blocked,
+                    'blocked_rate': route.blocked_rate,
+                    'queue_wait': route.queue_wait or 0.0,
+                    'generation_time': route.generation_time or 0.0,
+                }
+                for route in self.routes.values()
+            }
+
+    def _stale(self) -> bool:
+        return self._refreshed is None or time.monotonic() - self._refreshed >= self.refresh_interval
+
+    def _update(self, pipelines: List[Pipeline]) -> None:
+        matching = [pipeline for pipeline in pipelines if self._matches(pipeline)]
+        # A failed refresh leaves the router stale, so the next call asks for the pipelines again.
+        if not matching:
+            raise self._no_match()
+        with self._lock:
+            # Signals of pipelines that are still listed carry over; in-flight jobs keep their own reference.
+            self.routes = {pipeline.id: self._route_for(pipeline) for pipeline in matching}
+            self._refreshed = time.monotonic()
+
+    def _no_match(self) -> ConfigError:
+        return ConfigError(f'No ACTIVE {self.pipe_type.value} pipeline matches the routing filters.')
+
+    def _route_for(self, pipeline: Pipeline) -> RouteStats:
+        route = self.routes.get(pipeline.id)
+        if route is None:
+            return RouteStats(pipeline)
+        route.pipeline = pipeline
+        return route
+
+    def _matches(self, pipeline: Pipeline) -> bool:
+        if pipeline.type != self.pipe_type or pipeline.status != PipelineStatus.ACTIVE:
+            return False
+        if self.version is not None and pipeline.version != self.version:
+            return False
+        names = {tag.name for tag in pipeline.tags} | {tag.name_en for tag in pipeline.tags}
+        return self.tags <= names
+
+    def _candidates(self) -> List[RouteStats]:
+        # Pipelines that recently blocked are tried last, in the order their cooldowns expire.
+        now = time.monotonic()
+        with self._lock:
+            self._expire_jobs(now)
+            routes = list(self.routes.values())
+        if not routes:
+            raise self._no_match()
+        ready = [route for route in routes if route.blocked_until <= now]
+        cooling = sorted((route for route in routes if route.blocked_until > now), key=lambda r: r.blocked_until)
+        ordered: List[RouteStats] = []
+        while ready:
+            route = self._choose(ready)
+            ready.remove(route)
+            ordered.append(route)
+        return ordered + cooling
+
+    def _choose(self, routes: List[RouteStats]) -> RouteStats:
+        if len(routes) == 1:
+            return routes[0]
+        if self.strategy == RoutingStrategy.WEIGHTED:
+            return self._rng.choices(routes, weights=[1 / self._cost(route) for route in routes])[0]
+        first, second = self._rng.sample(routes, 2)
+        return first if self._cost(first) <= self._cost(second) else second
+
+    def _cost(self, route: RouteStats) -> float:
+        # Expected time to a result for one more job: the observed wait and generation time, scaled by the
+        # jobs already queued there and inflated by how often the pipeline turns submissions away. The extra
+        # second keeps unobserved pipelines comparable instead of free.
+        latency = route.expected_latency + 1.0
+        return latency * (route.in_flight + 1) / (1 - 0.95 * route.blocked_rate)
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else (1 - self.alpha) * current + self.alpha * sample
+
+    def _on_submit(self, route: RouteStats, result: RouteResult) -> bool:
+        with self._lock:
+            route.submitted += 1
+            if isinstance(result, RunPipelineBlockedResult):
+                route.blocked += 1
+                route.blocked_rate = self._ewma(route.blocked_rate, 1.0)
+                route.blocked_until = time.monotonic() + self.cooldown
+                return False
+            route.blocked_rate = self._ewma(route.blocked_rate, 0.0)
+            if route.queue_wait is None:
+                route.queue_wait = float(result.status_time)
+            route.in_flight += 1
+            self._jobs[result.uuid] = (route, time.monotonic())
+            return True
+
+    def _expire_jobs(self, now: float) -> None:
+        # Jobs polled through the client directly, or abandoned, never reach `_on_finish`; without this they
+        # would count as in flight forever and keep their pipeline looking busy.
+        # Jobs are kept in submission order, so the scan stops at the first one still within its TTL.
+        while self._jobs:
+            request_id, (route, submitted_at) = next(iter(self._jobs.items()))
+            if now - submitted_at <= self.job_ttl:
+                return
+            del self._jobs[request_id]
+            route.in_flight -= 1
+
+    def _on_status(self, request_id: UUID, status_result: PipelineStatusResult) -> None:
+        if status_result.status in (PipelineResultStatus.DONE, PipelineResultStatus.FAIL):
+            self._on_finish(request_id, status_result)
+
+    def _on_finish(self, request_id: UUID, status_result: Optional[PipelineStatusResult]) -> None:
+        with self._lock:
+            job = self._jobs.pop(request_id, None)
+            if job is None:
+                return
+            route, submitted_at = job
+            route.in_flight -= 1
+            if status_result is None or status_result.status != PipelineResultStatus.DONE:
+                return
+            total = time.monotonic() - submitted_at
+            generation = float(status_result.generationTime or 0)
+            route.generation_time = self._ewma(route.generation_time, generation)
+            route.queue_wait = self._ewma(route.queue_wait, max(total - generation, 0.0))
+
+
+class PipelineRouter(_RouterState):
+    def __init__(
+        self,
+        client: SyncClientProtocol,
+        pipe_type: PipelineType = PipelineType.TEXT2IMAGE,
+        tags: Optional[Iterable[str]] = None,
+        version: Optional[float] = None,
+        strategy: RoutingStrategy = RoutingStrategy.POWER_OF_TWO,
+        alpha: float = 0.2,
+        cooldown: float = 30.0,
+        refresh_interval: float = 300.0,
+        job_ttl: float = 3600.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        super().__init__(pipe_type, tags, version, strategy, alpha, cooldown, refresh_interval, job_ttl, rng)
+        self.client = client
+
+    def refresh(self) -> List[Pipeline]:
+        self._update(self.client.get_pipelines_by_type(self.pipe_type))
+        return [route.pipeline for route in self.routes.values()]
+
+    def run_pipeline(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+    ) -> RouteResult:
+        if self._stale():
+            self.refresh()
+        # A blocked submission is retried on the next pipeline; if all of them block, the last result is returned.
+        for route in self._candidates():
+            result = self.client.run_pipeline(
+                pipeline_id=route.pipeline.id,
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                style=style,
+                height=height,
+                width=width,
+                num_images=num_images,
+            )
+            if self._on_submit(route, result):
+                break
+        return result
+
+    def get_status(self, request_id: UUID) -> PipelineStatusResult:
+        status_result = self.client.get_status(request_id)
+        self._on_status(request_id, status_result)
+        return status_result
+
+    def wait_for_completion(
+        self,
+        request_id: UUID,
+        initial_delay: float,
+        sleep_interval: float = 1,
+        max_retries: int = 5,
+    ) -> PipelineStatusResult:
+        status_result: Optional[PipelineStatusResult] = None
+        try:
+            status_result = self.client.wait_for_completion(request_id, initial_delay, sleep_interval, max_retries)
+        finally:
+            self._on_finish(request_id, status_result)
+        return status_result
+
+
+class AsyncPipelineRouter(_RouterState):
+    def __init__(
+        self,
+        client: AsyncClientProtocol,
+        pipe_type: PipelineType = PipelineType.TEXT2IMAGE,
+        tags: Optional[Iterable[str]] = None,
+        version: Optional[float] = None,
+        strategy: RoutingStrategy = RoutingStrategy.POWER_OF_TWO,
+        alpha: float = 0.2,
+        cooldown: float = 30.0,
+        refresh_interval: float = 300.0,
+        job_ttl: float = 3600.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        super().__init__(pipe_type, tags, version, strategy, alpha, cooldown, refresh_interval, job_ttl, rng)
+        self.client = client
+
+    async def refresh(self) -> List[Pipeline]:
+        self._update(await self.client.get_pipelines_by_type(self.pipe_type))
+        return [route.pipeline for route in self.routes.values()]
+
+    async def run_pipeline(
+        self,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+    ) -> RouteResult:
+        if self._stale():
+            await self.refresh()
+        # A blocked submission is retried on the next pipeline; if all of them block, the last result is returned.
+        for route in self._candidates():
+            result = await self.client.run_pipeline(
+                pipeline_id=route.pipeline.id,
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                style=style,
+                height=height,
+                width=width,
+                num_images=num_images,
+            )
+            if self._on_submit(route, result):
+                break
+        return result
+
+    async def get_status(self, request_id: UUID) -> PipelineStatusResult:
+        status_result = await self.client.get_status(request_id)
+        self._on_status(request_id, status_result)
+        return status_result
+
+    async def wait_for_completion(
+        self,
+        request_id: UUID,
+        initial_delay: float,
+        sleep_interval: float = 1,
+        max_retries: int = 5,
+    ) -> PipelineStatusResult:
+        status_result: Optional[PipelineStatusResult] = None
+        try:
+            status_result = await self.client.wait_for_completion(
+                request_id, initial_delay, sleep_interval, max_retries,
+            )
+        finally:
+            self._on_finish(request_id, status_result)
+        return status_result
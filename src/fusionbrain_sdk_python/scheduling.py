@@ -0,0 +1,309 @@
+import asyncio
+import heapq
+import itertools
+import time
+from enum import Enum, IntEnum
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Set, Type, Union
+from uuid import UUID
+
+from fusionbrain_sdk_python.abstract_client import AsyncClientProtocol
+from fusionbrain_sdk_python.exceptions import DeadlineExceeded, JobShed, QueueFull
+from fusionbrain_sdk_python.limits import RateLimiter
+from fusionbrain_sdk_python.models import RunPipelineBlockedResult, RunPipelineResult, Style
+from fusionbrain_sdk_python.shared_state import offload
+
+SubmitResult = Union[RunPipelineResult, RunPipelineBlockedResult]
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    NORMAL = 1
+    BATCH = 2
+
+
+class OverflowPolicy(str, Enum):
+    BLOCK = 'block'
+    REJECT_NEW = 'reject_new'
+    DROP_OLDEST = 'drop_oldest'
+    DROP_LOWEST_PRIORITY = 'drop_lowest_priority'
+
+
+class _Job:
+    __slots__ = ('deadline', 'enqueued_at', 'future', 'key', 'kwargs', 'priority', 'queued', 'seq')
+
+    def __init__(
+        self,
+        key: float,
+        seq: int,
+        priority: int,
+        deadline: Optional[float],
+        enqueued_at: float,
+        kwargs: Dict[str, Any],
+        future: 'asyncio.Future[SubmitResult]',
+    ) -> None:
+        self.key = key
+        self.seq = seq
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = enqueued_at
+        self.kwargs = kwargs
+        self.future = future
+        self.queued = False
+
+    def __lt__(self, other: '_Job') -> bool:
+        return (self.key, self.seq) < (other.key, other.seq)
+
+
+class AsyncJobScheduler:
+    def __init__(
+        self,
+        client: AsyncClientProtocol,
+        max_concurrency: int = 4,
+        rate_limiter: Optional[RateLimiter] = None,
+        aging: float = 30.0,
+        expected_status_time: Optional[float] = None,
+        status_time_alpha: float = 0.2,
+        max_queue_size: Optional[int] = None,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError('`max_concurrency` must be at least 1.')
+        if max_queue_size is not None and max_queue_size < 1:
+            raise ValueError('`max_queue_size` must be at least 1.')
+        if aging <= 0:
+            raise ValueError('`aging` must be positive.')
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.aging = aging
+        self.status_time_alpha = status_time_alpha
+        self.max_queue_size = max_queue_size
+        self.overflow = OverflowPolicy(overflow)
+        self.in_flight = 0
+        self.dispatched = 0
+        self.expired = 0
+        self.rejected = 0
+        self.shed = 0
+        self.peak_queue_depth = 0
+        self._queued = 0
+        self._space: Optional[asyncio.Semaphore] = None
+        self._expected_status_time = expected_status_time
+        self._heap: List[_Job] = []
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Condition] = None
+        self._dispatcher: Optional[asyncio.Task[None]] = None
+        self._tasks: Set[asyncio.Task[None]] = set()
+
+    async def __aenter__(self) -> 'AsyncJobScheduler':
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    @property
+    def expected_status_time(self) -> Optional[float]:
+        return self._expected_status_time
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'queue_depth': self._queued,
+            'peak_queue_depth': self.peak_queue_depth,
+            'in_flight': self.in_flight,
+            'dispatched': self.dispatched,
+            'expired': self.expired,
+            'rejected': self.rejected,
+            'shed': self.shed,
+            'expected_status_time': self._expected_status_time or 0.0,
+        }
+
+    async def submit(
+        self,
+        pipeline_id: UUID,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+        priority: int = Priority.NORMAL,
+        deadline: Optional[float] = None,
+    ) -> SubmitResult:
+        now = time.monotonic()
+        expected = self._expected_status_time or 0.0
+        if deadline is not None and deadline < expected:
+            self.rejected += 1
+            raise DeadlineExceeded(
+                f'Deadline of {deadline:.1f}s cannot be met, the queue currently takes about {expected:.1f}s.',
+            )
+        absolute_deadline = now + deadline if deadline is not None else None
+        # A job of priority `p` is ordered as if it arrived `p * aging` seconds later, so a waiting batch job
+        # eventually overtakes new interactive work; a deadline pulls the job forward to its latest start time.
+        key = now + priority * self.aging
+        if absolute_deadline is not None:
+            key = min(key, absolute_deadline - expected)
+        future: asyncio.Future[SubmitResult] = asyncio.get_running_loop().create_future()
+        job = _Job(
+            key=key,
+            seq=next(self._seq),
+            priority=priority,
+            deadline=absolute_deadline,
+            enqueued_at=now,
+            kwargs={
+                'pipeline_id': pipeline_id,
+                'prompt': prompt,
+                'negative_prompt': negative_prompt,
+                'style': style,
+                'height': height,
+                'width': width,
+                'num_images': num_images,
+            },
+            future=future,
+        )
+        await self._enqueue(job)
+        return await future
+
+    async def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        for job in self._heap:
+            self._discard(job)
+            job.future.cancel()
+        self._heap.clear()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _enqueue(self, job: _Job) -> None:
+        if self.max_queue_size is not None:
+            await self._make_room(job)
+        changed = self._condition()
+        async with changed:
+            heapq.heappush(self._heap, job)
+            job.queued = True
+            job.future.add_done_callback(lambda _: self._discard(job))
+            self._queued += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self._queued)
+            if len(self._heap) > 2 * self._queued + 64:
+                # Shed and cancelled jobs stay in the heap until popped; drop them once they dominate it.
+                self._heap = [queued for queued in self._heap if queued.queued]
+                heapq.heapify(self._heap)
+            changed.notify_all()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def _make_room(self, job: _Job) -> None:
+        if self.overflow == OverflowPolicy.BLOCK:
+            if self._space is None:
+                self._space = asyncio.Semaphore(self.max_queue_size or 1)
+            await self._space.acquire()
+            return
+        if self._queued < (self.max_queue_size or 0):
+            return
+        victim: Optional[_Job] = None
+        if self.overflow == OverflowPolicy.DROP_OLDEST:
+            victim = min((queued for queued in self._heap if queued.queued), key=lambda queued: queued.seq)
+        elif self.overflow == OverflowPolicy.DROP_LOWEST_PRIORITY:
+            victim = max(
+                (queued for queued in self._heap if queued.queued),
+                key=lambda queued: (queued.priority, queued.key, queued.seq),
+            )
+            if (job.priority, job.key) >= (victim.priority, victim.key):
+                victim = None
+        self.shed += 1
+        if victim is None:
+            raise QueueFull(f'Submission queue is full ({self._queued} jobs), the job was rejected.')
+        self._discard(victim)
+        victim.future.set_exception(JobShed(f'Job was dropped from a full submission queue ({self.overflow.value}).'))
+
+    def _discard(self, job: _Job) -> None:
+        if job.queued:
+            job.queued = False
+            self._queued -= 1
+            if self._space is not None:
+                self._space.release()
+
+    def _condition(self) -> asyncio.Condition:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def _capacity(self) -> int:
+        limiter = getattr(self.client, 'concurrency_limiter', None)
+        return min(self.max_concurrency, limiter.limit) if limiter is not None else self.max_concurrency
+
+    def _ready(self) -> bool:
+        return bool(self._heap) and self.in_flight < self._capacity()
+
+    async def _dispatch(self) -> None:
+        changed = self._condition()
+        while True:
+            async with changed:
+                await changed.wait_for(self._ready)
+            if self.rate_limiter is not None:
+                delay = await offload(self.rate_limiter, self.rate_limiter.reserve)
+                while delay:
+                    await asyncio.sleep(delay)
+                    delay = await offload(self.rate_limiter, self.rate_limiter.reserve)
+            job = self._pop()
+            if job is None:
+                continue
+            self.in_flight += 1
+            self.dispatched += 1
+            task = asyncio.get_running_loop().create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _pop(self) -> Optional[_Job]:
+        now = time.monotonic()
+        expected = self._expected_status_time or 0.0
+        while self._heap:
+            job = heapq.heappop(self._heap)
+            if job.future.done():
+                continue
+            self._discard(job)
+            if job.deadline is not None and now + expected > job.deadline:
+                self.expired += 1
+                job.future.set_exception(DeadlineExceeded(
+                    f'Job waited {now - job.enqueued_at:.1f}s and can no longer meet its deadline.',
+                ))
+                continue
+            return job
+        return None
+
+    async def _execute(self, job: _Job) -> None:
+        try:
+            result = await self.client.run_pipeline(**job.kwargs)
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as exc:
+            if not job.future.done():
+                job.future.set_exception(exc)
+        else:
+            if isinstance(result, RunPipelineResult):
+                self._observe(result.status_time)
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            changed = self._condition()
+            async with changed:
+                changed.notify_all()
+
+    def _observe(self, status_time: float) -> None:
+        if self._expected_status_time is None:
+            self._expected_status_time = float(status_time)
+        else:
+            alpha = self.status_time_alpha
+            self._expected_status_time = (1 - alpha) * self._expected_status_time + alpha * status_time
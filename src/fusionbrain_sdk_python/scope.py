@@ -0,0 +1,224 @@
+import asyncio
+from concurrent.futures import Future
+from types import TracebackType
+from typing import Any, Coroutine, Dict, Optional, Set, Type, TypeVar, Union
+from uuid import UUID
+
+from fusionbrain_sdk_python.abstract_client import AsyncClientProtocol
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.models import (
+    DecodedPipelineResult,
+    PipelineStatusResult,
+    RunPipelineBlockedResult,
+    Style,
+)
+
+T = TypeVar('T')
+JobResult = Union[PipelineStatusResult, DecodedPipelineResult, RunPipelineBlockedResult]
+
+
+class AsyncJobScope:
+    def __init__(
+        self,
+        client: AsyncClientProtocol,
+        timeout: Optional[float] = None,
+        sleep_interval: float = 1,
+        max_retries: int = 5,
+    ) -> None:
+        self.client = client
+        self.timeout = timeout
+        self.sleep_interval = sleep_interval
+        self.max_retries = max_retries
+        self.pending: Set[UUID] = set()
+        self.cancelled = False
+        self.timed_out = False
+        self._tasks: Set[asyncio.Task[Any]] = set()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._error: Optional[BaseException] = None
+        self._closed = False
+
+    async def __aenter__(self) -> 'AsyncJobScope':
+        if self.timeout is not None:
+            self._timer = asyncio.get_running_loop().call_later(self.timeout, self._expire)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if exc_type is not None:
+            self.cancel()
+        try:
+            while self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+        finally:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+        # A CancelledError in the body comes from awaiting a job that the scope itself cancelled.
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            return
+        if self.timed_out:
+            raise TimeoutError(f'Job scope timed out after {self.timeout} seconds.') from exc
+        if self._error is not None:
+            raise self._error
+
+    def stats(self) -> Dict[str, float]:
+        return {'running': len(self._tasks), 'pending': len(self.pending)}
+
+    def submit(
+        self,
+        pipeline_id: UUID,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+        decode: bool = False,
+    ) -> 'asyncio.Task[JobResult]':
+        return self.spawn(self._generate(
+            {
+                'pipeline_id': pipeline_id,
+                'prompt': prompt,
+                'negative_prompt': negative_prompt,
+                'style': style,
+                'height': height,
+                'width': width,
+                'num_images': num_images,
+            },
+            decode,
+        ))
+
+    def spawn(self, coro: Coroutine[Any, Any, T]) -> 'asyncio.Task[T]':
+        if self._closed or self.cancelled:
+            coro.close()
+            raise RuntimeError('Job scope is closed, no new work can be started in it.')
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        for task in self._tasks:
+            task.cancel()
+
+    def _expire(self) -> None:
+        self.timed_out = True
+        self.cancel()
+
+    def _done(self, task: 'asyncio.Task[Any]') -> None:
+        self._tasks.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        # Like a TaskGroup, the first failure cancels the sibling jobs and is raised when the scope exits.
+        if self._error is None:
+            self._error = task.exception()
+            self.cancel()
+
+    async def _generate(self, kwargs: Dict[str, Any], decode: bool) -> JobResult:
+        run_result = await self.client.run_pipeline(**kwargs)
+        if isinstance(run_result, RunPipelineBlockedResult):
+            return run_result
+        request_id = run_result.uuid
+        self.pending.add(request_id)
+        try:
+            status_result = await self.client.wait_for_completion(
+                request_id=request_id,
+                initial_delay=run_result.status_time,
+                sleep_interval=self.sleep_interval,
+                max_retries=self.max_retries,
+            )
+        except BaseException:
+            # Nobody will read this result any more, so the bytes reserved for it go back to the budget.
+            budget = getattr(self.client, 'byte_budget', None)
+            if budget is not None:
+                await budget.release_key(str(request_id))
+            raise
+        finally:
+            self.pending.discard(request_id)
+        if decode:
+            return await self.client.decode_result(status_result)
+        return status_result
+
+
+class JobScope:
+    def __init__(
+        self,
+        client: FBClient,
+        timeout: Optional[float] = None,
+        sleep_interval: float = 1,
+        max_retries: int = 5,
+    ) -> None:
+        if client.loop is None or client.async_client is None:
+            raise ConfigError('JobScope needs the background engine, pass `background_loop=True` to the client.')
+        if client.byte_budget is not None or client.concurrency_limiter is not None:
+            raise ConfigError('`byte_budget` and `concurrency_limiter` only apply to blocking calls, not to JobScope.')
+        self.loop = client.loop
+        self.scope = AsyncJobScope(client.async_client, timeout, sleep_interval, max_retries)
+
+    def __enter__(self) -> 'JobScope':
+        self.loop.run(self.scope.__aenter__())
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.loop.run(self.scope.__aexit__(exc_type, exc, tb))
+
+    @property
+    def pending(self) -> Set[UUID]:
+        return self.scope.pending
+
+    def stats(self) -> Dict[str, float]:
+        return self.scope.stats()
+
+    def submit(
+        self,
+        pipeline_id: UUID,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        style: Optional[Union[str, Style]] = None,
+        height: int = 1024,
+        width: int = 1024,
+        num_images: int = 1,
+        decode: bool = False,
+    ) -> Future[JobResult]:
+        future: Future[JobResult] = Future()
+
+        def start() -> None:
+            try:
+                task = self.scope.submit(
+                    pipeline_id, prompt, negative_prompt, style, height, width, num_images, decode=decode,
+                )
+            except RuntimeError as exc:
+                future.set_exception(exc)
+                return
+            task.add_done_callback(lambda done: _copy(done, future))
+
+        self.loop.loop.call_soon_threadsafe(start)
+        return future
+
+    def cancel(self) -> None:
+        self.loop.loop.call_soon_threadsafe(self.scope.cancel)
+
+
+def _copy(task: 'asyncio.Task[T]', future: 'Future[T]') -> None:
+    if future.done():
+        return
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
@@ -10,9 +10,10 @@ from urllib3.util.retry import Retry  # type: ignore
 
 
 class Session:
-    def __init__(self, retries: int = 5, backoff_factor: float = 0.3) -> None:
+    def __init__(self, retries: int = 5, backoff_factor: float = 0.3, pool_maxsize: int = 10) -> None:
         self.retries = retries
         self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
         self.session = self._create_retry_session()
 
     def _create_retry_session(self) -> requests.Session:
@@ -24,8 +25,10 @@ class Session:
             backoff_factor=self.backoff_factor,
             allowed_methods=None,
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=self.pool_maxsize)
         session.mount('https://', adapter)
+        # Plain HTTP (local fake servers) keeps requests' no-retry default but gets the same pool size.
+        session.mount('http://', HTTPAdapter(pool_maxsize=self.pool_maxsize))
         return session
 
     def get_session(self) -> requests.Session:
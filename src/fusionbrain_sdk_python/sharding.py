@@ -0,0 +1,221 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple, Type, Union
+from uuid import UUID
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.exceptions import WorkerError
+from fusionbrain_sdk_python.models import (
+    DecodedPipelineResult,
+    PipelineStatusResult,
+    RunPipelineBlockedResult,
+)
+from fusionbrain_sdk_python.processing import ResultProcessor
+
+ShardValue = Union[PipelineStatusResult, DecodedPipelineResult, RunPipelineBlockedResult]
+
+_SUBMIT_FIELDS = ('prompt', 'negative_prompt', 'style', 'width', 'height', 'num_images')
+
+
+@dataclass
+class ShardResult:
+    index: int
+    result: Optional[ShardValue] = None
+    error: Optional[BaseException] = None
+
+
+@dataclass(frozen=True)
+class _WorkerOptions:
+    pipeline_id: Optional[str]
+    concurrency: int
+    sleep_interval: float
+    max_retries: int
+    decode: bool
+
+
+class ShardedExecutor:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        pipeline_id: Optional[Union[str, UUID]] = None,
+        concurrency: int = 16,
+        max_pending: Optional[int] = None,
+        sleep_interval: float = 1,
+        max_retries: int = 5,
+        decode: bool = False,
+        mp_context: str = 'spawn',
+        **client_kwargs: Any,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers * concurrency
+        self.client_kwargs = client_kwargs
+        self.options = _WorkerOptions(
+            pipeline_id=str(pipeline_id) if pipeline_id is not None else None,
+            concurrency=concurrency,
+            sleep_interval=sleep_interval,
+            max_retries=max_retries,
+            decode=decode,
+        )
+        self._context: Any = multiprocessing.get_context(mp_context)
+        self._processes: List[Any] = []
+        self._tasks: Any = None
+        self._results: Any = None
+
+    def __enter__(self) -> 'ShardedExecutor':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close(cancel=exc_type is not None)
+
+    def map(
+        self,
+        requests: Iterable[Mapping[str, Any]],
+        ordered: bool = True,
+        return_exceptions: bool = False,
+    ) -> Iterator[ShardResult]:
+        self._start()
+        source = enumerate(requests)
+        exhausted = False
+        pending = 0
+        buffered: Dict[int, ShardResult] = {}
+        next_index = 0
+        try:
+            while True:
+                while not exhausted and pending < self.max_pending:
+                    item = next(source, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    self._tasks.put((item[0], dict(item[1])))
+                    pending += 1
+                if not pending:
+                    break
+                shard_result = self._next_result()
+                pending -= 1
+                if shard_result.error is not None and not return_exceptions:
+                    raise shard_result.error
+                if not ordered:
+                    yield shard_result
+                    continue
+                buffered[shard_result.index] = shard_result
+                while next_index in buffered:
+                    yield buffered.pop(next_index)
+                    next_index += 1
+        finally:
+            if pending:
+                # The caller stopped early or a job failed: the queued and running jobs are abandoned.
+                self.close(cancel=True)
+
+    def close(self, cancel: bool = False) -> None:
+        if not self._processes:
+            return
+        if cancel:
+            for process in self._processes:
+                process.terminate()
+        else:
+            for _ in self._processes:
+                self._tasks.put(None)
+        for process in self._processes:
+            process.join()
+        self._processes = []
+        self._tasks = self._results = None
+
+    def _start(self) -> None:
+        if self._processes:
+            return
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+        for _ in range(self.workers):
+            process = self._context.Process(
+                target=_worker_main,
+                args=(self.client_kwargs, self.options, self._tasks, self._results),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+    def _next_result(self) -> ShardResult:
+        while True:
+            try:
+                return self._results.get(timeout=1)
+            except queue.Empty:
+                dead = [process for process in self._processes if not process.is_alive()]
+                if dead:
+                    raise WorkerError(f'Worker process exited unexpectedly with code {dead[0].exitcode}.') from None
+
+
+def _worker_main(
+    client_kwargs: Dict[str, Any],
+    options: _WorkerOptions,
+    tasks: Any,
+    results: Any,
+) -> None:
+    asyncio.run(_serve(client_kwargs, options, tasks, results))
+
+
+async def _serve(client_kwargs: Dict[str, Any], options: _WorkerOptions, tasks: Any, results: Any) -> None:
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(options.concurrency)
+    running: Set[asyncio.Task[None]] = set()
+    # The shard is already a separate process, and a daemonic worker cannot start a process pool of its own.
+    client_kwargs.setdefault('result_processor', ResultProcessor(process_threshold=sys.maxsize))
+    async with AsyncFBClient(**client_kwargs) as client:
+        while True:
+            await slots.acquire()
+            task: Optional[Tuple[int, Dict[str, Any]]] = await loop.run_in_executor(None, tasks.get)
+            if task is None:
+                break
+            job = loop.create_task(_generate(client, options, task[0], task[1], results))
+            running.add(job)
+            job.add_done_callback(running.discard)
+            job.add_done_callback(lambda _: slots.release())
+        await asyncio.gather(*running)
+
+
+async def _generate(
+    client: AsyncFBClient,
+    options: _WorkerOptions,
+    index: int,
+    request: Dict[str, Any],
+    results: Any,
+) -> None:
+    try:
+        pipeline_id = request.get('pipeline_id', options.pipeline_id)
+        if pipeline_id is None:
+            raise ValueError('`pipeline_id` must be set on the executor or on every request.')
+        run_result = await client.run_pipeline(
+            pipeline_id=UUID(str(pipeline_id)),
+            **{key: request[key] for key in _SUBMIT_FIELDS if key in request},
+        )
+        value: ShardValue = run_result if isinstance(run_result, RunPipelineBlockedResult) else (
+            await client.wait_for_completion(
+                request_id=run_result.uuid,
+                initial_delay=run_result.status_time,
+                sleep_interval=options.sleep_interval,
+                max_retries=options.max_retries,
+            )
+        )
+        if options.decode and isinstance(value, PipelineStatusResult):
+            value = await client.decode_result(value)
+        results.put(ShardResult(index, result=value))
+    except Exception as exc:
+        results.put(ShardResult(index, error=_picklable(exc)))
+
+
+def _picklable(exc: Exception) -> BaseException:
+    try:
+        pickle.loads(pickle.dumps(exc))
+    except Exception:
+        return WorkerError(f'{type(exc).__name__}: {exc}')
+    return exc
@@ -0,0 +1,285 @@
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Protocol, Tuple, TypeVar
+
+from fusionbrain_sdk_python.exceptions import CircuitOpen
+
+T = TypeVar('T')
+
+_PURGE_EXPIRED = 'DELETE FROM state WHERE expires IS NOT NULL AND expires <= ?'
+# Sets the expiry only on a key INCRBY has just created (PTTL -1), keeping the TTL of an existing window.
+_INCR_WITH_TTL = """
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if redis.call('PTTL', KEYS[1]) == -1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return value
+"""
+
+
+class StateStore(Protocol):
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int: ...
+    def get(self, key: str) -> Optional[str]: ...
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None: ...
+    def delete(self, key: str) -> None: ...
+
+
+class MemoryStateStore:
+    def __init__(self) -> None:
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            current = self._live(key)
+            value = amount if current is None else int(current[0]) + amount
+            expires = current[1] if current is not None else _expires(ttl)
+            self._data[key] = (str(value), expires)
+            return value
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            current = self._live(key)
+            return current[0] if current is not None else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, _expires(ttl))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _live(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        current = self._data.get(key)
+        if current is not None and current[1] is not None and current[1] <= time.time():
+            del self._data[key]
+            return None
+        return current
+
+
+class SQLiteStateStore:
+    def __init__(self, path: str, timeout: float = 5.0, purge_every: int = 1000) -> None:
+        if purge_every < 1:
+            raise ValueError('`purge_every` must be at least 1.')
+        self.path = path
+        self.timeout = timeout
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT value, expires FROM state WHERE key = ?', (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                value, expires = amount, _expires(ttl)
+            else:
+                value, expires = int(row[0]) + amount, row[1]
+            conn.execute('INSERT OR REPLACE INTO state (key, value, expires) VALUES (?, ?, ?)', (key, value, expires))
+            return value
+
+    def get(self, key: str) -> Optional[str]:
+        with self._transaction(write=False) as conn:
+            row = conn.execute('SELECT value, expires FROM state WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return str(row[0])
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO state (key, value, expires) VALUES (?, ?, ?)',
+                (key, value, _expires(ttl)),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM state WHERE key = ?', (key,))
+
+    def purge(self) -> None:
+        with self._transaction() as conn:
+            conn.execute(_PURGE_EXPIRED, (time.time(),))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    @contextmanager
+    def _transaction(self, write: bool = True) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            conn = self._connection()
+            if not write:
+                yield conn
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                self._writes += 1
+                if self._writes % self.purge_every == 0:
+                    # Rate windows leave a row behind every period, expired rows are swept now and then.
+                    conn.execute(_PURGE_EXPIRED, (time.time(),))
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection must not cross a fork, so every worker process opens its own.
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)')
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+
+class RedisStateStore:
+    def __init__(self, client: Any, prefix: str = 'fusionbrain:') -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        if ttl is None:
+            return int(self.client.incrby(self.prefix + key, amount))
+        # One atomic step, so a key that expires between two commands cannot come back without a TTL.
+        return int(self.client.eval(_INCR_WITH_TTL, 1, self.prefix + key, amount, max(1, math.ceil(ttl * 1000))))
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return value.decode() if isinstance(value, bytes) else str(value)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self.client.set(self.prefix + key, value, px=max(1, math.ceil(ttl * 1000)) if ttl is not None else None)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+class SharedRateLimiter:
+    def __init__(self, store: StateStore, rate: int, period: float = 1.0, name: str = 'rate') -> None:
+        if rate < 1:
+            raise ValueError('`rate` must be at least 1.')
+        if period <= 0:
+            raise ValueError('`period` must be positive.')
+        self.store = store
+        self.rate = rate
+        self.period = period
+        self.name = name
+
+    def try_acquire(self) -> bool:
+        return self.reserve() == 0
+
+    def reserve(self) -> float:
+        # Fixed windows aligned to wall-clock time, so every process counts into the same window.
+        now = time.time()
+        window = math.floor(now / self.period)
+        count = self.store.incr(f'{self.name}:{window}', ttl=2 * self.period)
+        if count <= self.rate:
+            return 0.0
+        return (window + 1) * self.period - now
+
+
+class SharedCircuitBreaker:
+    def __init__(
+        self,
+        store: StateStore,
+        failure_threshold: int = 5,
+        window: float = 30.0,
+        reset_timeout: float = 30.0,
+        name: str = 'breaker',
+    ) -> None:
+        if failure_threshold < 1:
+            raise ValueError('`failure_threshold` must be at least 1.')
+        self.store = store
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.name = name
+
+    @property
+    def is_open(self) -> bool:
+        open_until = self.store.get(f'{self.name}:open_until')
+        return open_until is not None and float(open_until) > time.time()
+
+    def check(self) -> None:
+        if self.store.get(f'{self.name}:tripped') is None:
+            return
+        if self.is_open:
+            raise CircuitOpen('Circuit breaker is open after repeated failures, the request was not sent.')
+        # Half-open: the first caller across all processes to claim the probe is let through, the rest wait for
+        # its outcome. An abandoned probe expires after `reset_timeout`.
+        if self.store.incr(f'{self.name}:probe', ttl=self.reset_timeout) > 1:
+            raise CircuitOpen('Circuit breaker is half-open with a probe in flight, the request was not sent.')
+
+    def record_success(self) -> None:
+        if self.store.get(f'{self.name}:failures') is not None:
+            self.store.delete(f'{self.name}:failures')
+        if self.store.get(f'{self.name}:tripped') is not None:
+            self.store.delete(f'{self.name}:tripped')
+            self.store.delete(f'{self.name}:probe')
+
+    def record_failure(self) -> None:
+        if self.store.get(f'{self.name}:tripped') is not None:
+            # A failed probe, or a late failure of a call sent before the breaker opened.
+            self._open()
+            return
+        failures = self.store.incr(f'{self.name}:failures', ttl=self.window)
+        if failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.store.set(f'{self.name}:open_until', str(time.time() + self.reset_timeout), ttl=self.reset_timeout)
+        self.store.set(f'{self.name}:tripped', '1')
+        self.store.delete(f'{self.name}:failures')
+        self.store.delete(f'{self.name}:probe')
+
+
+class SharedInFlightCounter:
+    def __init__(self, store: StateStore, limit: Optional[int] = None, name: str = 'in_flight') -> None:
+        self.store = store
+        self.limit = limit
+        self.name = name
+
+    @property
+    def value(self) -> int:
+        return int(self.store.get(self.name) or 0)
+
+    def try_enter(self) -> bool:
+        count = self.store.incr(self.name)
+        if self.limit is not None and count > self.limit:
+            self.store.incr(self.name, -1)
+            return False
+        return True
+
+    def exit(self) -> None:
+        self.store.incr(self.name, -1)
+
+
+def blocks_loop(component: Any) -> bool:
+    # Anything backed by a store other than process memory may wait on a file lock or the network.
+    store = getattr(component, 'store', None)
+    return store is not None and not isinstance(store, MemoryStateStore)
+
+
+async def offload(component: Any, func: Callable[[], T]) -> T:
+    # SQLite and Redis backed limits wait on file locks or round trips, which must not stall the loop.
+    if blocks_loop(component):
+        return await asyncio.to_thread(func)
+    return func()
+
+
+def _expires(ttl: Optional[float]) -> Optional[float]:
+    return time.time() + ttl if ttl is not None else None
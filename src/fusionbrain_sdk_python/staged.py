@@ -0,0 +1,245 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, Mapping, Optional, Union
+
+from fusionbrain_sdk_python.abstract_client import AsyncClientProtocol
+from fusionbrain_sdk_python.models import PipelineStatusResult, RunPipelineBlockedResult
+from fusionbrain_sdk_python.protocol import RunTemplate
+
+_SUBMIT_FIELDS = ('pipeline_id', 'prompt', 'negative_prompt', 'style', 'width', 'height', 'num_images')
+
+
+class StageExecutor(str, Enum):
+    ASYNC = 'async'
+    THREAD = 'thread'
+    PROCESS = 'process'
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    executor: StageExecutor = StageExecutor.ASYNC
+    queue_size: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.workers < 1:
+            raise ValueError(f'Stage {self.name!r} needs at least one worker.')
+        self.executor = StageExecutor(self.executor)
+
+
+@dataclass
+class StagedResult:
+    index: int
+    item: Any
+    value: Any = None
+    error: Optional[BaseException] = None
+    stage: Optional[str] = None
+
+
+@dataclass
+class _StageStats:
+    processed: int = 0
+    failed: int = 0
+    busy: int = 0
+    seconds: float = 0.0
+    first_started: Optional[float] = None
+    last_finished: Optional[float] = None
+
+
+@dataclass
+class _Envelope:
+    index: int
+    item: Any
+    value: Any = field(default=None)
+
+
+_DONE = object()
+
+
+class StagedPipeline:
+    def __init__(self, stages: List[Stage], output_size: int = 16) -> None:
+        if not stages:
+            raise ValueError('A staged pipeline needs at least one stage.')
+        if len({stage.name for stage in stages}) != len(stages):
+            raise ValueError('Stage names must be unique.')
+        self.stages = stages
+        self.output_size = output_size
+        self._stats: Dict[str, _StageStats] = {stage.name: _StageStats() for stage in stages}
+        self._queues: List[asyncio.Queue[Any]] = []
+
+    @classmethod
+    def for_client(
+        cls,
+        client: AsyncClientProtocol,
+        sink: Optional[Callable[[Any], Any]] = None,
+        submit_workers: int = 4,
+        track_workers: int = 16,
+        decode_workers: int = 2,
+        sink_workers: int = 2,
+        sink_executor: StageExecutor = StageExecutor.THREAD,
+        sleep_interval: float = 1,
+        max_retries: int = 5,
+        decode: bool = True,
+        template: Optional[RunTemplate] = None,
+    ) -> 'StagedPipeline':
+        async def submit(request: Union[str, Mapping[str, Any]]) -> Any:
+            if isinstance(request, str):
+                if template is None:
+                    raise ValueError('Plain prompts need a `template` to submit with.')
+                return await client.run_template(template, request)
+            return await client.run_pipeline(**{key: request[key] for key in _SUBMIT_FIELDS if key in request})
+
+        async def track(run_result: Any) -> Any:
+            if isinstance(run_result, RunPipelineBlockedResult):
+                return run_result
+            return await client.wait_for_completion(
+                request_id=run_result.uuid,
+                initial_delay=run_result.status_time,
+                sleep_interval=sleep_interval,
+                max_retries=max_retries,
+            )
+
+        async def decode_result(status_result: Any) -> Any:
+            if not isinstance(status_result, PipelineStatusResult):
+                return status_result
+            return await client.decode_result(status_result)
+
+        stages = [
+            Stage('submit', submit, submit_workers),
+            Stage('track', track, track_workers),
+        ]
+        if decode:
+            stages.append(Stage('decode', decode_result, decode_workers))
+        if sink is not None:
+            stages.append(Stage('sink', sink, sink_workers, sink_executor))
+        return cls(stages)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        result = {}
+        for position, stage in enumerate(self.stages):
+            stats = self._stats[stage.name]
+            elapsed = (stats.last_finished or now) - stats.first_started if stats.first_started is not None else 0.0
+            result[stage.name] = {
+                'processed': stats.processed,
+                'failed': stats.failed,
+                'busy': stats.busy,
+                'queue_depth': self._queues[position].qsize() if self._queues else 0,
+                'mean_latency': stats.seconds / (stats.processed + stats.failed or 1),
+                'throughput': stats.processed / elapsed if elapsed > 0 else 0.0,
+            }
+        return result
+
+    async def run(
+        self,
+        items: Union[Iterable[Any], AsyncIterable[Any]],
+        return_exceptions: bool = False,
+    ) -> AsyncIterator[StagedResult]:
+        # Every stage reads from its own bounded queue, so a slow stage stalls the ones before it instead of
+        # letting finished work pile up in memory; results arrive in completion order.
+        self._queues = [asyncio.Queue(maxsize=stage.queue_size or 2 * stage.workers) for stage in self.stages]
+        output: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.output_size)
+        executors = [self._executor(stage) for stage in self.stages]
+        loop = asyncio.get_running_loop()
+        tasks = [loop.create_task(self._feed(items, output))]
+        for position, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                tasks.append(loop.create_task(self._work(position, executors[position], output, remaining)))
+        try:
+            while True:
+                result = await output.get()
+                if result is _DONE:
+                    break
+                # A failure of the input itself (no stage) ends the run whatever `return_exceptions` says.
+                if result.error is not None and (result.stage is None or not return_exceptions):
+                    raise result.error
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _feed(self, items: Union[Iterable[Any], AsyncIterable[Any]], output: 'asyncio.Queue[Any]') -> None:
+        first = self._queues[0]
+        index = 0
+        try:
+            if isinstance(items, AsyncIterable):
+                async for item in items:
+                    await first.put(_Envelope(index, item, item))
+                    index += 1
+            else:
+                for item in items:
+                    await first.put(_Envelope(index, item, item))
+                    index += 1
+        except Exception as exc:
+            await output.put(StagedResult(index, None, error=exc))
+        # Sent after a failing input too, otherwise the stages would wait for more items forever.
+        for _ in range(self.stages[0].workers):
+            await first.put(_DONE)
+
+    async def _work(
+        self,
+        position: int,
+        executor: Optional[Executor],
+        output: 'asyncio.Queue[Any]',
+        remaining: List[int],
+    ) -> None:
+        stage = self.stages[position]
+        stats = self._stats[stage.name]
+        inbox = self._queues[position]
+        last = position == len(self.stages) - 1
+        while True:
+            envelope = await inbox.get()
+            if envelope is _DONE:
+                break
+            started = time.monotonic()
+            if stats.first_started is None:
+                stats.first_started = started
+            stats.busy += 1
+            try:
+                envelope.value = await self._call(stage, executor, envelope.value)
+            except Exception as exc:
+                stats.failed += 1
+                await output.put(StagedResult(envelope.index, envelope.item, error=exc, stage=stage.name))
+                continue
+            else:
+                stats.processed += 1
+            finally:
+                stats.busy -= 1
+                stats.last_finished = time.monotonic()
+                stats.seconds += stats.last_finished - started
+            if last:
+                await output.put(StagedResult(envelope.index, envelope.item, envelope.value, stage=stage.name))
+            else:
+                await self._queues[position + 1].put(envelope)
+        remaining[0] -= 1
+        if remaining[0]:
+            return
+        # The last worker of a stage to finish hands the end-of-input marker on to the next stage.
+        if last:
+            await output.put(_DONE)
+        else:
+            for _ in range(self.stages[position + 1].workers):
+                await self._queues[position + 1].put(_DONE)
+
+    async def _call(self, stage: Stage, executor: Optional[Executor], value: Any) -> Any:
+        if executor is None:
+            result = stage.func(value)
+            return await result if asyncio.iscoroutine(result) else result
+        return await asyncio.get_running_loop().run_in_executor(executor, stage.func, value)
+
+    def _executor(self, stage: Stage) -> Optional[Executor]:
+        if stage.executor == StageExecutor.THREAD:
+            return ThreadPoolExecutor(max_workers=stage.workers, thread_name_prefix=f'stage-{stage.name}')
+        if stage.executor == StageExecutor.PROCESS:
+            return ProcessPoolExecutor(max_workers=stage.workers)
+        return None
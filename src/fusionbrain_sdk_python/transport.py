@@ -0,0 +1,254 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Mapping, Optional, Protocol
+
+import aiohttp
+import requests
+from requests.exceptions import HTTPError
+from requests.structures import CaseInsensitiveDict
+
+from fusionbrain_sdk_python.background import BackgroundLoop
+from fusionbrain_sdk_python.compression import CHUNK_SIZE, CompressionPolicy, StreamDecoder
+from fusionbrain_sdk_python.protocol import HTTPRequest
+from fusionbrain_sdk_python.session import Session
+
+BeforeRead = Callable[[Optional[int]], None]
+AsyncBeforeRead = Callable[[Optional[int]], Awaitable[None]]
+
+
+@dataclass
+class HTTPResponse:
+    status: int
+    headers: Mapping[str, str] = field(default_factory=dict)
+    body: bytes = b''
+    reason: Optional[str] = None
+    raw: Any = field(default=None, repr=False)
+
+    @property
+    def content_length(self) -> Optional[int]:
+        value = self.headers.get('Content-Length')
+        return int(value) if value is not None else None
+
+
+def negotiate(compression: Optional[CompressionPolicy], request: HTTPRequest) -> Mapping[str, str]:
+    if compression is None:
+        return request.headers
+    return {**request.headers, 'Accept-Encoding': compression.accept_encoding(request.endpoint)}
+
+
+def expected_size(
+    compression: Optional[CompressionPolicy],
+    request: HTTPRequest,
+    headers: Mapping[str, str],
+) -> Optional[int]:
+    value = headers.get('Content-Length')
+    content_length = int(value) if value is not None else None
+    if compression is None:
+        return content_length
+    # Content-Length counts compressed bytes; a byte budget has to admit the decoded size.
+    return compression.decoded_size(request.endpoint, headers.get('Content-Encoding', ''), content_length)
+
+
+class Transport(Protocol):
+    def send(self, request: HTTPRequest, before_read: Optional[BeforeRead] = None) -> HTTPResponse: ...
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception: ...
+    def close(self) -> None: ...
+
+
+class AsyncTransport(Protocol):
+    async def send(self, request: HTTPRequest, before_read: Optional[AsyncBeforeRead] = None) -> HTTPResponse: ...
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception: ...
+    async def close(self) -> None: ...
+
+
+class RequestsTransport:
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        compression: Optional[CompressionPolicy] = None,
+        pool_maxsize: int = 10,
+    ) -> None:
+        self.base_session = session or Session(pool_maxsize=pool_maxsize).get_session()
+        self.compression = compression
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        # A requests.Session is not thread-safe (cookie jar, merged settings), so every thread gets its own
+        # copy. The copies share the adapters, and with them one connection pool.
+        session: Optional[requests.Session] = getattr(self._local, 'session', None)
+        if session is None:
+            session = _thread_session(self.base_session)
+            self._local.session = session
+        return session
+
+    def send(self, request: HTTPRequest, before_read: Optional[BeforeRead] = None) -> HTTPResponse:
+        response = self.session.request(
+            request.method,
+            request.url,
+            headers=negotiate(self.compression, request),
+            data=request.body,
+            stream=before_read is not None or self.compression is not None,
+        )
+        if before_read is not None and response.status_code == request.expected_status:
+            before_read(expected_size(self.compression, request, response.headers))
+        if self.compression is None:
+            body = response.content
+        else:
+            # urllib3 hands over the raw bytes, so the wire size is known and decoding is timed on its own.
+            decoder = StreamDecoder(self.compression, request.endpoint, response.headers.get('Content-Encoding'))
+            for chunk in response.raw.stream(CHUNK_SIZE, decode_content=False):
+                decoder.feed(chunk)
+            body = decoder.finish()
+            response.raw.release_conn()
+        return HTTPResponse(response.status_code, response.headers, body, response.reason, response)
+
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:  # noqa: ARG002
+        return HTTPError(message, response=response.raw)
+
+    def warmup(self, url: str, connections: int) -> int:
+        # urllib3 discards connections beyond the pool size once they are returned, so opening more is wasted.
+        connections = min(connections, getattr(self.base_session.get_adapter(url), '_pool_maxsize', connections))
+        # Each request keeps its connection checked out until all of them are open, so the pool cannot hand a
+        # finished one to another request; they are returned to the pool together afterwards.
+        barrier = threading.Barrier(connections)
+
+        def touch(_: int) -> None:
+            try:
+                response = self.session.head(url, allow_redirects=False, stream=True)
+            except BaseException:
+                barrier.abort()
+                raise
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            finally:
+                response.content
+
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            list(pool.map(touch, range(connections)))
+        return connections
+
+    def close(self) -> None:
+        self.base_session.close()
+
+
+def _thread_session(base: requests.Session) -> requests.Session:
+    session = requests.Session()
+    session.headers = CaseInsensitiveDict(base.headers)
+    session.auth = base.auth
+    session.proxies = dict(base.proxies)
+    session.hooks = {event: list(hooks) for event, hooks in base.hooks.items()}
+    session.params = dict(base.params) if isinstance(base.params, dict) else base.params
+    session.verify = base.verify
+    session.cert = base.cert
+    session.trust_env = base.trust_env
+    session.max_redirects = base.max_redirects
+    session.cookies.update(base.cookies)
+    session.adapters = base.adapters
+    return session
+
+
+class AiohttpTransport:
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        compression: Optional[CompressionPolicy] = None,
+        **session_kwargs: Any,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.compression = compression
+        self.session_kwargs = session_kwargs
+        if compression is not None:
+            self.session_kwargs.setdefault('auto_decompress', False)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # One pooled session per event loop; a session cannot be shared across loops.
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host),
+                **self.session_kwargs,
+            )
+            self._loop = loop
+        return self._session
+
+    async def send(self, request: HTTPRequest, before_read: Optional[AsyncBeforeRead] = None) -> HTTPResponse:
+        async with self.session.request(
+            request.method,
+            request.url,
+            headers=negotiate(self.compression, request),
+            data=request.body,
+        ) as response:
+            if before_read is not None and response.status == request.expected_status:
+                await before_read(expected_size(self.compression, request, response.headers))
+            if self.compression is None:
+                body = await response.read()
+            else:
+                decoder = StreamDecoder(self.compression, request.endpoint, response.headers.get('Content-Encoding'))
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    decoder.feed(chunk)
+                body = decoder.finish()
+            return HTTPResponse(response.status, response.headers, body, response.reason, response)
+
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:  # noqa: ARG002
+        return aiohttp.ClientResponseError(
+            request_info=response.raw.request_info,
+            history=response.raw.history,
+            status=response.status,
+            message=message,
+            headers=response.raw.headers,
+        )
+
+    async def warmup(self, url: str, connections: int) -> int:
+        connections = min([connections] + [limit for limit in (self.limit, self.limit_per_host) if limit])
+
+        async def touch() -> None:
+            async with self.session.head(url, allow_redirects=False):
+                pass
+
+        await asyncio.gather(*(touch() for _ in range(connections)))
+        return connections
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class BackgroundTransport:
+    def __init__(self, loop: BackgroundLoop, transport: AsyncTransport) -> None:
+        self.loop = loop
+        self.transport = transport
+
+    def send(self, request: HTTPRequest, before_read: Optional[BeforeRead] = None) -> HTTPResponse:
+        if before_read is None:
+            return self.loop.run(self.transport.send(request))
+        hook = before_read
+
+        async def admit(content_length: Optional[int]) -> None:
+            # The hook may block, e.g. on a ByteBudget, so it must not run on the shared loop itself.
+            await asyncio.to_thread(hook, content_length)
+
+        return self.loop.run(self.transport.send(request, admit))
+
+    def error(self, request: HTTPRequest, response: HTTPResponse, message: str) -> Exception:
+        return self.transport.error(request, response, message)
+
+    def warmup(self, url: str, connections: int) -> int:
+        warmup = getattr(self.transport, 'warmup', None)
+        if warmup is None:
+            return 0
+        return int(self.loop.run(warmup(url, connections)))
+
+    def close(self) -> None:
+        if self.loop.running:
+            self.loop.run(self.transport.close())
@@ -0,0 +1,43 @@
+import asyncio
+import socket
+from dataclasses import dataclass
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.models import Pipeline, Style
+
+
+@dataclass
+class WarmupResult:
+    pipelines: List[Pipeline]
+    styles: List[Style]
+    connections: int
+    elapsed: float
+
+
+def resolve(url: str) -> None:
+    host, port = _address(url)
+    try:
+        socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise ConfigError(f'Cannot resolve {host}: {exc}.') from exc
+
+
+async def async_resolve(url: str) -> None:
+    host, port = _address(url)
+    try:
+        await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise ConfigError(f'Cannot resolve {host}: {exc}.') from exc
+
+
+def origins(*urls: str) -> List[str]:
+    # The API and the styles CDN can be the same server, which then only needs warming once.
+    seen = dict.fromkeys(f'{parts.scheme}://{parts.netloc}/' for parts in map(urlsplit, urls))
+    return list(seen)
+
+
+def _address(url: str) -> Tuple[str, int]:
+    parts = urlsplit(url)
+    return parts.hostname or '', parts.port or (443 if parts.scheme == 'https' else 80)
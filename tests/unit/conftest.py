@@ -15,10 +15,11 @@ def client(monkeypatch):
 
 
 @pytest_asyncio.fixture
-def async_client(monkeypatch):
+async def async_client(monkeypatch):
     monkeypatch.setenv('FB_API_KEY', 'FB_API_KEY')
     monkeypatch.setenv('FB_API_SECRET', 'FB_API_SECRET')
-    return AsyncFBClient()
+    async with AsyncFBClient() as client:
+        yield client
 
 
 @pytest.fixture
@@ -0,0 +1,122 @@
+import asyncio
+import uuid
+from concurrent.futures import CancelledError
+
+import pytest
+from aiohttp import ClientResponseError
+
+from fusionbrain_sdk_python.background import BackgroundLoop
+from fusionbrain_sdk_python.budget import ByteBudget
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.concurrency import AIMDLimiter
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import PipelineResultStatus, PipelineStatusResult, RunPipelineResult
+from fusionbrain_sdk_python.scope import JobScope
+from fusionbrain_sdk_python.transport import RequestsTransport
+
+
+@pytest.fixture(scope='module')
+def fake_server():
+    with FakeServer(generation_time=0.05) as server:
+        yield server
+
+
+@pytest.fixture
+def background_client(fake_server):
+    with FBClient(x_key='key', x_secret='secret', api_host=fake_server.url, background_loop=True) as client:
+        yield client
+
+
+def test_background_loop():
+    loop = BackgroundLoop()
+
+    async def nested():
+        return loop.run(asyncio.sleep(0))
+
+    assert loop.run(asyncio.sleep(0, result=42)) == 42
+    assert loop.submit(asyncio.sleep(0, result=7)).result() == 7
+    with pytest.raises(RuntimeError):
+        loop.run(nested())
+    loop.close()
+    assert not loop.running
+
+
+def test_close_cancels_pending_tasks():
+    loop = BackgroundLoop()
+    cleaned_up = []
+
+    async def forever():
+        try:
+            await asyncio.Event().wait()
+        finally:
+            cleaned_up.append(True)
+
+    future = loop.submit(forever())
+    loop.close()
+    with pytest.raises(CancelledError):
+        future.result(timeout=1)
+    assert cleaned_up == [True]
+
+
+def test_blocking_calls(background_client):
+    assert background_client.get_pipelines()[0].id == uuid.UUID(PIPELINE_ID)
+    run_result = background_client.run_pipeline(uuid.UUID(PIPELINE_ID), 'A red cat')
+    assert isinstance(run_result, RunPipelineResult)
+    status_result = background_client.wait_for_completion(run_result.uuid, initial_delay=0, sleep_interval=0.02,
+                                                          max_retries=50)
+    assert status_result.status == PipelineResultStatus.DONE
+    with pytest.raises(ClientResponseError, match='In response to'):
+        background_client.get_status(uuid.uuid4())
+
+
+def test_batch_helpers(background_client, fake_server):
+    requests_before = fake_server.request_count
+    futures = background_client.run_pipeline_batch(
+        {'pipeline_id': uuid.UUID(PIPELINE_ID), 'prompt': f'prompt {i}'} for i in range(5)
+    )
+    request_ids = [future.result().uuid for future in futures]
+    statuses = [future.result() for future in background_client.get_status_batch(request_ids)]
+    assert all(isinstance(status, PipelineStatusResult) for status in statuses)
+    completed = background_client.wait_for_completion_batch(request_ids, initial_delay=0.05, sleep_interval=0.02,
+                                                             max_retries=50)
+    assert all(future.result().status == PipelineResultStatus.DONE for future in completed)
+    assert fake_server.request_count - requests_before >= 15
+
+
+def test_byte_budget_in_background_mode(fake_server):
+    budget = ByteBudget(max_bytes=10_000_000)
+    with FBClient(x_key='key', x_secret='secret', api_host=fake_server.url, background_loop=True,
+                  byte_budget=budget) as client:
+        run_result = client.run_pipeline(uuid.UUID(PIPELINE_ID), 'A red cat', width=64, height=64)
+        client.wait_for_completion(run_result.uuid, initial_delay=0.05, sleep_interval=0.02, max_retries=50)
+    assert budget.in_flight == 0
+    assert budget.peak > 0
+
+
+@pytest.mark.parametrize('limits', [
+    {'byte_budget': ByteBudget(max_bytes=10)},
+    {'concurrency_limiter': AIMDLimiter(initial_limit=1, max_limit=1)},
+])
+def test_batch_helpers_refuse_blocking_limits(fake_server, limits):
+    with FBClient(x_key='key', x_secret='secret', api_host=fake_server.url, background_loop=True, **limits) as client:
+        with pytest.raises(ConfigError, match='only apply to blocking calls'):
+            client.run_pipeline_batch([{'pipeline_id': uuid.UUID(PIPELINE_ID), 'prompt': 'A red cat'}])
+        with pytest.raises(ConfigError, match='only apply to blocking calls'):
+            JobScope(client)
+
+
+def test_close_stops_loop(fake_server):
+    client = FBClient(
+        x_key='key', x_secret='secret', api_host=fake_server.url, styles_url=fake_server.styles_url, background_loop=True,
+    )
+    assert client.get_styles()[0].name == 'DEFAULT'
+    client.close()
+    assert not client.loop.running
+
+
+def test_requires_background_mode(client):
+    with pytest.raises(ConfigError):
+        client.get_status_batch([uuid.uuid4()])
+    with pytest.raises(ConfigError):
+        FBClient(x_key='key', x_secret='secret', transport=RequestsTransport(), background_loop=True)
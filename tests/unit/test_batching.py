@@ -0,0 +1,115 @@
+import asyncio
+import uuid
+
+import pytest
+
+from fusionbrain_sdk_python.batching import AsyncPromptBatcher
+from fusionbrain_sdk_python.models import (
+    ModelStatus,
+    PipelineResult,
+    PipelineResultStatus,
+    PipelineStatusResult,
+    RunPipelineBlockedResult,
+    RunPipelineResult,
+    Style,
+)
+
+PIPELINE_ID = uuid.uuid4()
+
+
+class StubClient:
+    def __init__(self, blocked=False, error=None):
+        self.calls = []
+        self.blocked = blocked
+        self.error = error
+
+    async def run_pipeline(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error is not None:
+            raise self.error
+        if self.blocked:
+            return RunPipelineBlockedResult(model_status=ModelStatus.DISABLED_BY_QUEUE)
+        return RunPipelineResult(uuid=uuid.uuid4(), status=PipelineResultStatus.INITIAL, status_time=0)
+
+    async def wait_for_completion(self, request_id, initial_delay, sleep_interval, max_retries):
+        num_images = self.calls[-1]['num_images']
+        return PipelineStatusResult(
+            uuid=request_id,
+            status=PipelineResultStatus.DONE,
+            result=PipelineResult(files=[f'image-{i}' for i in range(num_images)], censored=False),
+        )
+
+
+@pytest.mark.asyncio
+async def test_identical_prompts_are_merged():
+    client = StubClient()
+    batcher = AsyncPromptBatcher(client, window=0.01)
+    results = await asyncio.gather(
+        batcher.submit(PIPELINE_ID, 'cat'),
+        batcher.submit(PIPELINE_ID, 'cat', num_images=2),
+        batcher.submit(PIPELINE_ID, 'dog'),
+    )
+    assert len(client.calls) == 2
+    assert sorted(call['num_images'] for call in client.calls) == [1, 3]
+    assert results[0].result.files == ['image-0']
+    assert results[1].result.files == ['image-1', 'image-2']
+    assert results[2].result.files == ['image-0']
+    assert results[0].uuid == results[1].uuid != results[2].uuid
+    assert batcher.stats() == {'requests': 3, 'submissions': 2, 'pending': 0}
+
+
+@pytest.mark.asyncio
+async def test_style_object_and_name_share_a_batch():
+    client = StubClient()
+    batcher = AsyncPromptBatcher(client, window=0.01)
+    style = Style(name='ANIME', title='Аниме', titleEn='Anime', image='https://example.invalid/a.png')
+    await asyncio.gather(
+        batcher.submit(PIPELINE_ID, 'cat', style=style),
+        batcher.submit(PIPELINE_ID, 'cat', style='ANIME'),
+    )
+    assert len(client.calls) == 1
+    assert client.calls[0]['num_images'] == 2
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_flushed_without_waiting():
+    client = StubClient()
+    batcher = AsyncPromptBatcher(client, window=60, max_num_images=2)
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.submit(PIPELINE_ID, 'cat') for _ in range(4))),
+        timeout=1,
+    )
+    assert [call['num_images'] for call in client.calls] == [2, 2]
+    assert [result.result.files for result in results] == [['image-0'], ['image-1']] * 2
+
+
+@pytest.mark.asyncio
+async def test_oversized_request_is_rejected():
+    batcher = AsyncPromptBatcher(StubClient(), max_num_images=2)
+    with pytest.raises(ValueError):
+        await batcher.submit(PIPELINE_ID, 'cat', num_images=3)
+
+
+@pytest.mark.asyncio
+async def test_blocked_result_and_errors_fan_out():
+    batcher = AsyncPromptBatcher(StubClient(blocked=True), window=0.01)
+    results = await asyncio.gather(*(batcher.submit(PIPELINE_ID, 'cat') for _ in range(2)))
+    assert all(isinstance(result, RunPipelineBlockedResult) for result in results)
+
+    batcher = AsyncPromptBatcher(StubClient(error=RuntimeError('boom')), window=0.01)
+    results = await asyncio.gather(*(batcher.submit(PIPELINE_ID, 'cat') for _ in range(2)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_batch():
+    client = StubClient()
+    batcher = AsyncPromptBatcher(client, window=0.01)
+    first = asyncio.create_task(batcher.submit(PIPELINE_ID, 'cat'))
+    second = asyncio.create_task(batcher.submit(PIPELINE_ID, 'cat'))
+    await asyncio.sleep(0)
+    first.cancel()
+    result = await second
+    assert result.result.files == ['image-1']
+    await batcher.flush()
+    assert client.calls[0]['num_images'] == 2
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+import uuid
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+import requests_mock
+from aioresponses import aioresponses
+from requests import HTTPError
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.budget import AsyncByteBudget, ByteBudget
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.models import PipelineResultStatus, RunPipelineBlockedResult
+
+RUN_URL = 'https://api-key.fusionbrain.ai/key/api/v1/pipeline/run'
+REQUEST_ID = 'ffffffff-ffff-4e5e-ab06-ffffffffffff'
+STATUS_URL = f'https://api-key.fusionbrain.ai/key/api/v1/pipeline/status/{REQUEST_ID}'
+
+
+@pytest.fixture
+def budget_client(monkeypatch):
+    monkeypatch.setenv('FB_API_KEY', 'FB_API_KEY')
+    monkeypatch.setenv('FB_API_SECRET', 'FB_API_SECRET')
+    return FBClient(byte_budget=ByteBudget(max_bytes=10_000, bytes_per_pixel=1))
+
+
+@pytest_asyncio.fixture
+async def async_budget_client(monkeypatch):
+    monkeypatch.setenv('FB_API_KEY', 'FB_API_KEY')
+    monkeypatch.setenv('FB_API_SECRET', 'FB_API_SECRET')
+    async with AsyncFBClient(byte_budget=AsyncByteBudget(max_bytes=10_000, bytes_per_pixel=1)) as client:
+        yield client
+
+
+def test_estimate():
+    assert ByteBudget(max_bytes=1, bytes_per_pixel=2).estimate(num_images=2, width=10, height=20) == 800
+
+
+def test_acquire_blocks_until_release():
+    budget = ByteBudget(max_bytes=100)
+    budget.acquire(80)
+    released = []
+
+    def release():
+        time.sleep(0.05)
+        released.append(True)
+        budget.release(80)
+
+    threading.Thread(target=release).start()
+    budget.acquire(50)
+    assert released
+    assert budget.in_flight == 50
+
+
+def test_acquire_timeout():
+    budget = ByteBudget(max_bytes=100)
+    budget.acquire(80)
+    with pytest.raises(TimeoutError):
+        budget.acquire(50, timeout=0.01)
+
+
+def test_oversized_payload_admitted_alone():
+    budget = ByteBudget(max_bytes=100)
+    assert budget.acquire(1000) == 100
+    assert budget.available == 0
+
+
+def test_reservations():
+    budget = ByteBudget(max_bytes=100)
+    budget.reserve('job', budget.acquire(40))
+    assert budget.reserved('job') == 40
+    assert budget.release_key('job') == 40
+    assert budget.in_flight == 0
+    assert budget.peak == 40
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_blocks_until_release():
+    budget = AsyncByteBudget(max_bytes=100)
+    await budget.acquire(80)
+    waiter = asyncio.create_task(budget.acquire(50))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    await budget.release(80)
+    assert await waiter == 50
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_timeout():
+    budget = AsyncByteBudget(max_bytes=100)
+    await budget.acquire(80)
+    with pytest.raises(TimeoutError):
+        await budget.acquire(50, timeout=0.01)
+
+
+def test_client_reserves_until_done(budget_client, pipeline_status_result):
+    with requests_mock.Mocker() as m:
+        m.post(RUN_URL, status_code=HTTPStatus.CREATED, json={'status': 'INITIAL', 'uuid': REQUEST_ID, 'status_time': 1})
+        budget_client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море', width=50, height=50)
+        assert budget_client.byte_budget.in_flight == 2500
+
+        processing = pipeline_status_result.build(uuid=REQUEST_ID, status=PipelineResultStatus.PROCESSING)
+        m.get(STATUS_URL, json=processing.model_dump(mode='json'))
+        budget_client.get_status(uuid.UUID(REQUEST_ID))
+        assert budget_client.byte_budget.in_flight == 2500
+
+        done = pipeline_status_result.build(uuid=REQUEST_ID, status=PipelineResultStatus.DONE)
+        m.get(STATUS_URL, json=done.model_dump(mode='json'))
+        budget_client.get_status(uuid.UUID(REQUEST_ID))
+        assert budget_client.byte_budget.in_flight == 0
+
+
+def test_client_releases_blocked_reservation(budget_client):
+    with requests_mock.Mocker() as m:
+        m.post(RUN_URL, status_code=HTTPStatus.CREATED, json={'model_status': 'DISABLED_BY_QUEUE'})
+        got = budget_client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море', width=50, height=50)
+    assert isinstance(got, RunPipelineBlockedResult)
+    assert budget_client.byte_budget.in_flight == 0
+
+
+def test_client_releases_failed_reservation(budget_client):
+    with pytest.raises(HTTPError, match='In response to *'):
+        with requests_mock.Mocker() as m:
+            m.post(RUN_URL, status_code=HTTPStatus.INTERNAL_SERVER_ERROR)
+            budget_client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море', width=50, height=50)
+    assert budget_client.byte_budget.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_async_client_reserves_until_done(async_budget_client, pipeline_status_result):
+    with aioresponses() as m:
+        m.post(RUN_URL, status=HTTPStatus.CREATED, payload={'status': 'INITIAL', 'uuid': REQUEST_ID, 'status_time': 1})
+        await async_budget_client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море', width=50, height=50)
+        assert async_budget_client.byte_budget.in_flight == 2500
+
+        done = pipeline_status_result.build(uuid=REQUEST_ID, status=PipelineResultStatus.DONE)
+        m.get(STATUS_URL, payload=done.model_dump(mode='json'))
+        await async_budget_client.get_status(uuid.UUID(REQUEST_ID))
+        assert async_budget_client.byte_budget.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_async_client_releases_blocked_reservation(async_budget_client):
+    with aioresponses() as m:
+        m.post(RUN_URL, status=HTTPStatus.CREATED, payload={'model_status': 'DISABLED_BY_QUEUE'})
+        got = await async_budget_client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море', width=50, height=50)
+    assert isinstance(got, RunPipelineBlockedResult)
+    assert async_budget_client.byte_budget.in_flight == 0
+
+
+def test_client_releases_abandoned_reservation(budget_client, pipeline_status_result):
+    with requests_mock.Mocker() as m:
+        m.post(RUN_URL, status_code=HTTPStatus.CREATED, json={'status': 'INITIAL', 'uuid': REQUEST_ID, 'status_time': 1})
+        budget_client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море', width=50, height=50)
+        processing = pipeline_status_result.build(uuid=REQUEST_ID, status=PipelineResultStatus.PROCESSING)
+        m.get(STATUS_URL, json=processing.model_dump(mode='json'))
+        with pytest.raises(TimeoutError):
+            budget_client.wait_for_completion(uuid.UUID(REQUEST_ID), initial_delay=0, sleep_interval=0, max_retries=2)
+        assert budget_client.byte_budget.in_flight == 0
+
+        budget_client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море', width=50, height=50)
+        m.get(STATUS_URL, status_code=HTTPStatus.INTERNAL_SERVER_ERROR)
+        with pytest.raises(HTTPError):
+            budget_client.get_status(uuid.UUID(REQUEST_ID))
+        assert budget_client.byte_budget.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_async_client_releases_abandoned_reservation(async_budget_client, pipeline_status_result):
+    with aioresponses() as m:
+        m.post(RUN_URL, status=HTTPStatus.CREATED, payload={'status': 'INITIAL', 'uuid': REQUEST_ID, 'status_time': 1})
+        await async_budget_client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море', width=50, height=50)
+        processing = pipeline_status_result.build(uuid=REQUEST_ID, status=PipelineResultStatus.PROCESSING)
+        m.get(STATUS_URL, payload=processing.model_dump(mode='json'), repeat=True)
+        with pytest.raises(TimeoutError):
+            await async_budget_client.wait_for_completion(
+                uuid.UUID(REQUEST_ID), initial_delay=0, sleep_interval=0, max_retries=2,
+            )
+    assert async_budget_client.byte_budget.in_flight == 0
@@ -0,0 +1,144 @@
+import threading
+import uuid
+
+import pytest
+from polyfactory.factories.pydantic_factory import ModelFactory
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.catalogue import Catalogue
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import Pipeline, PipelineStatus, PipelineType, Style, Tag
+
+
+class PipelineFactory(ModelFactory[Pipeline]): ...
+
+
+def make_pipelines():
+    return [
+        PipelineFactory.build(
+            name='Kandinsky', tags=[Tag(name='Быстрый', name_en='Fast')], status=PipelineStatus.ACTIVE,
+            type=PipelineType.TEXT2IMAGE, version=3.1,
+        ),
+        PipelineFactory.build(
+            name='Kandinsky', tags=[Tag(name='Качество', name_en='Quality')], status=PipelineStatus.DISABLED_BY_QUEUE,
+            type=PipelineType.TEXT2IMAGE, version=3.0,
+        ),
+        PipelineFactory.build(
+            name='Sketch', tags=[Tag(name='Быстрый', name_en='Fast')], status=PipelineStatus.ACTIVE,
+            type=PipelineType.TEXT2IMAGE, version=1.0,
+        ),
+    ]
+
+
+STYLES = [
+    Style(name='DEFAULT', title='Свой стиль', titleEn='No style', image='d.png'),
+    Style(name='ANIME', title='Аниме', titleEn='Anime', image='a.png'),
+]
+
+
+def test_lookups():
+    fast, quality, sketch = make_pipelines()
+    catalogue = Catalogue([fast, quality, sketch], STYLES)
+
+    assert len(catalogue) == 3
+    assert fast.id in catalogue
+    assert catalogue.get(quality.id) is quality
+    assert catalogue.get(uuid.uuid4()) is None
+    assert catalogue.by_name('kandinsky') == (fast, quality)
+    assert catalogue.by_tag('fast') == (fast, sketch)
+    assert catalogue.by_tag('Быстрый') == (fast, sketch)
+    assert catalogue.by_status(PipelineStatus.DISABLED_BY_QUEUE) == (quality,)
+    assert catalogue.by_type(PipelineType.TEXT2IMAGE) == (fast, quality, sketch)
+    assert catalogue.find(name='Kandinsky', status=PipelineStatus.ACTIVE) == (fast,)
+    assert catalogue.find(tag='Quality', status=PipelineStatus.ACTIVE) == ()
+    assert catalogue.style('anime') is STYLES[1]
+    with pytest.raises(ValueError, match='ANIME, DEFAULT'):
+        catalogue.style('NEON')
+    with pytest.raises(TypeError):
+        catalogue.pipelines[fast.id] = fast
+
+
+def test_refresh_only_reindexes_changes():
+    fast, quality, sketch = make_pipelines()
+    catalogue = Catalogue([fast, quality, sketch], STYLES)
+
+    same, diff = catalogue.refresh([p.model_copy() for p in (fast, quality, sketch)])
+    assert same is catalogue
+    assert diff.unchanged
+
+    moved = quality.model_copy(update={'status': PipelineStatus.ACTIVE})
+    added = PipelineFactory.build(
+        name='Video', tags=[], status=PipelineStatus.ACTIVE, type=PipelineType.TEXT2IMAGE,
+    )
+    refreshed, diff = catalogue.refresh([fast.model_copy(), moved, added], [STYLES[0]])
+
+    assert diff.added == (added.id,)
+    assert diff.removed == (sketch.id,)
+    assert diff.changed == (quality.id,)
+    assert diff.styles_removed == ('ANIME',)
+    # Unchanged entries are shared with the previous catalogue.
+    assert refreshed.get(fast.id) is fast
+    assert refreshed.by_tag('fast') == (fast,)
+    assert refreshed.by_status(PipelineStatus.DISABLED_BY_QUEUE) == ()
+    assert refreshed.find(name='kandinsky', status=PipelineStatus.ACTIVE) == (fast, moved)
+    assert refreshed.by_name('video') == (added,)
+    # Index buckets no change touched stay shared as well.
+    resketched, _ = catalogue.refresh([fast, quality, sketch.model_copy(update={'description': 'new'})])
+    assert resketched.indexes['tag']['quality'] is catalogue.indexes['tag']['quality']
+    assert resketched.by_name('sketch')[0].description == 'new'
+    # The old catalogue is untouched, so readers holding it see a consistent snapshot.
+    assert catalogue.by_tag('fast') == (fast, sketch)
+    assert catalogue.style('ANIME') is STYLES[1]
+
+
+def test_concurrent_readers_during_refresh():
+    pipelines = make_pipelines()
+    catalogue = Catalogue(pipelines, STYLES)
+    holder = [catalogue]
+    errors = []
+
+    def read():
+        for _ in range(2000):
+            snapshot = holder[0]
+            if len(snapshot.by_tag('fast')) + len(snapshot.by_tag('quality')) != len(snapshot):
+                errors.append(snapshot)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for i in range(200):
+        status = PipelineStatus.ACTIVE if i % 2 else PipelineStatus.DISABLED_MANUALLY
+        holder[0], _ = holder[0].refresh([pipelines[0].model_copy(update={'status': status}), *pipelines[1:]])
+    for reader in readers:
+        reader.join()
+    assert not errors
+
+
+def test_client_validates_styles_against_catalogue():
+    with FakeServer() as server, FBClient(
+        x_key='key', x_secret='secret', api_host=server.url, styles_url=server.styles_url,
+    ) as client:
+        client.run_pipeline(uuid.UUID(PIPELINE_ID), 'A red cat', style='NEON')
+        diff = client.refresh_catalogue()
+        assert diff.added == (uuid.UUID(PIPELINE_ID),)
+        assert client.refresh_catalogue().unchanged
+        with pytest.raises(ValueError, match='Unknown style'):
+            client.run_pipeline(uuid.UUID(PIPELINE_ID), 'A red cat', style='NEON')
+        requests = server.request_count
+        client.run_pipeline(uuid.UUID(PIPELINE_ID), 'A red cat', style='anime')
+        assert server.request_count == requests + 1
+
+
+@pytest.mark.asyncio
+async def test_async_warmup_builds_catalogue():
+    with FakeServer() as server:
+        async with AsyncFBClient(
+            x_key='key', x_secret='secret', api_host=server.url, styles_url=server.styles_url,
+        ) as client:
+            await client.warmup(connections=0)
+            assert client.catalogue is not None
+            assert client.catalogue.get(uuid.UUID(PIPELINE_ID)) is not None
+            assert set(client.catalogue.styles) == {'default', 'anime'}
+            with pytest.raises(ValueError):
+                await client.run_pipeline(uuid.UUID(PIPELINE_ID), 'A red cat', style='NEON')
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from fusionbrain_sdk_python.cli import BatchRunner, image_suffix, iter_records, load_completed, main
+from fusionbrain_sdk_python.fake_server import FakeServer
+
+
+@pytest.fixture
+def prompts(tmp_path):
+    path = tmp_path / 'prompts.jsonl'
+    path.write_text(
+        '\n'.join(json.dumps(record, ensure_ascii=False) for record in [
+            {'id': 'sea', 'prompt': 'Море', 'style': 'ANIME', 'width': 512, 'height': 512},
+            {'id': 'cat', 'prompt': 'A red cat', 'negative_prompt': 'dog', 'num_images': 2},
+            {'prompt': 'A blue bird'},
+        ]),
+        encoding='utf-8',
+    )
+    return path
+
+
+@pytest.fixture
+def fake_server():
+    with FakeServer() as server:
+        yield server
+
+
+def read_manifest(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_iter_records_csv(tmp_path):
+    path = tmp_path / 'prompts.csv'
+    path.write_text('prompt,width,height,style\nМоре,512,256,\nCat,,,ANIME\n', encoding='utf-8')
+    got = list(iter_records(path))
+    assert got == [
+        {'prompt': 'Море', 'width': 512, 'height': 256, 'id': '0'},
+        {'prompt': 'Cat', 'style': 'ANIME', 'id': '1'},
+    ]
+
+
+def test_load_completed_skips_truncated_lines(tmp_path):
+    manifest = tmp_path / 'manifest.jsonl'
+    manifest.write_text('{"id": "a", "status": "DONE"}\n{"id": "b", "status": "ERROR"}\n{"id": "c", "st', encoding='utf-8')
+    assert load_completed(manifest) == {'a'}
+
+
+@pytest.mark.parametrize('image, suffix', [
+    (b'\x89PNG\r\n\x1a\n...', '.png'),
+    (b'\xff\xd8\xff\xe0...', '.jpg'),
+    (b'RIFF\x00\x00\x00\x00WEBPVP8 ', '.webp'),
+    (b'GIF89a...', '.gif'),
+    (b'unknown', '.bin'),
+])
+def test_image_suffix(image, suffix):
+    assert image_suffix(image) == suffix
+
+
+def test_generate_rejects_unsafe_ids(tmp_path):
+    source = tmp_path / 'prompts.jsonl'
+    source.write_text('\n'.join(json.dumps({'id': record_id, 'prompt': 'A red cat'}) for record_id in [
+        '../escape', '/tmp/absolute', '..', 'ok',
+    ]), encoding='utf-8')
+    output = tmp_path / 'out'
+    code = main(['generate', '--input', str(source), '--output', str(output), '--dry-run', '--quiet',
+                 '--sleep-interval', '0.01'])
+    assert code == 1
+    entries = {entry['id']: entry for entry in read_manifest(output / 'manifest.jsonl')}
+    assert entries['ok']['status'] == 'DONE'
+    assert entries['ok']['files'][0].endswith('ok_0.png')
+    assert all(entries[record_id]['status'] == 'ERROR' for record_id in ['../escape', '/tmp/absolute', '..'])
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['out', 'prompts.jsonl']
+
+
+def test_generate_dry_run(tmp_path, prompts):
+    output = tmp_path / 'out'
+    code = main(['generate', '--input', str(prompts), '--output', str(output), '--dry-run', '--quiet',
+                 '--sleep-interval', '0.01'])
+    assert code == 0
+    entries = read_manifest(output / 'manifest.jsonl')
+    assert sorted(entry['id'] for entry in entries) == ['2', 'cat', 'sea']
+    assert all(entry['status'] == 'DONE' for entry in entries)
+    cat = next(entry for entry in entries if entry['id'] == 'cat')
+    assert len(cat['files']) == 2
+    assert all((output / path).exists() for entry in entries for path in entry['files'])
+
+
+def test_generate_resume(tmp_path, prompts, fake_server, monkeypatch):
+    monkeypatch.setenv('FB_API_KEY', 'FB_API_KEY')
+    monkeypatch.setenv('FB_API_SECRET', 'FB_API_SECRET')
+    output = tmp_path / 'out'
+    output.mkdir()
+    (output / 'manifest.jsonl').write_text('{"id": "sea", "status": "DONE", "files": []}\n', encoding='utf-8')
+    code = main(['generate', '--input', str(prompts), '--output', str(output), '--resume', '--quiet',
+                 '--api-host', fake_server.url, '--sleep-interval', '0.01'])
+    assert code == 0
+    assert len(fake_server.jobs) == 2
+    assert sorted(entry['id'] for entry in read_manifest(output / 'manifest.jsonl')) == ['2', 'cat', 'sea']
+
+
+def test_failing_worker_stops_the_run(tmp_path, monkeypatch):
+    async def broken_generate(self, record):
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(BatchRunner, '_generate', broken_generate)
+    source = tmp_path / 'prompts.jsonl'
+    source.write_text('\n'.join(json.dumps({'prompt': f'prompt {i}'}) for i in range(50)), encoding='utf-8')
+    with pytest.raises(OSError, match='No space left'):
+        main(['generate', '--input', str(source), '--output', str(tmp_path / 'out'), '--dry-run', '--quiet',
+              '--concurrency', '2'])
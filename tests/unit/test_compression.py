@@ -0,0 +1,126 @@
+import gzip
+import uuid
+import zlib
+
+import pytest
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.compression import IDENTITY, CompressionPolicy, Decoder, StreamDecoder
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import PipelineResultStatus
+from fusionbrain_sdk_python.transport import RequestsTransport
+
+PAYLOAD = b'{"files": ["' + b'A' * 10_000 + b'"]}'
+
+
+@pytest.fixture(scope='module')
+def compressing_server():
+    with FakeServer(compress=True, image_size=100_000) as server:
+        yield server
+
+
+def decode_in_chunks(encoding, data, size=100):
+    decoder = Decoder(encoding)
+    return b''.join(decoder.decompress(data[i:i + size]) for i in range(0, len(data), size)) + decoder.flush()
+
+
+@pytest.mark.parametrize(('encoding', 'data'), [
+    ('gzip', gzip.compress(PAYLOAD)),
+    ('deflate', zlib.compress(PAYLOAD)),
+    ('deflate', zlib.compress(PAYLOAD)[2:-4]),
+    ('', PAYLOAD),
+    (IDENTITY, PAYLOAD),
+])
+def test_decoder(encoding, data):
+    assert decode_in_chunks(encoding, data) == PAYLOAD
+
+
+def test_unknown_encodings_are_rejected():
+    with pytest.raises(ConfigError):
+        Decoder('compress')
+    with pytest.raises(ConfigError, match='Cannot decode'):
+        CompressionPolicy(encodings=['gzip', 'compress'])
+
+
+def test_policy_skips_compression_that_does_not_pay_off():
+    policy = CompressionPolicy(min_samples=3, probe_every=4)
+    for _ in range(3):
+        assert policy.accept_encoding('run_pipeline').startswith(policy.encodings[0])
+        decoder = StreamDecoder(policy, 'run_pipeline', 'gzip')
+        decoder.feed(gzip.compress(b'{"uuid": 1}'))
+        decoder.finish()
+    decoder = StreamDecoder(policy, 'get_status', 'gzip')
+    decoder.feed(gzip.compress(PAYLOAD))
+    assert decoder.finish() == PAYLOAD
+
+    advertised = ', '.join(policy.encodings)
+    assert [policy.accept_encoding('run_pipeline') for _ in range(4)] == [advertised, IDENTITY, IDENTITY, IDENTITY]
+    assert policy.accept_encoding('get_status') == advertised
+    stats = policy.stats()
+    assert stats['run_pipeline']['skipped']
+    assert stats['get_status']['decoded_bytes'] == len(PAYLOAD)
+    assert stats['get_status']['ratio'] < 0.1
+    assert policy.decoded_size('get_status', 'gzip', 100) > 1000
+    assert policy.decoded_size('get_status', IDENTITY, 100) == 100
+
+
+def test_policy_reconsiders_when_payloads_become_compressible():
+    policy = CompressionPolicy(min_samples=3, probe_every=10)
+    for _ in range(200):
+        policy.accept_encoding('get_status')
+        policy.record('get_status', 'gzip', wire_bytes=1000, decoded_bytes=1000, decode_seconds=0)
+    assert policy.stats()['get_status']['skipped']
+
+    advertised = ', '.join(policy.encodings)
+    probes = 0
+    while policy.stats()['get_status']['skipped']:
+        if policy.accept_encoding('get_status') == advertised:
+            probes += 1
+            policy.record('get_status', 'gzip', wire_bytes=100, decoded_bytes=1000, decode_seconds=0)
+    assert probes == 1
+    assert policy.decoded_size('get_status', 'gzip', 100) > 100
+    with pytest.raises(ValueError):
+        CompressionPolicy(min_samples=0)
+
+
+def test_sync_client_decodes_and_measures(compressing_server):
+    policy = CompressionPolicy()
+    with FBClient(
+        x_key='key', x_secret='secret', api_host=compressing_server.url,
+        styles_url=compressing_server.styles_url, compression=policy,
+    ) as client:
+        run_result = client.run_pipeline(uuid.UUID(PIPELINE_ID), 'A red cat')
+        status_result = client.wait_for_completion(run_result.uuid, initial_delay=0, sleep_interval=0.01)
+        assert len(client.get_styles()) == 2
+    assert status_result.status == PipelineResultStatus.DONE
+    stats = policy.stats()
+    assert stats['get_status']['wire_bytes'] < stats['get_status']['decoded_bytes'] / 10
+    assert stats['get_styles']['compressed_responses'] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_client_decodes_and_measures(compressing_server):
+    policy = CompressionPolicy(encodings=['deflate'])
+    async with AsyncFBClient(
+        x_key='key', x_secret='secret', api_host=compressing_server.url, compression=policy,
+    ) as client:
+        run_result = await client.run_pipeline(uuid.UUID(PIPELINE_ID), 'A red cat')
+        status_result = await client.wait_for_completion(run_result.uuid, initial_delay=0, sleep_interval=0.01)
+    assert status_result.status == PipelineResultStatus.DONE
+    assert policy.stats()['get_status']['ratio'] < 0.1
+
+
+def test_plain_server_and_invalid_combinations():
+    policy = CompressionPolicy()
+    with FakeServer() as server, FBClient(
+        x_key='key', x_secret='secret', api_host=server.url, compression=policy,
+    ) as client:
+        client.get_pipelines()
+    stats = policy.stats()['get_pipelines']
+    assert stats['wire_bytes'] == stats['decoded_bytes']
+    assert stats['compressed_responses'] == 0
+
+    with pytest.raises(ConfigError):
+        FBClient(x_key='key', x_secret='secret', transport=RequestsTransport(), compression=policy)
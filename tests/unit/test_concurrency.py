@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+import uuid
+from http import HTTPStatus
+
+import pytest
+import requests
+import requests_mock
+from aioresponses import aioresponses
+from requests import HTTPError
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.concurrency import AIMDLimiter, AsyncAIMDLimiter, is_overload, is_overload_error
+from fusionbrain_sdk_python.exceptions import CircuitOpen
+from fusionbrain_sdk_python.models import ModelStatus, RunPipelineBlockedResult
+
+RUN_URL = 'https://api-key.fusionbrain.ai/key/api/v1/pipeline/run'
+CREATED = {'status': 'INITIAL', 'uuid': 'ffffffff-ffff-4e5e-ab06-ffffffffffff', 'status_time': 17}
+
+
+@pytest.mark.parametrize('status_code, result, expected', [
+    (HTTPStatus.CREATED, RunPipelineBlockedResult(model_status=ModelStatus.DISABLED_BY_QUEUE), True),
+    (HTTPStatus.CREATED, RunPipelineBlockedResult(model_status=ModelStatus.DISABLED_MANUALLY), None),
+    (HTTPStatus.TOO_MANY_REQUESTS, None, True),
+    (HTTPStatus.BAD_GATEWAY, None, True),
+    (HTTPStatus.BAD_REQUEST, None, None),
+    (None, None, True),
+])
+def test_is_overload(status_code, result, expected):
+    assert is_overload(status_code, result) is expected
+
+
+@pytest.mark.parametrize('exc, status_code, expected', [
+    (requests.ConnectionError(), None, True),
+    (requests.ReadTimeout(), None, True),
+    (asyncio.TimeoutError(), None, True),
+    (HTTPError(), HTTPStatus.SERVICE_UNAVAILABLE, True),
+    (HTTPError(), HTTPStatus.BAD_REQUEST, None),
+    (ValueError('bad json'), HTTPStatus.CREATED, None),
+    (asyncio.CancelledError(), None, None),
+    (KeyboardInterrupt(), None, None),
+    (CircuitOpen('open'), None, None),
+])
+def test_is_overload_error(exc, status_code, expected):
+    assert is_overload_error(exc, status_code) is expected
+
+
+def test_additive_increase():
+    limiter = AIMDLimiter(initial_limit=2, max_limit=3)
+    for _ in range(3):
+        limiter.release(limiter.acquire(), latency=0.1)
+    assert limiter.limit == 3
+    for _ in range(10):
+        limiter.release(limiter.acquire(), latency=0.1)
+    assert limiter.limit == 3
+
+
+def test_multiplicative_decrease_once_per_window():
+    limiter = AIMDLimiter(initial_limit=8)
+    epochs = [limiter.acquire() for _ in range(4)]
+    for epoch in epochs:
+        limiter.release(epoch, latency=0.1, overloaded=True)
+    assert limiter.limit == 4
+    assert limiter.overloads == 4
+    limiter.release(limiter.acquire(), latency=0.1, overloaded=True)
+    assert limiter.limit == 2
+
+
+@pytest.mark.parametrize('latency, status_time', [(5.0, None), (0.1, 120)])
+def test_slow_calls_count_as_overload(latency, status_time):
+    limiter = AIMDLimiter(initial_limit=4, latency_threshold=1.0, status_time_threshold=60)
+    limiter.release(limiter.acquire(), latency=latency, status_time=status_time)
+    assert limiter.limit == 2
+
+
+def test_acquire_waits_for_free_slot():
+    limiter = AIMDLimiter(initial_limit=1, max_limit=1)
+    epoch = limiter.acquire()
+    threading.Timer(0.05, limiter.release, args=(epoch, 0.05)).start()
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.04
+    with pytest.raises(TimeoutError):
+        limiter.acquire(timeout=0.01)
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_waits_for_free_slot():
+    limiter = AsyncAIMDLimiter(initial_limit=1, max_limit=1)
+    epoch = await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    await limiter.release(epoch, latency=0.01)
+    await waiter
+    assert limiter.in_flight == 1
+
+
+def test_client_run_pipeline_adjusts_limit(monkeypatch):
+    monkeypatch.setenv('FB_API_KEY', 'FB_API_KEY')
+    monkeypatch.setenv('FB_API_SECRET', 'FB_API_SECRET')
+    client = FBClient(concurrency_limiter=AIMDLimiter(initial_limit=4))
+    with requests_mock.Mocker() as m:
+        m.post(RUN_URL, status_code=HTTPStatus.CREATED, json={'model_status': 'DISABLED_BY_QUEUE'})
+        client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море')
+        assert client.concurrency_limiter.limit == 2
+
+        m.post(RUN_URL, status_code=HTTPStatus.TOO_MANY_REQUESTS)
+        with pytest.raises(HTTPError):
+            client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море')
+        assert client.concurrency_limiter.limit == 1
+        assert client.concurrency_limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_async_client_run_pipeline_adjusts_limit(monkeypatch):
+    monkeypatch.setenv('FB_API_KEY', 'FB_API_KEY')
+    monkeypatch.setenv('FB_API_SECRET', 'FB_API_SECRET')
+    client = AsyncFBClient(concurrency_limiter=AsyncAIMDLimiter(initial_limit=1, max_limit=2))
+    with aioresponses() as m:
+        m.post(RUN_URL, status=HTTPStatus.CREATED, payload=CREATED)
+        await client.run_pipeline(pipeline_id=uuid.uuid4(), prompt='Море')
+    await client.close()
+    assert client.concurrency_limiter.limit == 2
+    assert client.concurrency_limiter.stats()['successes'] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_submits_keep_the_limit(async_client):
+    async_client.concurrency_limiter = AsyncAIMDLimiter(initial_limit=4)
+
+    async def hang(request, before_read=None):
+        await asyncio.Event().wait()
+
+    async_client._transmit = hang
+    tasks = [asyncio.create_task(async_client.run_pipeline(uuid.uuid4(), 'Море')) for _ in range(3)]
+    while async_client.concurrency_limiter.in_flight < 3:
+        await asyncio.sleep(0)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert async_client.concurrency_limiter.stats() == {'limit': 4, 'in_flight': 0, 'successes': 0, 'overloads': 0}
@@ -0,0 +1,103 @@
+import asyncio
+import uuid
+
+import pytest
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.fairness import AsyncFairScheduler
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import PipelineResultStatus, RunPipelineResult
+
+PIPELINE = uuid.UUID(PIPELINE_ID)
+
+
+class StubClient:
+    def __init__(self, delay=0.0):
+        self.prompts = []
+        self.delay = delay
+        self.running = {}
+
+    async def run_pipeline(self, **kwargs):
+        tenant = kwargs['prompt'].split()[0]
+        self.prompts.append(kwargs['prompt'])
+        self.running[tenant] = self.running.get(tenant, 0) + 1
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running[tenant] -= 1
+        return RunPipelineResult(uuid=uuid.uuid4(), status=PipelineResultStatus.INITIAL, status_time=0)
+
+
+async def flood(scheduler, tenant, count):
+    return [asyncio.create_task(scheduler.run_pipeline(tenant, PIPELINE, f'{tenant} {i}')) for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_noisy_tenant_does_not_starve_others():
+    client = StubClient(delay=0.001)
+    async with AsyncFairScheduler(client, max_concurrency=1) as scheduler:
+        noisy = await flood(scheduler, 'noisy', 200)
+        quiet = await flood(scheduler, 'quiet', 5)
+        await asyncio.gather(*quiet)
+        # The quiet tenant's jobs were interleaved with the noisy backlog instead of waiting behind it.
+        assert client.prompts.index('quiet 4') < 15
+        await asyncio.gather(*noisy)
+    stats = scheduler.stats()
+    assert stats['noisy']['submitted'] == 200
+    assert stats['quiet']['submitted'] == 5
+
+
+@pytest.mark.asyncio
+async def test_weights_set_the_share():
+    client = StubClient(delay=0.001)
+    async with AsyncFairScheduler(client, weights={'gold': 3}, max_concurrency=1) as scheduler:
+        tasks = await flood(scheduler, 'gold', 60) + await flood(scheduler, 'bronze', 60)
+        while len(client.prompts) < 40:
+            await asyncio.sleep(0.001)
+        head = client.prompts[:40]
+        await asyncio.gather(*tasks)
+    gold = sum(prompt.startswith('gold') for prompt in head)
+    assert 27 <= gold <= 33
+
+
+@pytest.mark.asyncio
+async def test_per_tenant_in_flight_cap():
+    client = StubClient(delay=0.005)
+    async with AsyncFairScheduler(client, max_concurrency=8, max_in_flight=2) as scheduler:
+        running = []
+
+        async def watch():
+            while True:
+                running.append(dict(client.running))
+                await asyncio.sleep(0.001)
+
+        watcher = asyncio.create_task(watch())
+        tasks = await flood(scheduler, 'a', 20) + await flood(scheduler, 'b', 20)
+        await asyncio.gather(*tasks)
+        watcher.cancel()
+    assert max(sample.get('a', 0) for sample in running) == 2
+    assert max(sample.get('b', 0) for sample in running) == 2
+
+
+@pytest.mark.asyncio
+async def test_polls_are_scheduled_and_latency_is_tracked():
+    with FakeServer(generation_time=0.02) as server:
+        async with AsyncFBClient(x_key='key', x_secret='secret', api_host=server.url) as client:
+            async with AsyncFairScheduler(client, max_concurrency=2) as scheduler:
+                run_result = await scheduler.run_pipeline('acme', PIPELINE, 'A red cat')
+                status_result = await scheduler.wait_for_completion(
+                    'acme', run_result.uuid, initial_delay=0, sleep_interval=0.01, max_retries=100,
+                )
+    assert status_result.status == PipelineResultStatus.DONE
+    stats = scheduler.stats()['acme']
+    assert stats['polls'] >= 1
+    assert stats['completed'] == 1
+    assert stats['mean_latency'] > 0
+    assert stats['in_flight'] == 0
+
+
+def test_invalid_weights():
+    with pytest.raises(ValueError):
+        AsyncFairScheduler(StubClient(), weights={'a': 0})
+    with pytest.raises(ValueError):
+        AsyncFairScheduler(StubClient(), max_in_flight=0)
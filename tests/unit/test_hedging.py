@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+import requests_mock
+from aioresponses import CallbackResult, aioresponses
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.fake_server import FakeServer
+from fusionbrain_sdk_python.hedging import HedgePolicy
+from fusionbrain_sdk_python.models import PipelineStatusResult
+from fusionbrain_sdk_python.previews import PreviewCache
+
+
+def warm_policy(endpoint='', **kwargs):
+    policy = HedgePolicy(min_samples=5, min_delay=0.01, **kwargs)
+    for _ in range(5):
+        policy.observe(0.01, endpoint)
+    return policy
+
+
+def test_delay_needs_samples():
+    policy = HedgePolicy(min_samples=3, min_delay=0)
+    assert policy.delay() is None
+    for latency in (0.1, 0.2, 0.3):
+        policy.observe(latency)
+    assert policy.delay() == 0.3
+
+
+def test_windows_are_per_endpoint():
+    policy = HedgePolicy(min_samples=2, min_delay=0)
+    for latency in (0.1, 0.2):
+        policy.observe(latency, 'get_status')
+    policy.observe(5.0, 'get_styles')
+    assert policy.delay('get_status') == 0.2
+    assert policy.delay('get_styles') is None
+
+
+def test_hedge_rate_is_capped():
+    policy = HedgePolicy(max_hedge_ratio=0.05, burst=1)
+    allowed = 0
+    for _ in range(200):
+        policy._start()
+        allowed += policy.try_hedge()
+    assert allowed == 10
+
+
+def test_call_hedges_slow_request():
+    policy = warm_policy(max_hedge_ratio=1)
+    calls = []
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            calls.append(len(calls))
+            attempt = calls[-1]
+        time.sleep(1 if attempt == 0 else 0)
+        return attempt
+
+    assert policy.call(request) == 1
+    assert policy.hedges == 1
+    assert policy.hedge_wins == 1
+    policy.close()
+
+
+def test_call_without_budget_waits_for_primary():
+    policy = warm_policy(max_hedge_ratio=0)
+
+    def request():
+        time.sleep(0.05)
+        return 'primary'
+
+    assert policy.call(request) == 'primary'
+    assert policy.hedges == 0
+    assert policy._executor is None
+    policy.close()
+
+
+def test_call_runs_on_the_calling_thread_unless_it_may_hedge():
+    policy = warm_policy(max_hedge_ratio=0.5, burst=1)
+    threads = []
+
+    def request():
+        threads.append(threading.get_ident())
+        return 'primary'
+
+    assert policy.call(request) == 'primary'
+    assert threads == [threading.get_ident()]
+    assert policy.call(request) == 'primary'
+    assert threads[1] != threading.get_ident()
+    # A primary that beat the delay gives its token back.
+    assert policy._tokens == 1
+    assert policy.hedges == 0
+    policy.close()
+
+
+@pytest.mark.asyncio
+async def test_acall_hedges_and_cancels_loser():
+    policy = warm_policy(max_hedge_ratio=1)
+    cancelled = []
+    attempts = []
+
+    async def request():
+        attempts.append(None)
+        if len(attempts) == 1:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return 'primary'
+        return 'hedge'
+
+    assert await policy.acall(request) == 'hedge'
+    await asyncio.sleep(0)
+    assert cancelled == [True]
+
+
+@pytest.mark.asyncio
+async def test_acall_raises_when_both_fail():
+    policy = warm_policy(max_hedge_ratio=1)
+
+    async def request():
+        await asyncio.sleep(0.05)
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError, match='boom'):
+        await policy.acall(request)
+
+
+def test_client_get_status_hedged(monkeypatch, pipeline_status_result):
+    monkeypatch.setenv('FB_API_KEY', 'FB_API_KEY')
+    monkeypatch.setenv('FB_API_SECRET', 'FB_API_SECRET')
+    client = FBClient(hedge_policy=warm_policy('get_status'))
+    status = pipeline_status_result.build().model_dump(mode='json')
+    with requests_mock.Mocker() as m:
+        m.get(f'https://api-key.fusionbrain.ai/key/api/v1/pipeline/status/{status["uuid"]}', json=status)
+        got = client.get_status(uuid.UUID(status['uuid']))
+    assert isinstance(got, PipelineStatusResult)
+    assert client.hedge_policy.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_async_client_get_status_hedged(monkeypatch, pipeline_status_result):
+    monkeypatch.setenv('FB_API_KEY', 'FB_API_KEY')
+    monkeypatch.setenv('FB_API_SECRET', 'FB_API_SECRET')
+    client = AsyncFBClient(hedge_policy=warm_policy('get_status', max_hedge_ratio=1))
+    status = pipeline_status_result.build().model_dump(mode='json')
+    calls = []
+
+    async def slow_first(url, **kwargs):
+        calls.append(url)
+        await asyncio.sleep(1 if len(calls) == 1 else 0)
+        return CallbackResult(payload=status)
+
+    with aioresponses() as m:
+        m.get(
+            f'https://api-key.fusionbrain.ai/key/api/v1/pipeline/status/{status["uuid"]}',
+            callback=slow_first,
+            repeat=True,
+        )
+        got = await client.get_status(uuid.UUID(status['uuid']))
+    await client.close()
+    assert isinstance(got, PipelineStatusResult)
+    assert len(calls) == 2
+    assert client.hedge_policy.hedge_wins == 1
+
+
+def test_hedged_get_styles_fetches_previews_once(tmp_path):
+    policy = HedgePolicy(min_samples=1, min_delay=1e-6, max_hedge_ratio=1)
+    policy.observe(1e-6, 'get_styles')
+    cache = PreviewCache(tmp_path)
+    with FakeServer() as server, FBClient(
+        x_key='key', x_secret='secret', api_host=server.url, styles_url=server.styles_url,
+        hedge_policy=policy, preview_cache=cache,
+    ) as client:
+        styles = client.get_styles()
+    assert policy._executor is None
+    assert policy.hedges == 1
+    assert all(style.preview_path is not None for style in styles)
+    assert cache.stats()['downloads'] == len(styles)
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.fake_server import FakeServer
+from fusionbrain_sdk_python.previews import PreviewCache
+from fusionbrain_sdk_python.transport import HTTPResponse, RequestsTransport
+
+
+def fb_client(server, cache, **kwargs):
+    return FBClient(
+        x_key='key', x_secret='secret', api_host=server.url, styles_url=server.styles_url, preview_cache=cache,
+        **kwargs,
+    )
+
+
+def test_get_styles_downloads_previews_once(tmp_path):
+    cache = PreviewCache(tmp_path, max_age=3600)
+    with FakeServer() as server, fb_client(server, cache) as client:
+        styles = client.get_styles()
+        assert all(style.preview_path is not None and style.preview_path.exists() for style in styles)
+        assert styles[1].preview_path.read_bytes().endswith(b'anime.png')
+        requests = server.request_count
+
+        again = client.get_styles()
+        # Only the styles listing itself goes to the network, previews come from disk.
+        assert server.request_count == requests + 1
+        assert [style.preview_path for style in again] == [style.preview_path for style in styles]
+    assert cache.stats()['downloads'] == 2
+    assert cache.stats()['hits'] == 2
+    assert 'preview_path' not in styles[0].model_dump()
+
+
+def test_stale_previews_are_revalidated_and_index_persists(tmp_path):
+    with FakeServer() as server:
+        with fb_client(server, PreviewCache(tmp_path, max_age=0)) as client:
+            client.get_styles()
+        cache = PreviewCache(tmp_path, max_age=0)
+        assert cache.stats()['entries'] == 2
+        with fb_client(server, cache) as client:
+            styles = client.get_styles()
+    assert cache.stats()['revalidated'] == 2
+    assert cache.stats()['downloads'] == 0
+    assert all(style.preview_path.exists() for style in styles)
+
+
+def test_lru_eviction_and_content_addressing(tmp_path):
+    cache = PreviewCache(tmp_path, max_bytes=10)
+    first = cache.update('https://cdn/a.png', HTTPResponse(200, {'ETag': '"a"'}, b'aaaa'))
+    same = cache.update('https://cdn/a-copy.png', HTTPResponse(200, {}, b'aaaa'))
+    assert first == same
+    assert cache.size == 4
+
+    cache.update('https://cdn/b.png', HTTPResponse(200, {}, b'bbbb'))
+    time.sleep(0.01)
+    cache.path('https://cdn/a.png')
+    cache.update('https://cdn/c.png', HTTPResponse(200, {}, b'cccc'))
+    # b.png was used least recently, so it goes first; a.png is kept even though a-copy.png was evicted.
+    assert cache.path('https://cdn/b.png') is None
+    assert cache.read('https://cdn/a.png') == b'aaaa'
+    assert cache.size <= 10
+    assert len(list((tmp_path / 'objects').iterdir())) == 2
+
+    assert cache.update('https://cdn/huge.png', HTTPResponse(200, {}, b'x' * 11)) is None
+    # A new version too large to cache keeps serving the older copy.
+    assert cache.update('https://cdn/a.png', HTTPResponse(200, {}, b'x' * 11)) == first
+    assert cache.stats()['errors'] == 2
+    # A failed revalidation keeps serving the copy on disk.
+    assert cache.update('https://cdn/a.png', HTTPResponse(500)) == first
+    assert cache.update('https://cdn/a.png', None) == first
+    request = cache.request('https://cdn/a.png')
+    assert request is None
+    cache.max_age = 0
+    assert cache.request('https://cdn/a.png').headers == {'If-None-Match': '"a"'}
+
+
+class FlakyCDN(RequestsTransport):
+    def __init__(self):
+        super().__init__()
+        self.down = False
+
+    def send(self, request, before_read=None):
+        if self.down and request.endpoint == 'style_preview':
+            raise ConnectionError('CDN is down')
+        return super().send(request, before_read)
+
+
+def test_unreachable_preview_does_not_fail_get_styles(tmp_path):
+    transport = FlakyCDN()
+    with FakeServer() as server, FBClient(
+        x_key='key', x_secret='secret', api_host=server.url, styles_url=server.styles_url, transport=transport,
+        preview_cache=PreviewCache(tmp_path, max_age=0),
+    ) as client:
+        cached = [style.preview_path for style in client.get_styles()]
+        transport.down = True
+        styles = client.get_styles()
+    assert [style.preview_path for style in styles] == cached
+    assert client.preview_cache.stats()['errors'] == 2
+
+    with FakeServer() as server, FBClient(
+        x_key='key', x_secret='secret', api_host=server.url, styles_url=server.styles_url, transport=transport,
+        preview_cache=PreviewCache(tmp_path / 'empty'),
+    ) as client:
+        assert all(style.preview_path is None for style in client.get_styles())
+
+
+@pytest.mark.asyncio
+async def test_async_client_fetches_previews(tmp_path):
+    cache = PreviewCache(tmp_path, max_concurrency=1)
+    with FakeServer() as server:
+        async with AsyncFBClient(
+            x_key='key', x_secret='secret', api_host=server.url, styles_url=server.styles_url, preview_cache=cache,
+        ) as client:
+            styles = await client.get_styles()
+    assert styles[0].preview_path.read_bytes().endswith(b'default.png')
+    assert styles[1].preview_path.read_bytes().endswith(b'anime.png')
+    assert (tmp_path / 'index.json').exists()
@@ -0,0 +1,114 @@
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.models import DecodedPipelineResult, PipelineResult, PipelineResultStatus
+from fusionbrain_sdk_python.processing import ResultProcessor
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def done_result(pipeline_status_result):
+    def _build(*images):
+        files = [base64.b64encode(image).decode() for image in images]
+        return pipeline_status_result.build(
+            status=PipelineResultStatus.DONE,
+            result=PipelineResult(files=files, censored=False),
+        )
+    return _build
+
+
+def test_choose_executor_by_payload_size():
+    with ResultProcessor(thread_threshold=10, process_threshold=100) as processor:
+        assert processor.choose_executor(5) is None
+        assert isinstance(processor.choose_executor(50), ThreadPoolExecutor)
+        assert isinstance(processor.choose_executor(500), ProcessPoolExecutor)
+
+
+@pytest.mark.parametrize('thread_threshold, process_threshold', [
+    (1024, 2048),
+    (1, 2048),
+    (1, 2),
+])
+def test_process(done_result, thread_threshold, process_threshold):
+    status_result = done_result(b'first image', b'second image' * 100)
+    with ResultProcessor(thread_threshold=thread_threshold, process_threshold=process_threshold) as processor:
+        got = processor.process(status_result)
+    assert isinstance(got, DecodedPipelineResult)
+    assert got.uuid == status_result.uuid
+    assert got.files == [b'first image', b'second image' * 100]
+
+
+@pytest.mark.parametrize('process_threshold', [2048, 1])
+def test_process_with_transforms(done_result, process_threshold):
+    status_result = done_result(b'image')
+    with ResultProcessor(transforms=[sha256], thread_threshold=1, process_threshold=process_threshold) as processor:
+        got = processor.process(status_result)
+    assert got.files == [hashlib.sha256(b'image').hexdigest()]
+
+
+def test_process_without_result(pipeline_status_result):
+    status_result = pipeline_status_result.build(status=PipelineResultStatus.FAIL, result=None)
+    got = ResultProcessor().process(status_result)
+    assert got.files == []
+    assert got.status == PipelineResultStatus.FAIL
+
+
+@pytest.mark.parametrize('thread_threshold, process_threshold', [
+    (1024, 2048),
+    (1, 2048),
+    (1, 2),
+])
+@pytest.mark.asyncio
+async def test_aprocess(done_result, thread_threshold, process_threshold):
+    status_result = done_result(b'first image', b'second image')
+    with ResultProcessor(thread_threshold=thread_threshold, process_threshold=process_threshold) as processor:
+        got = await processor.aprocess(status_result)
+    assert got.files == [b'first image', b'second image']
+
+
+def test_client_decode_result(client, done_result):
+    got = client.decode_result(done_result(b'image'))
+    assert got.files == [b'image']
+
+
+@pytest.mark.asyncio
+async def test_async_client_decode_result(async_client, done_result):
+    got = await async_client.decode_result(done_result(b'image'))
+    assert got.files == [b'image']
+
+
+def test_client_closes_only_its_own_processor(done_result):
+    with FBClient(x_key='key', x_secret='secret') as client:
+        client.result_processor.thread_threshold = 1
+        client.decode_result(done_result(b'image'))
+        owned = client.result_processor
+        assert owned._thread_executor is not None
+    assert owned._thread_executor is None
+
+    with ResultProcessor(thread_threshold=1) as processor:
+        with FBClient(x_key='key', x_secret='secret', result_processor=processor, background_loop=True) as client:
+            client.decode_result(done_result(b'image'))
+        assert processor._thread_executor is not None
+
+
+@pytest.mark.asyncio
+async def test_async_client_closes_only_its_own_processor(done_result):
+    async with AsyncFBClient(x_key='key', x_secret='secret') as client:
+        client.result_processor.thread_threshold = 1
+        await client.decode_result(done_result(b'image'))
+        owned = client.result_processor
+        assert owned._thread_executor is not None
+    assert owned._thread_executor is None
+
+    with ResultProcessor(thread_threshold=1) as processor:
+        async with AsyncFBClient(x_key='key', x_secret='secret', result_processor=processor) as client:
+            await client.decode_result(done_result(b'image'))
+        assert processor._thread_executor is not None
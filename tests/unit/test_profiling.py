@@ -0,0 +1,84 @@
+import asyncio
+import gc
+import time
+import uuid
+
+import pytest
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.profiling import Profiler
+
+PIPELINE = uuid.UUID(PIPELINE_ID)
+
+
+def test_sync_client_attributes_time_per_phase(tmp_path):
+    profiler = Profiler()
+    with FakeServer(generation_time=0) as server, FBClient(
+        x_key='key', x_secret='secret', api_host=server.url, profiler=profiler,
+    ) as client:
+        run_result = client.run_pipeline(PIPELINE, 'A red cat')
+        status_result = client.wait_for_completion(run_result.uuid, 0, sleep_interval=0.01, max_retries=50)
+        client.decode_result(status_result)
+
+    stats = profiler.stats()
+    for name in (
+        'run_pipeline;encode_params', 'run_pipeline;encode_multipart', 'run_pipeline;network',
+        'run_pipeline;json_decode', 'run_pipeline;validate', 'run_pipeline;total',
+        'get_status;network', 'get_status;validate', 'decode_result;decode',
+    ):
+        assert stats[name]['count'] >= 1, name
+    total = stats['run_pipeline;total']
+    assert total['wall'] >= stats['run_pipeline;network']['wall']
+    assert total['cpu'] > 0
+
+    path = tmp_path / 'profile.folded'
+    profiler.write_folded(path)
+    lines = path.read_text().splitlines()
+    assert any(line.startswith('run_pipeline;network ') for line in lines)
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in lines)
+    assert 'run_pipeline;network' in profiler.report()
+
+
+@pytest.mark.asyncio
+async def test_async_client_samples_event_loop_lag():
+    profiler = Profiler(lag_interval=0.005)
+    with FakeServer() as server:
+        async with AsyncFBClient(x_key='key', x_secret='secret', api_host=server.url, profiler=profiler) as client:
+            await client.get_pipelines()
+            await asyncio.sleep(0.02)
+            # Blocks the loop, the next lag sample sees it.
+            time.sleep(0.05)
+            await asyncio.sleep(0.02)
+    lag = profiler.lag_stats()
+    assert lag['samples'] >= 2
+    assert lag['max'] >= 0.04
+    assert profiler.stats()['get_pipelines;network']['cpu'] == 0
+    assert 'event loop lag' in profiler.report()
+
+
+def test_lag_sampling_does_not_outlive_an_unclosed_client():
+    profiler = Profiler(lag_interval=0.005)
+
+    async def generate(server):
+        client = AsyncFBClient(x_key='key', x_secret='secret', api_host=server.url, profiler=profiler)
+        await client.get_pipelines()
+        await asyncio.sleep(0.02)
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        await client.transport.close()
+
+    with FakeServer() as server:
+        asyncio.run(generate(server))
+    gc.collect()
+
+    assert profiler.lag_stats()['samples'] >= 2
+    assert len(profiler._monitors) == 0
+
+
+def test_profiling_is_off_by_default():
+    client = FBClient(x_key='key', x_secret='secret')
+    assert client.profiler is None
+    assert client.protocol.profiler is None
+    with pytest.raises(ValueError):
+        Profiler(lag_interval=0)
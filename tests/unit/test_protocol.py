@@ -0,0 +1,97 @@
+import json
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+
+import pytest
+
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.models import (
+    Pipeline,
+    PipelineStatus,
+    PipelineType,
+    RunPipelineBlockedResult,
+    RunPipelineResult,
+    Style,
+)
+from fusionbrain_sdk_python.protocol import FBProtocol
+
+
+@pytest.fixture
+def protocol():
+    return FBProtocol(x_key='key', x_secret='secret', api_host='http://localhost:8080')
+
+
+def parse_multipart(request):
+    raw = f'Content-Type: {request.headers["Content-Type"]}\r\n\r\n'.encode() + request.body
+    message = BytesParser(policy=HTTP).parsebytes(raw)
+    return {part.get_param('name', header='content-disposition'): part for part in message.iter_parts()}
+
+
+def test_requires_credentials(monkeypatch):
+    monkeypatch.delenv('FB_API_KEY', raising=False)
+    monkeypatch.delenv('FB_API_SECRET', raising=False)
+    with pytest.raises(ConfigError):
+        FBProtocol()
+
+
+def test_precomputed_urls_and_headers(protocol):
+    assert protocol.api_host == 'http://localhost:8080/'
+    assert protocol.get_pipelines() is protocol.get_pipelines()
+    assert protocol.get_pipelines().headers == {'X-Key': 'Key key', 'X-Secret': 'Secret secret'}
+    assert protocol.get_pipelines_by_type(PipelineType.TEXT2IMAGE).url == (
+        'http://localhost:8080/key/api/v1/pipelines?type=TEXT2IMAGE'
+    )
+    request_id = uuid.uuid4()
+    assert protocol.get_status(request_id).url == f'http://localhost:8080/key/api/v1/pipeline/status/{request_id}'
+    assert protocol.get_styles().headers == {}
+
+
+def test_run_pipeline_request(protocol):
+    pipeline_id = uuid.uuid4()
+    request = protocol.run_pipeline(
+        pipeline_id=pipeline_id,
+        prompt='Море "в шторм"',
+        negative_prompt='люди',
+        style=Style(name='ANIME', title='Аниме', titleEn='Anime', image='https://example.invalid/a.png'),
+        width=512,
+        height=256,
+        num_images=2,
+    )
+    assert request.method == 'POST'
+    assert request.expected_status == HTTPStatus.CREATED
+    parts = parse_multipart(request)
+    assert parts['pipeline_id'].get_content() == str(pipeline_id)
+    assert parts['params'].get_content_type() == 'application/json'
+    assert json.loads(parts['params'].get_payload(decode=True)) == {
+        'type': 'GENERATE',
+        'numImages': 2,
+        'width': 512,
+        'height': 256,
+        'generateParams': {'query': 'Море "в шторм"'},
+        'negativePromptDecoder': 'люди',
+        'style': 'ANIME',
+    }
+
+
+def test_parse_responses(protocol, pipelines, styles):
+    assert protocol.parse_pipelines(json.dumps(pipelines).encode()) == [Pipeline(**pipe) for pipe in pipelines]
+    assert protocol.parse_styles(json.dumps(styles).encode()) == [Style(**style) for style in styles]
+    assert protocol.parse_pipeline_availability(b'{"status": "ACTIVE"}') == PipelineStatus.ACTIVE
+    assert isinstance(protocol.parse_run_pipeline(b'{"model_status": "DISABLED_BY_QUEUE"}'), RunPipelineBlockedResult)
+    assert isinstance(
+        protocol.parse_run_pipeline(b'{"status": "INITIAL", "uuid": "ffffffff-ffff-4e5e-ab06-ffffffffffff", '
+                                    b'"status_time": 1}'),
+        RunPipelineResult,
+    )
+
+
+def test_error_message(protocol):
+    status_request = protocol.get_status(uuid.uuid4())
+    assert protocol.error_message(status_request, HTTPStatus.UNAUTHORIZED, b'').endswith(
+        'code 401, reason: Ошибка авторизации.',
+    )
+    assert protocol.error_message(protocol.get_pipelines(), HTTPStatus.NOT_FOUND, b'missing').endswith(
+        'code 404. Reason: missing',
+    )
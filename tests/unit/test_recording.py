@@ -0,0 +1,120 @@
+import time
+import uuid
+
+import pytest
+from aiohttp import ClientResponseError
+from requests import HTTPError
+from requests.structures import CaseInsensitiveDict
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.exceptions import CassetteMiss
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import PipelineResultStatus
+from fusionbrain_sdk_python.recording import (
+    AsyncRecordingTransport,
+    AsyncReplayTransport,
+    Cassette,
+    Exchange,
+    RecordingTransport,
+    ReplayTiming,
+    ReplayTransport,
+    summarize,
+)
+from fusionbrain_sdk_python.protocol import HTTPRequest
+from fusionbrain_sdk_python.transport import AiohttpTransport, HTTPResponse, RequestsTransport
+
+MISSING_ID = uuid.UUID('ffffffff-ffff-4e5e-ab06-ffffffffffff')
+
+
+def generate(client):
+    run_result = client.run_pipeline(uuid.UUID(PIPELINE_ID), 'A red cat', num_images=2)
+    return client.wait_for_completion(run_result.uuid, initial_delay=0, sleep_interval=0.02, max_retries=50)
+
+
+@pytest.fixture(scope='module', params=['cassette.jsonl', 'cassette.jsonl.gz'])
+def cassette_path(request, tmp_path_factory):
+    path = tmp_path_factory.mktemp('cassettes') / request.param
+    with FakeServer(generation_time=0.05) as server:
+        cassette = Cassette(path)
+        with FBClient(x_key='key', x_secret='secret', api_host=server.url,
+                      transport=RecordingTransport(RequestsTransport(), cassette)) as client:
+            generate(client)
+            client.get_pipelines()
+            with pytest.raises(HTTPError):
+                client.get_status(MISSING_ID)
+    return path
+
+
+def test_exchange_roundtrip():
+    exchange = Exchange('get_status', 'GET', 'http://localhost/a?b=1', 200, body=b'\xff\x00', elapsed=0.5)
+    assert Exchange.from_json(exchange.to_json()) == exchange
+    assert exchange.response().headers == {}
+
+
+def test_cassette_contents(cassette_path):
+    exchanges = Cassette.load(cassette_path).exchanges
+    endpoints = [exchange.endpoint for exchange in exchanges]
+    assert endpoints[0] == 'run_pipeline'
+    assert endpoints.count('get_status') >= 3
+    assert all(exchange.elapsed > 0 for exchange in exchanges)
+    started = [exchange.started for exchange in exchanges]
+    assert started[0] == 0
+    assert started == sorted(started)
+    assert 0 < started[-1] < 60
+    assert summarize(exchanges)['run_pipeline']['count'] == 1
+
+
+def test_sync_replay(cassette_path):
+    replay = ReplayTransport(cassette_path)
+    with FBClient(x_key='key', x_secret='secret', transport=replay) as client:
+        status_result = generate(client)
+        assert status_result.status == PipelineResultStatus.DONE
+        assert len(status_result.result.files) == 2
+        assert client.get_pipelines()[0].id == uuid.UUID(PIPELINE_ID)
+        with pytest.raises(HTTPError, match='In response to'):
+            client.get_status(MISSING_ID)
+        with pytest.raises(CassetteMiss):
+            client.get_pipelines()
+    assert replay.served == len(replay.cassette.exchanges)
+
+
+@pytest.mark.asyncio
+async def test_async_replay_with_original_timing(cassette_path):
+    cassette = Cassette.load(cassette_path)
+    replay = AsyncReplayTransport(cassette, timing=ReplayTiming.ORIGINAL, loop=True)
+    async with AsyncFBClient(x_key='key', x_secret='secret', transport=replay) as client:
+        started = time.monotonic()
+        pipelines = await client.get_pipelines()
+        assert time.monotonic() - started >= cassette.exchanges[-2].elapsed
+        assert pipelines == await client.get_pipelines()
+        with pytest.raises(ClientResponseError, match='In response to'):
+            await client.get_status(MISSING_ID)
+
+
+@pytest.mark.asyncio
+async def test_async_recording(tmp_path):
+    path = tmp_path / 'async.jsonl'
+    with FakeServer() as server:
+        async with AsyncFBClient(x_key='key', x_secret='secret', api_host=server.url,
+                                 transport=AsyncRecordingTransport(AiohttpTransport(), Cassette(path))) as client:
+            await client.get_pipeline_availability(uuid.UUID(PIPELINE_ID))
+    exchange, = Cassette.load(path).exchanges
+    assert exchange.endpoint == 'get_pipeline_availability'
+    assert exchange.headers['Content-Type'].startswith('application/json')
+
+
+class DecodedTransport:
+    def send(self, request, before_read=None):
+        headers = CaseInsensitiveDict({'Content-Type': 'image/png', 'Content-Encoding': 'gzip', 'Content-Length': '3'})
+        return HTTPResponse(200, headers, b'decoded body', 'OK')
+
+
+def test_recording_drops_encoding_of_decoded_bodies(tmp_path):
+    path = tmp_path / 'cassette.jsonl'
+    transport = RecordingTransport(DecodedTransport(), Cassette(path))
+    transport.send(HTTPRequest('image', 'GET', 'https://example.invalid/image.png'))
+    transport.cassette.close()
+
+    exchange, = Cassette.load(path).exchanges
+    assert exchange.headers == {'Content-Type': 'image/png', 'Content-Length': str(len(b'decoded body'))}
@@ -0,0 +1,175 @@
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.models import (
+    ModelStatus,
+    Pipeline,
+    PipelineResultStatus,
+    PipelineStatus,
+    PipelineStatusResult,
+    PipelineType,
+    RunPipelineBlockedResult,
+    RunPipelineResult,
+    Tag,
+)
+from fusionbrain_sdk_python.routing import AsyncPipelineRouter, PipelineRouter, RoutingStrategy
+
+
+def make_pipeline(name, version=3.1, status=PipelineStatus.ACTIVE, tags=('Kandinsky',)):
+    now = datetime.now(timezone.utc)
+    return Pipeline(
+        id=uuid.uuid4(),
+        name=name,
+        description=None,
+        tags=[Tag(name=tag, name_en=tag) for tag in tags],
+        version=version,
+        status=status,
+        type=PipelineType.TEXT2IMAGE,
+        createdDate=now,
+        lastModified=now,
+    )
+
+
+class StubClient:
+    def __init__(self, pipelines, generation_time=None, blocked=()):
+        self.pipelines = pipelines
+        self.generation_time = generation_time or {}
+        self.blocked = set(blocked)
+        self.submitted = Counter()
+        self.jobs = {}
+
+    def get_pipelines_by_type(self, pipe_type):  # noqa: ARG002
+        return self.pipelines
+
+    def run_pipeline(self, pipeline_id, **kwargs):  # noqa: ARG002
+        self.submitted[pipeline_id] += 1
+        if pipeline_id in self.blocked:
+            return RunPipelineBlockedResult(model_status=ModelStatus.DISABLED_BY_QUEUE)
+        request_id = uuid.uuid4()
+        self.jobs[request_id] = pipeline_id
+        return RunPipelineResult(uuid=request_id, status=PipelineResultStatus.INITIAL, status_time=0)
+
+    def wait_for_completion(self, request_id, initial_delay, sleep_interval=1, max_retries=5):  # noqa: ARG002
+        generation_time = self.generation_time.get(self.jobs[request_id], 1)
+        return PipelineStatusResult(uuid=request_id, status=PipelineResultStatus.DONE, generationTime=generation_time)
+
+
+    def get_status(self, request_id):
+        return StubClient.wait_for_completion(self, request_id, initial_delay=0)
+
+
+class AsyncStubClient(StubClient):
+    async def get_pipelines_by_type(self, pipe_type):
+        return super().get_pipelines_by_type(pipe_type)
+
+    async def run_pipeline(self, pipeline_id, **kwargs):
+        return super().run_pipeline(pipeline_id, **kwargs)
+
+    async def wait_for_completion(self, request_id, initial_delay, sleep_interval=1, max_retries=5):
+        return super().wait_for_completion(request_id, initial_delay, sleep_interval, max_retries)
+
+    async def get_status(self, request_id):
+        return super().get_status(request_id)
+
+
+def test_filters_by_status_tags_and_version():
+    pipelines = [
+        make_pipeline('a'),
+        make_pipeline('b', version=3.0),
+        make_pipeline('c', status=PipelineStatus.DISABLED_BY_QUEUE),
+        make_pipeline('d', tags=('Other',)),
+    ]
+    router = PipelineRouter(StubClient(pipelines), tags=['Kandinsky'], version=3.1)
+    assert [pipeline.name for pipeline in router.refresh()] == ['a']
+
+    with pytest.raises(ConfigError, match='No ACTIVE TEXT2IMAGE pipeline'):
+        PipelineRouter(StubClient(pipelines), version=2.0).refresh()
+
+
+def test_no_matching_pipeline_keeps_refreshing():
+    client = StubClient([])
+    router = PipelineRouter(client)
+    for _ in range(2):
+        with pytest.raises(ConfigError, match='No ACTIVE TEXT2IMAGE pipeline'):
+            router.run_pipeline('A red cat')
+
+    client.pipelines = [make_pipeline('a')]
+    assert isinstance(router.run_pipeline('A red cat'), RunPipelineResult)
+
+
+@pytest.mark.parametrize('strategy', list(RoutingStrategy))
+def test_load_moves_away_from_slow_pipeline(strategy):
+    fast, slow = make_pipeline('fast'), make_pipeline('slow')
+    client = StubClient([fast, slow], generation_time={fast.id: 1, slow.id: 60})
+    router = PipelineRouter(client, strategy=strategy, rng=random.Random(1))
+    for _ in range(200):
+        result = router.run_pipeline('A red cat')
+        router.wait_for_completion(result.uuid, initial_delay=0)
+
+    assert client.submitted[fast.id] > 0.8 * 200
+    stats = router.stats()
+    assert stats[str(slow.id)]['generation_time'] == 60
+    assert stats[str(fast.id)]['in_flight'] == 0
+
+
+def test_in_flight_jobs_spread_load():
+    pipelines = [make_pipeline('a'), make_pipeline('b')]
+    client = StubClient(pipelines)
+    router = PipelineRouter(client, rng=random.Random(1))
+    for _ in range(10):
+        router.run_pipeline('A red cat')
+    assert sorted(client.submitted.values()) == [5, 5]
+
+
+def test_jobs_not_waited_through_the_router_are_released():
+    pipeline = make_pipeline('a')
+    client = StubClient([pipeline])
+    router = PipelineRouter(client, job_ttl=60)
+    polled = router.run_pipeline('A red cat')
+    dropped = router.run_pipeline('A red cat')
+    assert router.stats()[str(pipeline.id)]['in_flight'] == 2
+
+    assert router.get_status(polled.uuid).status == PipelineResultStatus.DONE
+    assert router.stats()[str(pipeline.id)]['in_flight'] == 1
+    assert router.stats()[str(pipeline.id)]['generation_time'] == 1
+
+    router._jobs[dropped.uuid] = (router.routes[pipeline.id], time.monotonic() - 61)
+    router.run_pipeline('A red cat')
+    assert router.stats()[str(pipeline.id)]['in_flight'] == 1
+    assert dropped.uuid not in router._jobs
+
+
+def test_blocked_pipeline_falls_back_and_cools_down():
+    busy, free = make_pipeline('busy'), make_pipeline('free')
+    client = StubClient([busy, free], blocked={busy.id})
+    router = PipelineRouter(client, cooldown=60, rng=random.Random(1))
+    for _ in range(20):
+        assert isinstance(router.run_pipeline('A red cat'), RunPipelineResult)
+
+    assert client.submitted[busy.id] == 1
+    assert router.routes[busy.id].blocked_until > time.monotonic()
+
+    client.blocked.add(free.id)
+    router.routes[busy.id].blocked_until = 0
+    assert isinstance(router.run_pipeline('A red cat'), RunPipelineBlockedResult)
+
+
+@pytest.mark.asyncio
+async def test_async_router():
+    fast, slow = make_pipeline('fast'), make_pipeline('slow')
+    client = AsyncStubClient([fast, slow], generation_time={fast.id: 1, slow.id: 60})
+    router = AsyncPipelineRouter(client, strategy=RoutingStrategy.WEIGHTED, rng=random.Random(2))
+    for _ in range(100):
+        result = await router.run_pipeline('A red cat')
+        await router.wait_for_completion(result.uuid, initial_delay=0)
+    assert client.submitted[fast.id] > client.submitted[slow.id]
+
+    result = await router.run_pipeline('A red cat')
+    await router.get_status(result.uuid)
+    assert all(stats['in_flight'] == 0 for stats in router.stats().values())
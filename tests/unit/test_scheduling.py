@@ -0,0 +1,204 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from fusionbrain_sdk_python.exceptions import DeadlineExceeded, JobShed, QueueFull
+from fusionbrain_sdk_python.limits import TokenBucket
+from fusionbrain_sdk_python.models import PipelineResultStatus, RunPipelineResult
+from fusionbrain_sdk_python.scheduling import AsyncJobScheduler, OverflowPolicy, Priority
+
+PIPELINE_ID = uuid.uuid4()
+
+
+class StubClient:
+    def __init__(self, status_time=0, delay=0.0):
+        self.prompts = []
+        self.status_time = status_time
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    async def run_pipeline(self, **kwargs):
+        self.prompts.append(kwargs['prompt'])
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        return RunPipelineResult(uuid=uuid.uuid4(), status=PipelineResultStatus.INITIAL, status_time=self.status_time)
+
+
+async def submit_all(scheduler, jobs):
+    tasks = []
+    for prompt, kwargs in jobs:
+        tasks.append(asyncio.create_task(scheduler.submit(PIPELINE_ID, prompt, **kwargs)))
+        # Lets the first job start so that the rest are ordered while it runs.
+        await asyncio.sleep(0)
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert 0 < bucket.reserve() <= 0.1
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+@pytest.mark.asyncio
+async def test_priority_order():
+    client = StubClient(delay=0.01)
+    async with AsyncJobScheduler(client, max_concurrency=1) as scheduler:
+        await submit_all(scheduler, [
+            ('first', {}),
+            ('batch', {'priority': Priority.BATCH}),
+            ('normal', {'priority': Priority.NORMAL}),
+            ('interactive', {'priority': Priority.INTERACTIVE}),
+        ])
+    assert client.prompts == ['first', 'interactive', 'normal', 'batch']
+
+
+@pytest.mark.asyncio
+async def test_earliest_deadline_first_within_class():
+    client = StubClient(delay=0.01)
+    async with AsyncJobScheduler(client, max_concurrency=1) as scheduler:
+        await submit_all(scheduler, [
+            ('first', {}),
+            ('late', {'deadline': 60}),
+            ('no deadline', {}),
+            ('soon', {'deadline': 10}),
+        ])
+    assert client.prompts == ['first', 'soon', 'late', 'no deadline']
+
+
+@pytest.mark.asyncio
+async def test_aging_prevents_starvation():
+    client = StubClient(delay=0.01)
+    async with AsyncJobScheduler(client, max_concurrency=1, aging=0.001) as scheduler:
+        first = asyncio.create_task(scheduler.submit(PIPELINE_ID, 'first'))
+        batch = asyncio.create_task(scheduler.submit(PIPELINE_ID, 'batch', priority=Priority.BATCH))
+        await asyncio.sleep(0.005)
+        interactive = asyncio.create_task(scheduler.submit(PIPELINE_ID, 'interactive', priority=Priority.INTERACTIVE))
+        await asyncio.gather(first, batch, interactive)
+    assert client.prompts == ['first', 'batch', 'interactive']
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    client = StubClient(delay=0.01)
+    async with AsyncJobScheduler(client, max_concurrency=2) as scheduler:
+        results = await submit_all(scheduler, [(str(i), {}) for i in range(6)])
+    assert all(isinstance(result, RunPipelineResult) for result in results)
+    assert client.max_running == 2
+    assert scheduler.stats()['dispatched'] == 6
+
+
+@pytest.mark.asyncio
+async def test_rate_limit():
+    client = StubClient()
+    started = time.monotonic()
+    async with AsyncJobScheduler(client, max_concurrency=8, rate_limiter=TokenBucket(rate=100, burst=1)) as scheduler:
+        await submit_all(scheduler, [(str(i), {}) for i in range(6)])
+    assert time.monotonic() - started >= 0.045
+
+
+@pytest.mark.asyncio
+async def test_deadlines_use_observed_status_time():
+    client = StubClient(status_time=30, delay=0.02)
+    async with AsyncJobScheduler(client, max_concurrency=1) as scheduler:
+        await scheduler.submit(PIPELINE_ID, 'warm-up')
+        assert scheduler.expected_status_time == 30
+        with pytest.raises(DeadlineExceeded):
+            await scheduler.submit(PIPELINE_ID, 'impossible', deadline=10)
+
+        results = await submit_all(scheduler, [
+            ('blocker', {'priority': Priority.INTERACTIVE}),
+            ('tight', {'deadline': 30.01}),
+        ])
+    assert isinstance(results[0], RunPipelineResult)
+    assert isinstance(results[1], DeadlineExceeded)
+    assert scheduler.stats()['rejected'] == 1
+    assert scheduler.stats()['expired'] == 1
+    assert 'tight' not in client.prompts
+
+
+@pytest.mark.asyncio
+async def test_respects_client_concurrency_limiter():
+    class Limiter:
+        limit = 1
+
+    client = StubClient(delay=0.01)
+    client.concurrency_limiter = Limiter()
+    async with AsyncJobScheduler(client, max_concurrency=8) as scheduler:
+        await submit_all(scheduler, [(str(i), {}) for i in range(4)])
+    assert client.max_running == 1
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_queued_jobs():
+    client = StubClient(delay=0.05)
+    scheduler = AsyncJobScheduler(client, max_concurrency=1)
+    tasks = [asyncio.create_task(scheduler.submit(PIPELINE_ID, str(i))) for i in range(3)]
+    await asyncio.sleep(0.01)
+    await scheduler.close()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert any(isinstance(result, asyncio.CancelledError) for result in results)
+    assert len(client.prompts) == 1
+
+
+@pytest.mark.asyncio
+async def test_overflow_block_waits_for_room():
+    client = StubClient(delay=0.01)
+    async with AsyncJobScheduler(client, max_concurrency=1, max_queue_size=2) as scheduler:
+        results = await submit_all(scheduler, [(str(i), {}) for i in range(6)])
+    assert all(isinstance(result, RunPipelineResult) for result in results)
+    assert scheduler.stats()['peak_queue_depth'] == 2
+    assert scheduler.stats()['shed'] == 0
+
+
+@pytest.mark.asyncio
+async def test_overflow_reject_new():
+    client = StubClient(delay=0.01)
+    async with AsyncJobScheduler(
+        client, max_concurrency=1, max_queue_size=1, overflow=OverflowPolicy.REJECT_NEW,
+    ) as scheduler:
+        results = await submit_all(scheduler, [('running', {}), ('queued', {}), ('rejected', {})])
+    assert isinstance(results[2], QueueFull)
+    assert client.prompts == ['running', 'queued']
+    assert scheduler.stats()['shed'] == 1
+    assert scheduler.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_overflow_drop_oldest():
+    client = StubClient(delay=0.01)
+    async with AsyncJobScheduler(
+        client, max_concurrency=1, max_queue_size=2, overflow=OverflowPolicy.DROP_OLDEST,
+    ) as scheduler:
+        results = await submit_all(scheduler, [('running', {}), ('old', {}), ('middle', {}), ('new', {})])
+    assert isinstance(results[1], JobShed)
+    assert client.prompts == ['running', 'middle', 'new']
+
+
+@pytest.mark.asyncio
+async def test_overflow_drop_lowest_priority():
+    client = StubClient(delay=0.01)
+    async with AsyncJobScheduler(
+        client, max_concurrency=1, max_queue_size=2, overflow=OverflowPolicy.DROP_LOWEST_PRIORITY,
+    ) as scheduler:
+        results = await submit_all(scheduler, [
+            ('running', {}),
+            ('batch', {'priority': Priority.BATCH}),
+            ('normal', {}),
+            ('interactive', {'priority': Priority.INTERACTIVE}),
+            ('another batch', {'priority': Priority.BATCH}),
+        ])
+    assert isinstance(results[1], JobShed)
+    assert isinstance(results[4], QueueFull)
+    assert client.prompts == ['running', 'interactive', 'normal']
+    assert scheduler.stats()['shed'] == 2
@@ -0,0 +1,105 @@
+import asyncio
+import time
+import uuid
+from concurrent.futures import CancelledError
+
+import pytest
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.budget import AsyncByteBudget
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import DecodedPipelineResult, PipelineResultStatus
+from fusionbrain_sdk_python.scope import AsyncJobScope, JobScope
+
+PIPELINE = uuid.UUID(PIPELINE_ID)
+
+
+@pytest.fixture
+def slow_server():
+    with FakeServer(generation_time=3600) as server:
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_scope_collects_results():
+    with FakeServer(generation_time=0.02) as server:
+        async with AsyncFBClient(x_key='key', x_secret='secret', api_host=server.url) as client:
+            async with AsyncJobScope(client, sleep_interval=0.01, max_retries=50) as scope:
+                plain = scope.submit(PIPELINE, 'A red cat')
+                decoded = scope.submit(PIPELINE, 'A blue bird', num_images=2, decode=True)
+    assert plain.result().status == PipelineResultStatus.DONE
+    assert isinstance(decoded.result(), DecodedPipelineResult)
+    assert len(decoded.result().files) == 2
+    assert not scope.pending
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_polling_and_frees_budget(slow_server):
+    budget = AsyncByteBudget(max_bytes=10 * 1024 * 1024)
+    async with AsyncFBClient(x_key='key', x_secret='secret', api_host=slow_server.url, byte_budget=budget) as client:
+        sent = []
+        send = client.transport.send
+
+        async def counting_send(request, before_read=None):
+            sent.append(request.endpoint)
+            return await send(request, before_read)
+
+        client.transport.send = counting_send
+        async with AsyncJobScope(client, sleep_interval=0.01, max_retries=10_000) as scope:
+            jobs = [scope.submit(PIPELINE, f'prompt {i}') for i in range(3)]
+            while len(scope.pending) < 3:
+                await asyncio.sleep(0.01)
+            assert budget.in_flight > 0
+            scope.cancel()
+        assert all(job.cancelled() for job in jobs)
+        assert not scope.pending
+        assert budget.in_flight == 0
+
+        # Every job task has finished, so nothing is left on the loop that could poll again.
+        assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
+        polls = len(sent)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert len(sent) == polls
+        with pytest.raises(RuntimeError):
+            scope.submit(PIPELINE, 'too late')
+
+
+@pytest.mark.asyncio
+async def test_timeout_cancels_jobs(slow_server):
+    async with AsyncFBClient(x_key='key', x_secret='secret', api_host=slow_server.url) as client:
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            async with AsyncJobScope(client, timeout=0.1, sleep_interval=0.01, max_retries=10_000) as scope:
+                job = scope.submit(PIPELINE, 'A red cat')
+                await job
+        assert time.monotonic() - started < 1
+        assert job.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_first_failure_cancels_siblings(slow_server):
+    async with AsyncFBClient(x_key='key', x_secret='secret', api_host=slow_server.url) as client:
+        with pytest.raises(TimeoutError, match='retries'):
+            async with AsyncJobScope(client, sleep_interval=0.01, max_retries=10_000) as scope:
+                sibling = scope.submit(PIPELINE, 'A red cat')
+                scope.spawn(client.wait_for_completion(uuid.uuid4(), initial_delay=0, max_retries=0))
+        assert sibling.cancelled()
+
+
+def test_sync_scope(slow_server):
+    with FBClient(x_key='key', x_secret='secret', api_host=slow_server.url, background_loop=True) as client:
+        with JobScope(client, timeout=5, sleep_interval=0.01, max_retries=10_000) as scope:
+            future = scope.submit(PIPELINE, 'A red cat')
+            while not scope.pending:
+                time.sleep(0.01)
+            scope.cancel()
+        with pytest.raises(CancelledError):
+            future.result()
+        assert scope.stats() == {'running': 0, 'pending': 0}
+
+    with FBClient(x_key='key', x_secret='secret', api_host=slow_server.url) as client:
+        with pytest.raises(ConfigError):
+            JobScope(client)
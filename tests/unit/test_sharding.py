@@ -0,0 +1,86 @@
+import pytest
+
+from fusionbrain_sdk_python.exceptions import WorkerError
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import DecodedPipelineResult, PipelineResultStatus, PipelineStatusResult
+from fusionbrain_sdk_python.sharding import ShardedExecutor, _picklable
+
+
+@pytest.fixture(scope='module')
+def fake_server():
+    with FakeServer(generation_time=0.05) as server:
+        yield server
+
+
+@pytest.fixture(scope='module')
+def executor(fake_server):
+    with ShardedExecutor(
+        workers=2,
+        pipeline_id=PIPELINE_ID,
+        concurrency=4,
+        sleep_interval=0.02,
+        max_retries=50,
+        api_host=fake_server.url,
+        x_key='key',
+        x_secret='secret',
+    ) as executor:
+        yield executor
+
+
+def test_ordered_results(executor):
+    results = list(executor.map({'prompt': f'prompt {i}'} for i in range(12)))
+    assert [result.index for result in results] == list(range(12))
+    assert all(isinstance(result.result, PipelineStatusResult) for result in results)
+    assert all(result.result.status == PipelineResultStatus.DONE for result in results)
+
+
+def test_unordered_results_and_reuse(executor):
+    first = list(executor.map([{'prompt': 'a', 'num_images': 2}], ordered=False))
+    results = list(executor.map(({'prompt': str(i)} for i in range(8)), ordered=False))
+    assert len(first[0].result.result.files) == 2
+    assert sorted(result.index for result in results) == list(range(8))
+
+
+def test_errors(executor):
+    requests = [{'prompt': 'ok'}, {'prompt': 'bad', 'pipeline_id': 'not-a-uuid'}]
+    results = list(executor.map(requests, return_exceptions=True))
+    assert results[0].error is None
+    assert isinstance(results[1].error, ValueError)
+
+    with pytest.raises(ValueError):
+        list(executor.map(requests))
+    assert list(executor.map([{'prompt': 'after error'}]))[0].error is None
+
+
+def test_decode_and_per_request_pipeline(fake_server):
+    with ShardedExecutor(
+        workers=1,
+        sleep_interval=0.02,
+        max_retries=50,
+        decode=True,
+        api_host=fake_server.url,
+        x_key='key',
+        x_secret='secret',
+    ) as executor:
+        results = list(executor.map([{'prompt': 'decoded', 'pipeline_id': PIPELINE_ID}, {'prompt': 'no pipeline'}],
+                                    return_exceptions=True))
+    assert isinstance(results[0].result, DecodedPipelineResult)
+    assert results[0].result.files[0].startswith(b'\x89PNG')
+    assert isinstance(results[1].error, ValueError)
+
+
+def test_unpicklable_error_is_wrapped():
+    class Unpicklable(Exception):
+        def __reduce__(self):
+            raise TypeError('cannot pickle')
+
+    error = _picklable(Unpicklable('boom'))
+    assert isinstance(error, WorkerError)
+    assert str(error) == 'Unpicklable: boom'
+
+
+def test_early_exit_cancels_workers(executor):
+    iterator = executor.map({'prompt': str(i)} for i in range(100))
+    next(iterator)
+    iterator.close()
+    assert executor._processes == []
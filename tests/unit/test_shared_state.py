@@ -0,0 +1,226 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from http import HTTPStatus
+
+import pytest
+from aioresponses import aioresponses
+from requests import HTTPError
+
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.exceptions import CircuitOpen
+from fusionbrain_sdk_python.fairness import AsyncFairScheduler
+from fusionbrain_sdk_python.models import PipelineResultStatus, RunPipelineResult
+from fusionbrain_sdk_python.scheduling import AsyncJobScheduler
+from fusionbrain_sdk_python.shared_state import (
+    MemoryStateStore,
+    RedisStateStore,
+    SharedCircuitBreaker,
+    SharedInFlightCounter,
+    SharedRateLimiter,
+    SQLiteStateStore,
+)
+
+AVAILABILITY_URL = 'https://api-key.fusionbrain.ai/key/api/v1/pipeline/{}/availability'
+
+
+class FakeRedis:
+    """Implements the handful of Redis commands the store uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def _live(self, key):
+        value = self.data.get(key)
+        if value is not None and value[1] is not None and value[1] <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and self._live(key) is not None:
+            return None
+        self.data[key] = (str(value).encode(), time.time() + px / 1000 if px else None)
+        return True
+
+    def incrby(self, key, amount):
+        current = self._live(key)
+        value = int(current[0]) + amount if current else amount
+        self.data[key] = (str(value).encode(), current[1] if current else None)
+        return value
+
+    def get(self, key):
+        current = self._live(key)
+        return current[0] if current else None
+
+    def eval(self, script, numkeys, key, amount, ttl_ms):
+        # Mirrors the store's INCRBY + PEXPIRE script.
+        assert numkeys == 1 and 'PEXPIRE' in script
+        value = self.incrby(key, amount)
+        if self.data[key][1] is None:
+            self.data[key] = (self.data[key][0], time.time() + ttl_ms / 1000)
+        return value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryStateStore()
+    if request.param == 'sqlite':
+        return SQLiteStateStore(str(tmp_path / 'state.db'))
+    return RedisStateStore(FakeRedis())
+
+
+def test_store_operations(store):
+    assert store.get('missing') is None
+    assert store.incr('counter') == 1
+    assert store.incr('counter', 4) == 5
+    assert store.incr('counter', -2) == 3
+    store.set('key', 'value')
+    assert store.get('key') == 'value'
+    store.delete('key')
+    assert store.get('key') is None
+
+
+def test_store_ttl(store):
+    assert store.incr('window', ttl=0.05) == 1
+    assert store.incr('window', ttl=0.05) == 2
+    store.set('key', 'value', ttl=0.05)
+    time.sleep(0.06)
+    assert store.get('key') is None
+    assert store.incr('window', ttl=0.05) == 1
+
+
+def test_sqlite_store_purges_expired_rows(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / 'state.db'), purge_every=10)
+    for window in range(9):
+        store.incr(f'rate:{window}', ttl=0.01)
+    time.sleep(0.02)
+    store.set('kept', 'value')
+    rows = store._connection().execute('SELECT key FROM state').fetchall()
+    assert rows == [('kept',)]
+    with pytest.raises(ValueError):
+        SQLiteStateStore(str(tmp_path / 'state.db'), purge_every=0)
+
+
+def test_rate_limiter(store):
+    limiter = SharedRateLimiter(store, rate=3, period=3600)
+    assert [limiter.try_acquire() for _ in range(5)] == [True, True, True, False, False]
+    assert 0 < limiter.reserve() <= 3600
+
+
+def test_circuit_breaker(store):
+    breaker = SharedCircuitBreaker(store, failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    time.sleep(0.06)
+    # Half-open: one probe goes through, the others wait for its outcome.
+    breaker.check()
+    with pytest.raises(CircuitOpen, match='half-open'):
+        breaker.check()
+    breaker.record_failure()
+    assert breaker.is_open
+    time.sleep(0.06)
+    breaker.check()
+    breaker.record_success()
+    breaker.check()
+    breaker.check()
+
+
+def test_in_flight_counter(store):
+    counter = SharedInFlightCounter(store, limit=2)
+    assert counter.try_enter()
+    assert counter.try_enter()
+    assert not counter.try_enter()
+    counter.exit()
+    assert counter.value == 1
+
+
+def _take_tokens(path, attempts, results):
+    limiter = SharedRateLimiter(SQLiteStateStore(path), rate=10, period=3600)
+    results.put(sum(limiter.try_acquire() for _ in range(attempts)))
+
+
+def test_sqlite_rate_limit_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'state.db')
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=_take_tokens, args=(path, 5, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    granted = sum(results.get(timeout=30) for _ in processes)
+    for process in processes:
+        process.join()
+    assert granted == 10
+
+
+def test_client_rate_limiter_and_breaker(client, requests_mock, mocker):
+    pipeline_id = uuid.uuid4()
+    requests_mock.get(AVAILABILITY_URL.format(pipeline_id), status_code=HTTPStatus.BAD_GATEWAY)
+    sleep = mocker.patch('fusionbrain_sdk_python.client.time.sleep')
+    limiter = mocker.Mock()
+    limiter.reserve.side_effect = [0.5, 0, 0, 0]
+    client.rate_limiter = limiter
+    client.circuit_breaker = SharedCircuitBreaker(MemoryStateStore(), failure_threshold=2)
+
+    for _ in range(2):
+        with pytest.raises(HTTPError):
+            client.get_pipeline_availability(pipeline_id)
+    with pytest.raises(CircuitOpen):
+        client.get_pipeline_availability(pipeline_id)
+    sleep.assert_called_once_with(0.5)
+    assert requests_mock.call_count == 2
+
+
+class ThreadRecordingStore(SQLiteStateStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = set()
+
+    def incr(self, key, amount=1, ttl=None):
+        self.threads.add(threading.get_ident())
+        return super().incr(key, amount, ttl)
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+
+@pytest.mark.asyncio
+async def test_async_client_offloads_store_calls(async_client, tmp_path):
+    pipeline_id = uuid.uuid4()
+    store = ThreadRecordingStore(str(tmp_path / 'state.db'))
+    async_client.rate_limiter = SharedRateLimiter(store, rate=100)
+    async_client.circuit_breaker = SharedCircuitBreaker(store)
+    with aioresponses() as m:
+        m.get(AVAILABILITY_URL.format(pipeline_id), payload={'status': 'ACTIVE'})
+        await async_client.get_pipeline_availability(pipeline_id)
+    assert store.threads
+    assert threading.get_ident() not in store.threads
+
+
+class StubClient:
+    async def run_pipeline(self, **kwargs):
+        return RunPipelineResult(uuid=uuid.uuid4(), status=PipelineResultStatus.INITIAL, status_time=0)
+
+
+@pytest.mark.asyncio
+async def test_schedulers_offload_rate_limiter(tmp_path):
+    store = ThreadRecordingStore(str(tmp_path / 'state.db'))
+    limiter = SharedRateLimiter(store, rate=100)
+    async with AsyncJobScheduler(StubClient(), rate_limiter=limiter) as scheduler:
+        await scheduler.submit(uuid.uuid4(), 'A red cat')
+    async with AsyncFairScheduler(StubClient(), rate_limiter=limiter) as scheduler:
+        await scheduler.run_pipeline('tenant', uuid.uuid4(), 'A red cat')
+    assert store.threads
+    assert threading.get_ident() not in store.threads
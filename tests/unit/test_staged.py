@@ -0,0 +1,130 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import DecodedPipelineResult
+from fusionbrain_sdk_python.staged import Stage, StagedPipeline, StageExecutor
+
+PIPELINE = uuid.UUID(PIPELINE_ID)
+
+
+async def double(value):
+    await asyncio.sleep(0)
+    return value * 2
+
+
+def fail_on_three(value):
+    if value == 6:
+        raise ValueError('no sixes')
+    return value + 1
+
+
+@pytest.mark.asyncio
+async def test_client_pipeline_decodes_and_sinks():
+    saved = []
+
+    def sink(decoded):
+        saved.append(decoded.uuid)
+        return decoded
+
+    with FakeServer(generation_time=0.01) as server:
+        async with AsyncFBClient(x_key='key', x_secret='secret', api_host=server.url) as client:
+            pipeline = StagedPipeline.for_client(
+                client, sink=sink, submit_workers=2, track_workers=4, sleep_interval=0.01, max_retries=100,
+            )
+            requests = [{'pipeline_id': PIPELINE, 'prompt': f'prompt {i}', 'num_images': 2} for i in range(5)]
+            results = [result async for result in pipeline.run(requests)]
+
+    assert sorted(result.index for result in results) == list(range(5))
+    assert all(isinstance(result.value, DecodedPipelineResult) for result in results)
+    assert all(len(result.value.files) == 2 for result in results)
+    assert len(saved) == 5
+    stats = pipeline.stats()
+    assert list(stats) == ['submit', 'track', 'decode', 'sink']
+    assert all(stage['processed'] == 5 and stage['failed'] == 0 for stage in stats.values())
+
+
+@pytest.mark.asyncio
+async def test_failures_are_reported_per_item():
+    pipeline = StagedPipeline([
+        Stage('double', double, workers=2),
+        Stage('increment', fail_on_three, workers=2, executor=StageExecutor.THREAD),
+    ])
+    results = {result.index: result async for result in pipeline.run(range(5), return_exceptions=True)}
+
+    assert [results[i].value for i in (0, 1, 2, 4)] == [1, 3, 5, 9]
+    assert isinstance(results[3].error, ValueError)
+    assert results[3].stage == 'increment'
+    assert pipeline.stats()['increment']['failed'] == 1
+
+    with pytest.raises(ValueError):
+        async for _ in StagedPipeline([Stage('increment', fail_on_three)]).run([6]):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_slow_stage_applies_backpressure():
+    produced = []
+
+    async def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    async def slow(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    pipeline = StagedPipeline(
+        [Stage('fast', double, workers=4, queue_size=2), Stage('slow', slow, queue_size=2)], output_size=1,
+    )
+    started = time.monotonic()
+    async for result in pipeline.run(source()):
+        if result.index == 2:
+            break
+    assert time.monotonic() - started < 1
+    # Only the bounded queues and busy workers hold items; the rest of the source is never read.
+    assert len(produced) < 20
+
+
+@pytest.mark.asyncio
+async def test_process_stage_and_async_iterable_input():
+    async def source():
+        for i in range(4):
+            yield i
+
+    pipeline = StagedPipeline([Stage('increment', fail_on_three, workers=2, executor=StageExecutor.PROCESS)])
+    values = sorted([result.value async for result in pipeline.run(source())])
+    assert values == [1, 2, 3, 4]
+
+
+def test_stage_validation():
+    with pytest.raises(ValueError):
+        Stage('empty', double, workers=0)
+    with pytest.raises(ValueError):
+        StagedPipeline([Stage('same', double), Stage('same', double)])
+    with pytest.raises(ValueError):
+        StagedPipeline([])
+
+
+@pytest.mark.asyncio
+async def test_failing_input_is_raised():
+    def items():
+        yield 1
+        raise RuntimeError('broken input')
+
+    async def async_items():
+        yield 1
+        raise RuntimeError('broken input')
+
+    async def drain(source):
+        async for _ in StagedPipeline([Stage('double', double, workers=2)]).run(source, return_exceptions=True):
+            pass
+
+    for source in (items(), async_items()):
+        with pytest.raises(RuntimeError, match='broken input'):
+            await asyncio.wait_for(drain(source), timeout=5)
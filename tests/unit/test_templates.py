@@ -0,0 +1,64 @@
+import uuid
+
+import pytest
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import RunPipelineResult, Style
+from fusionbrain_sdk_python.protocol import FBProtocol
+from fusionbrain_sdk_python.staged import StagedPipeline
+
+PIPELINE = uuid.UUID(PIPELINE_ID)
+
+
+@pytest.mark.parametrize('prompt', ['A red cat', 'Море "в шторм"', 'back\\slash\nnew line', '', '\x00prompt\x00'])
+def test_template_matches_run_pipeline(prompt):
+    protocol = FBProtocol(x_key='key', x_secret='secret')
+    style = Style(name='ANIME', title='Аниме', titleEn='Anime', image='https://example.invalid/a.png')
+    arguments = {'negative_prompt': 'люди \x00prompt\x00', 'style': style, 'height': 256, 'width': 512, 'num_images': 2}
+    template = protocol.run_template(PIPELINE, **arguments)
+
+    request = template.request(prompt)
+
+    assert request == protocol.run_pipeline(PIPELINE, prompt, **arguments)
+    assert template.style == 'ANIME'
+    assert protocol.run_template(PIPELINE).request(prompt) == protocol.run_pipeline(PIPELINE, prompt)
+
+
+def test_sync_client_submits_templates():
+    with FakeServer() as server:
+        with FBClient(x_key='key', x_secret='secret', api_host=server.url, styles_url=server.styles_url) as client:
+            client.refresh_catalogue()
+            with pytest.raises(ValueError, match='Unknown style'):
+                client.template(PIPELINE, style='NOIR')
+            template = client.template(PIPELINE, style='anime', num_images=3)
+            result = client.run_template(template, 'A red cat')
+
+        with FBClient(x_key='key', x_secret='secret', api_host=server.url, background_loop=True) as client:
+            futures = client.run_template_batch(template, [f'prompt {i}' for i in range(5)])
+            results = [future.result() for future in futures]
+
+    assert template.style == 'ANIME'
+    assert isinstance(result, RunPipelineResult)
+    assert all(isinstance(batch_result, RunPipelineResult) for batch_result in results)
+    assert sorted(job.prompt for job in server.jobs.values()) == ['A red cat'] + [f'prompt {i}' for i in range(5)]
+    assert {job.num_images for job in server.jobs.values()} == {3}
+
+
+@pytest.mark.asyncio
+async def test_async_client_and_staged_pipeline_use_templates():
+    async with FakeServer(generation_time=0.01) as server:
+        async with AsyncFBClient(x_key='key', x_secret='secret', api_host=server.url) as client:
+            template = client.template(PIPELINE, num_images=2)
+            assert isinstance(await client.run_template(template, 'A red cat'), RunPipelineResult)
+
+            pipeline = StagedPipeline.for_client(client, template=template, sleep_interval=0.01, max_retries=100)
+            results = [result async for result in pipeline.run(f'prompt {i}' for i in range(4))]
+            assert all(len(result.value.files) == 2 for result in results)
+
+            with pytest.raises(ValueError, match='template'):
+                async for _ in StagedPipeline.for_client(client).run(['A red cat']):
+                    pass
+
+    assert sorted(job.prompt for job in server.jobs.values()) == ['A red cat'] + [f'prompt {i}' for i in range(4)]
@@ -0,0 +1,45 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.fake_server import PIPELINE_ID, FakeServer
+from fusionbrain_sdk_python.models import PipelineResultStatus
+from fusionbrain_sdk_python.transport import RequestsTransport
+
+
+def test_requests_transport_uses_one_session_per_thread():
+    transport = RequestsTransport()
+    transport.base_session.headers['User-Agent'] = 'fusionbrain-test'
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        sessions = list(pool.map(lambda _: transport.session, range(16)))
+
+    assert transport.session is transport.session
+    assert len({id(session) for session in sessions}) <= 4
+    assert all(session.adapters is transport.base_session.adapters for session in sessions)
+    assert all(session.headers['User-Agent'] == 'fusionbrain-test' for session in sessions)
+
+
+def test_shared_headers_are_read_only(client):
+    with pytest.raises(TypeError):
+        client.AUTH_HEADERS['X-Key'] = 'Key other'
+    with pytest.raises(TypeError):
+        client.protocol.run_headers['Content-Type'] = 'text/plain'
+
+
+def test_one_client_shared_by_many_threads():
+    with FakeServer() as server, FBClient(
+        x_key='key', x_secret='secret', api_host=server.url, transport=RequestsTransport(pool_maxsize=16),
+    ) as client:
+        def generate(i):
+            run_result = client.run_pipeline(uuid.UUID(PIPELINE_ID), f'prompt {i}')
+            return client.get_status(run_result.uuid)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(generate, range(160)))
+
+    assert all(result.status == PipelineResultStatus.DONE for result in results)
+    assert len({result.uuid for result in results}) == 160
+    assert len(server.jobs) == 160
+    assert len(server.peers) <= 16
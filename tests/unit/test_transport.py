@@ -0,0 +1,132 @@
+import json
+import uuid
+from http import HTTPStatus
+
+import pytest
+from aiohttp import ClientResponseError
+from aioresponses import aioresponses
+from requests.exceptions import HTTPError
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.models import PipelineStatus, RunPipelineResult
+from fusionbrain_sdk_python.protocol import HTTPRequest
+from fusionbrain_sdk_python.transport import AiohttpTransport, HTTPResponse, RequestsTransport
+
+httpx = pytest.importorskip('httpx')
+
+from fusionbrain_sdk_python.httpx_transport import AsyncHttpxTransport, HttpxTransport  # noqa: E402
+
+API = 'http://localhost:8080/'
+AVAILABILITY = 'http://localhost:8080/key/api/v1/pipeline/{}/availability'
+
+
+def test_requests_transport_calls_before_read_only_on_expected_status(requests_mock):
+    requests_mock.get('http://localhost/ok', content=b'{}', headers={'Content-Length': '2'})
+    requests_mock.get('http://localhost/missing', status_code=HTTPStatus.NOT_FOUND)
+    transport = RequestsTransport()
+    seen = []
+
+    response = transport.send(HTTPRequest('x', 'GET', 'http://localhost/ok'), seen.append)
+    transport.send(HTTPRequest('x', 'GET', 'http://localhost/missing'), seen.append)
+
+    assert response.status == HTTPStatus.OK
+    assert response.body == b'{}'
+    assert response.content_length == 2
+    assert seen == [2]
+
+
+@pytest.mark.asyncio
+async def test_aiohttp_transport_reuses_one_session():
+    transport = AiohttpTransport()
+    with aioresponses() as m:
+        m.get('http://localhost/ok', body=b'{}', repeat=True)
+        await transport.send(HTTPRequest('x', 'GET', 'http://localhost/ok'))
+        session = transport.session
+        await transport.send(HTTPRequest('x', 'GET', 'http://localhost/ok'))
+        assert transport.session is session
+    await transport.close()
+    assert session.closed
+
+
+def test_client_with_custom_transport(monkeypatch):
+    monkeypatch.setenv('FB_API_KEY', 'key')
+    monkeypatch.setenv('FB_API_SECRET', 'secret')
+    requests = []
+
+    class RecordingTransport:
+        def send(self, request, before_read=None):
+            requests.append(request)
+            return HTTPResponse(HTTPStatus.OK, body=b'{"status": "ACTIVE"}')
+
+        def error(self, request, response, message):
+            return RuntimeError(message)
+
+        def close(self):
+            requests.clear()
+
+    pipeline_id = uuid.uuid4()
+    with FBClient(api_host=API, transport=RecordingTransport()) as client:
+        assert client.get_pipeline_availability(pipeline_id) == PipelineStatus.ACTIVE
+        assert requests[0].url == AVAILABILITY.format(pipeline_id)
+        assert requests[0].headers['X-Key'] == 'Key key'
+    assert requests == []
+
+
+def test_httpx_transport(monkeypatch):
+    monkeypatch.setenv('FB_API_KEY', 'key')
+    monkeypatch.setenv('FB_API_SECRET', 'secret')
+    run_id = uuid.uuid4()
+
+    def handler(request):
+        if request.url.path.endswith('/run'):
+            assert request.headers['Content-Type'].startswith('multipart/form-data; boundary=')
+            return httpx.Response(HTTPStatus.CREATED, json={'uuid': str(run_id), 'status': 'INITIAL', 'status_time': 5})
+        return httpx.Response(HTTPStatus.NOT_FOUND, text='missing')
+
+    transport = HttpxTransport(http2=False, client=httpx.Client(transport=httpx.MockTransport(handler)))
+    with FBClient(api_host=API, transport=transport) as client:
+        result = client.run_pipeline(uuid.uuid4(), 'prompt')
+        assert isinstance(result, RunPipelineResult)
+        assert result.uuid == run_id
+        with pytest.raises(httpx.HTTPStatusError, match='In response to .* Reason: missing'):
+            client.get_pipeline_availability(uuid.uuid4())
+
+
+@pytest.mark.asyncio
+async def test_async_httpx_transport_before_read(monkeypatch):
+    monkeypatch.setenv('FB_API_KEY', 'key')
+    monkeypatch.setenv('FB_API_SECRET', 'secret')
+    body = json.dumps({'status': 'ACTIVE'}).encode()
+    seen = []
+
+    async def before_read(content_length):
+        seen.append(content_length)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body)))
+    transport = AsyncHttpxTransport(http2=False, client=client)
+    response = await transport.send(HTTPRequest('x', 'GET', 'http://localhost/ok'), before_read)
+    assert response.body == body
+    assert seen == [len(body)]
+
+    async with AsyncFBClient(api_host=API, transport=transport) as fb_client:
+        assert await fb_client.get_pipeline_availability(uuid.uuid4()) == PipelineStatus.ACTIVE
+    assert client.is_closed
+
+
+def test_transport_errors_keep_native_types(requests_mock):
+    requests_mock.get('http://localhost/missing', status_code=HTTPStatus.NOT_FOUND)
+    transport = RequestsTransport()
+    request = HTTPRequest('x', 'GET', 'http://localhost/missing')
+    assert isinstance(transport.error(request, transport.send(request), 'boom'), HTTPError)
+
+
+@pytest.mark.asyncio
+async def test_aiohttp_transport_error_type():
+    transport = AiohttpTransport()
+    request = HTTPRequest('x', 'GET', 'http://localhost/missing')
+    with aioresponses() as m:
+        m.get('http://localhost/missing', status=HTTPStatus.NOT_FOUND)
+        response = await transport.send(request)
+    assert isinstance(transport.error(request, response, 'boom'), ClientResponseError)
+    await transport.close()
@@ -0,0 +1,107 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fusionbrain_sdk_python.async_client import AsyncFBClient
+from fusionbrain_sdk_python.client import FBClient
+from fusionbrain_sdk_python.exceptions import ConfigError
+from fusionbrain_sdk_python.fake_server import FakeServer
+from fusionbrain_sdk_python.recording import Cassette, RecordingTransport, ReplayTransport
+from fusionbrain_sdk_python.transport import AiohttpTransport, RequestsTransport
+
+
+@pytest.fixture
+def fake_server():
+    with FakeServer() as server:
+        yield server
+
+
+def test_warmup_preloads_catalogues_and_pools_connections(fake_server):
+    with FBClient(x_key='key', x_secret='secret', api_host=fake_server.url, styles_url=fake_server.styles_url) as client:
+        assert not client.ready.is_set()
+        result = client.warmup(connections=4)
+
+        assert client.ready.is_set()
+        assert client.pipelines == result.pipelines
+        assert client.styles == result.styles
+        assert len(result.pipelines) == 1
+        assert result.connections == 4
+        warm = set(fake_server.peers)
+        assert len(warm) >= 4
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda _: client.get_pipelines(), range(4)))
+        assert fake_server.peers == warm
+
+
+@pytest.mark.asyncio
+async def test_async_warmup_preloads_catalogues_and_pools_connections(fake_server):
+    async with AsyncFBClient(
+        x_key='key', x_secret='secret', api_host=fake_server.url, styles_url=fake_server.styles_url,
+    ) as client:
+        result = await client.warmup(connections=4)
+
+        assert client.ready.is_set()
+        assert client.pipelines == result.pipelines
+        assert len(result.styles) == len(client.styles or [])
+        warm = set(fake_server.peers)
+        assert len(warm) >= 4
+
+        await asyncio.gather(*(client.get_pipelines() for _ in range(4)))
+        assert fake_server.peers == warm
+
+
+def test_warmup_in_background_mode(fake_server):
+    with FBClient(
+        x_key='key', x_secret='secret', api_host=fake_server.url, styles_url=fake_server.styles_url,
+        background_loop=True,
+    ) as client:
+        assert client.warmup(connections=2).connections == 2
+        assert client.ready.is_set()
+
+
+def test_warmup_pools_the_styles_host_within_the_pool_size(fake_server):
+    with FakeServer() as cdn, FBClient(
+        x_key='key', x_secret='secret', api_host=fake_server.url, styles_url=cdn.styles_url,
+        transport=RequestsTransport(pool_maxsize=3),
+    ) as client:
+        result = client.warmup(connections=8)
+        assert result.connections == 3
+        # Requests that finish early hand their connection on, so only the upper bound is exact.
+        assert len(fake_server.peers) <= 4
+        assert 1 <= len(cdn.peers) <= 4
+
+
+@pytest.mark.asyncio
+async def test_async_warmup_pools_the_styles_host_within_the_pool_size(fake_server):
+    with FakeServer() as cdn:
+        async with AsyncFBClient(
+            x_key='key', x_secret='secret', api_host=fake_server.url, styles_url=cdn.styles_url,
+            transport=AiohttpTransport(limit_per_host=2),
+        ) as client:
+            result = await client.warmup(connections=8)
+            assert result.connections == 2
+            assert len(fake_server.peers) == 2
+            assert len(cdn.peers) == 2
+
+
+def test_warmup_skips_connections_for_transports_without_a_pool(fake_server, tmp_path):
+    hosts = {'api_host': fake_server.url, 'styles_url': fake_server.styles_url}
+    cassette = Cassette(tmp_path / 'catalogues.jsonl')
+    with FBClient(x_key='key', x_secret='secret', transport=RecordingTransport(RequestsTransport(), cassette),
+                  **hosts) as client:
+        client.get_pipelines()
+        client.get_styles()
+
+    with FBClient(x_key='key', x_secret='secret', transport=ReplayTransport(cassette.path), **hosts) as client:
+        result = client.warmup()
+    assert result.connections == 0
+    assert len(result.pipelines) == 1
+
+
+def test_warmup_fails_fast_on_unresolvable_host():
+    with FBClient(x_key='key', x_secret='secret', api_host='http://fusionbrain.invalid/') as client:
+        with pytest.raises(ConfigError, match='Cannot resolve'):
+            client.warmup()
+        assert not client.ready.is_set()